@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from rate_limiter import BACKGROUND
+from response_cache import canonical_hash
+
+# Scenario set used for a full advisory pass, mirroring the playground defaults.
+# An expense_type of None is filled in with the household's largest expense category.
+DEFAULT_SCENARIOS = [
+    ("expense_reduction", {"expense_type": None, "reduction_percentage": 20}),
+    ("income_increase", {"increase_percentage": 10}),
+    ("loan", {"amount": 10000, "term": 36, "interest_rate": 7.0, "purpose": "Personal"}),
+    ("investment", {"amount": 10000, "duration": 5, "risk_level": "Moderate", "strategy": "Balanced"})
+]
+
+
+def largest_expense_category(user_data, default="Rent/Mortgage"):
+    """The category with the highest total in user_data's monthly expenses, or default if there are none"""
+    from expense_store import as_expense_store
+    store = as_expense_store((user_data or {}).get('monthly_expenses'))
+    top = store.aggregates.top_categories(1)
+    if not len(top) or store.category_totals()[top[0]] <= 0:
+        return default
+    return store.categories[top[0]]
+
+
+def resolve_scenarios(scenarios, user_data):
+    """scenarios with an unset expense_type replaced by the household's largest expense category"""
+    return [
+        (scenario_type, {**parameters, "expense_type": largest_expense_category(user_data)})
+        if "expense_type" in parameters and parameters["expense_type"] is None else (scenario_type, parameters)
+        for scenario_type, parameters in scenarios
+    ]
+
+
+class AdvisoryEngine:
+    """Issue the health analysis, recommendations and scenario simulations concurrently.
+
+    Requests share FinancialAI's prompts and response cache, so a full pass
+    also warms the cache for the individual pages. Failed requests do not fall
+    back: they are left out of the result set and reported under 'errors'. At most
+    max_concurrency requests are in flight at once, and every request is
+    admitted by the shared scheduler at the given priority (background by
+    default, so interactive page loads are served first).
+    """
+
+    def __init__(self, financial_ai, max_concurrency=None, scenarios=None, priority=BACKGROUND):
+        self.financial_ai = financial_ai
+        self.max_concurrency = max_concurrency or int(os.getenv('FINTWIN_MAX_CONCURRENCY', 4))
+        self.scenarios = scenarios if scenarios is not None else DEFAULT_SCENARIOS
+        self.priority = priority
+
+    def run(self, user_data, predictions=None, simulations=None, scenarios=None, session_id=None):
+        """Run a full advisory pass from synchronous code (e.g. a Streamlit script)"""
+        return asyncio.run(self.run_async(user_data, predictions, simulations, scenarios, session_id))
+
+    async def run_async(self, user_data, predictions=None, simulations=None, scenarios=None, session_id=None):
+        """Run a full advisory pass and return the completed result set.
+
+        Every call is recorded in the LLM ledger under session_id and counts
+        against its token budget. A failed health analysis or recommendations
+        request is returned as None, and a failed simulation is omitted.
+        """
+        scenarios = resolve_scenarios(scenarios if scenarios is not None else self.scenarios, user_data)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+
+        client = None
+        if self.financial_ai.openai_api_key:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=self.financial_ai.openai_api_key, max_retries=0)
+        try:
+            health, recommendations, *simulation_results = await asyncio.gather(
+                self._analyze_financial_health(client, semaphore, user_data, session_id),
+                self._generate_recommendations(client, semaphore, user_data, predictions, simulations, session_id),
+                *[
+                    self._simulate_scenario(client, semaphore, user_data, scenario_type, parameters, session_id)
+                    for scenario_type, parameters in scenarios
+                ],
+                return_exceptions=True
+            )
+        finally:
+            if client is not None:
+                await client.close()
+
+        # Failed tasks are left out of the results (and noted in 'errors') so the
+        # pages request them again instead of showing a fallback as precomputed
+        errors = {}
+        for name, result in (('financial_health', health), ('recommendations', recommendations)):
+            if isinstance(result, BaseException):
+                errors[name] = str(result)
+        simulation_set = {}
+        for (scenario_type, parameters), result in zip(scenarios, simulation_results):
+            if isinstance(result, BaseException):
+                errors[f'simulation:{scenario_type}'] = str(result)
+            else:
+                simulation_set[scenario_type] = {'parameters': parameters, 'result': result}
+
+        return {
+            'data_key': canonical_hash(user_data),
+            'completed_at': datetime.now().isoformat(),
+            'elapsed_seconds': time.perf_counter() - started,
+            'financial_health': None if isinstance(health, BaseException) else health,
+            'recommendations': None if isinstance(recommendations, BaseException) else recommendations,
+            'simulations': simulation_set,
+            'errors': errors
+        }
+
+    async def _analyze_financial_health(self, client, semaphore, user_data, session_id=None):
+        ai = self.financial_ai
+        with ai.ledger.track("financial_health", session_id) as entry:
+            try:
+                response_data = await self._request_completion(
+                    client, semaphore, "financial_health", ai._health_payload(user_data), entry
+                )
+                return ai._format_health_response(response_data)
+            except Exception as e:
+                print(f"Error in async OpenAI analysis: {e}")
+                entry.fallback(e)
+                raise
+
+    async def _generate_recommendations(self, client, semaphore, user_data, predictions, simulations, session_id=None):
+        ai = self.financial_ai
+        with ai.ledger.track("recommendations", session_id) as entry:
+            try:
+                vector, reused = ai._similar_recommendations(user_data, entry)
+                if reused is not None:
+                    return reused
+                recommendations = await self._request_completion(
+                    client, semaphore, "recommendations",
+                    ai._recommendation_payload(user_data, predictions, simulations), entry
+                )
+                ai.recommendation_index.add(vector, recommendations)
+                return recommendations
+            except Exception as e:
+                print(f"Error in async OpenAI recommendations: {e}")
+                entry.fallback(e)
+                raise
+
+    async def _simulate_scenario(self, client, semaphore, user_data, scenario_type, parameters, session_id=None):
+        ai = self.financial_ai
+        with ai.ledger.track("simulation", session_id) as entry:
+            try:
+                return await self._request_completion(
+                    client, semaphore, "simulation",
+                    ai._simulation_payload(user_data, scenario_type, parameters), entry
+                )
+            except Exception as e:
+                print(f"Error in async OpenAI simulation: {e}")
+                entry.fallback(e)
+                raise
+
+    async def _request_completion(self, client, semaphore, call_type, payload, entry=None):
+        """Async counterpart of FinancialAI._request_completion sharing its cache and in-flight calls"""
+        ai = self.financial_ai
+        route = ai.router.route(call_type)
+        key = ai._cache_key(call_type, payload, route)
+        cached = ai.cache.get(key)
+        if cached is not None:
+            ai._note_source(entry, 'cache')
+            return cached
+        if client is None:
+            # Without an API key only cached replies can be served
+            raise RuntimeError("OPENAI_API_KEY is not configured")
+
+        # Checked per caller before joining a flight, as in FinancialAI._request_completion
+        messages, prompt_tokens = ai.prompt_builder.build_messages(call_type, payload)
+        ai._check_budget(entry, prompt_tokens, route)
+
+        async def fetch():
+            cached = ai.cache.get(key)
+            if cached is not None:
+                ai._note_source(entry, 'cache')
+                return cached
+            ai._note_source(entry, 'api')
+            async with semaphore:
+                response = await self._create_completion(client, messages, prompt_tokens, route, entry)
+
+            response_data = json.loads(response.choices[0].message.content)
+            ai.cache.set(key, response_data)
+            return response_data
+
+        response_data = await ai.single_flight.do_async(key, fetch)
+        if entry is not None and entry.source is None:
+            entry.source = 'coalesced'
+        return response_data
+
+    async def _create_completion(self, client, messages, prompt_tokens, route, entry=None):
+        """Async counterpart of FinancialAI._create_completion using the shared scheduler, breaker and router"""
+        ai = self.financial_ai
+        completions = client.chat.completions
+        estimated_tokens = prompt_tokens + route.max_tokens
+
+        async def send(timeout):
+            started = time.perf_counter()
+            try:
+                response = await completions.create(
+                    model=route.model,
+                    messages=messages,
+                    timeout=timeout,
+                    **route.params
+                )
+            except Exception as e:
+                ai.router.observe_failure(route, time.perf_counter() - started, e)
+                raise
+            ai.router.observe(route, time.perf_counter() - started)
+            return response
+
+        response = await ai.resilience.call_async(
+            send, ai.scheduler, estimated_tokens, self.priority, timeout=route.timeout
+        )
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            ai.scheduler.report_usage(estimated_tokens, usage.total_tokens)
+            if entry is not None:
+                entry.usage(route.model, usage.prompt_tokens, usage.completion_tokens)
+        elif entry is not None:
+            entry.usage(route.model, prompt_tokens, 0, estimated=True)
+        return response
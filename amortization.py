@@ -0,0 +1,146 @@
+import numpy as np
+
+# Terms (months) and rate offsets (percentage points) spanned by the default sensitivity grid
+DEFAULT_TERMS = (12, 24, 36, 48, 60, 84, 120, 180, 240, 360)
+DEFAULT_RATE_OFFSETS = tuple(np.arange(-3.0, 3.01, 0.5))
+DEFAULT_AMOUNT_FACTORS = (0.5, 0.75, 1.0, 1.25, 1.5)
+
+# Loan payment as a share of monthly income above which an option counts as unaffordable
+AFFORDABLE_PAYMENT_RATIO = 0.36
+
+# Balances below half a cent are treated as repaid
+PAID_OFF = 0.005
+
+
+def level_payment(principal, annual_rate, term_months):
+    """Level monthly payment repaying principal over term_months; zero-rate loans repay in equal parts"""
+    principal, annual_rate, term = np.broadcast_arrays(
+        np.asarray(principal, dtype=float), np.asarray(annual_rate, dtype=float), np.asarray(term_months, dtype=float)
+    )
+    rate = annual_rate / 1200
+    has_rate = rate > 0
+    growth = np.power(1 + rate, term)
+    return np.where(
+        has_rate,
+        principal * rate * growth / np.where(has_rate, growth - 1, 1),
+        principal / np.maximum(term, 1)
+    )
+
+
+def _segment(start_balance, rate, payment, months):
+    """Balances, interest and principal for months 1..months paying payment at monthly rate"""
+    k = np.arange(months + 1, dtype=float)
+    rate = rate[..., None]
+    growth = np.power(1 + rate, k)
+    annuity = np.where(rate > 0, (growth - 1) / np.where(rate > 0, rate, 1), k)
+    balances = start_balance[..., None] * growth - payment[..., None] * annuity
+    balances = np.where(balances < PAID_OFF, 0.0, balances)
+    interest = balances[..., :-1] * rate
+    principal = balances[..., :-1] - balances[..., 1:]
+    return balances, interest, principal
+
+
+def amortize(principal, annual_rate, term_months, extra_payment=0.0, refinance=None):
+    """Build full amortization schedules for every combination of the (broadcast) inputs.
+
+    principal, annual_rate (percent), term_months and extra_payment may be
+    scalars or arrays of any broadcastable shape G. refinance is an optional
+    list of refinancing points, each {'month', 'annual_rate'} plus an optional
+    'term_months' (defaults to the remaining term) and 'cost' (added to the
+    balance). The extra payment applies every month on top of the level
+    payment. Schedules are computed in closed form, segment by segment, with
+    no loop over months or grid cells.
+
+    Returns arrays of shape G (monthly_payment, total_interest, total_paid,
+    payoff_months, interest_saved) and of shape G + (months,) (balances,
+    which starts with the opening balance, interest and principal).
+    """
+    principal, annual_rate, term, extra = np.broadcast_arrays(
+        np.asarray(principal, dtype=float), np.asarray(annual_rate, dtype=float),
+        np.asarray(term_months, dtype=float), np.asarray(extra_payment, dtype=float)
+    )
+    points = sorted(refinance or [], key=lambda point: point['month'])
+
+    payment = level_payment(principal, annual_rate, term)
+    starts = [0] + [int(point['month']) for point in points]
+    horizon = int(term.max()) if term.size else 0
+    for point in points:
+        remaining = term - point['month'] if point.get('term_months') is None else np.full_like(term, point['term_months'])
+        horizon = max(horizon, int(point['month'] + remaining.max()))
+
+    balance = principal
+    rate = annual_rate / 1200
+    segment_payment = payment + extra
+    balances, interest, principal_paid = [balance[..., None]], [], []
+    costs = np.zeros_like(principal)
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else horizon
+        if index > 0:
+            point = points[index - 1]
+            cost = np.where(balance > 0, point.get('cost', 0.0), 0.0)
+            costs = costs + cost
+            balance = balance + cost
+            remaining = term - start if point.get('term_months') is None else np.full_like(term, point['term_months'])
+            rate = np.full_like(rate, point['annual_rate'] / 1200)
+            segment_payment = level_payment(balance, point['annual_rate'], np.maximum(remaining, 1)) + extra
+        if end <= start:
+            continue
+        segment_balances, segment_interest, segment_principal = _segment(balance, rate, segment_payment, end - start)
+        balances.append(segment_balances[..., 1:])
+        interest.append(segment_interest)
+        principal_paid.append(segment_principal)
+        balance = segment_balances[..., -1]
+
+    balances = np.concatenate(balances, axis=-1)
+    interest = np.concatenate(interest, axis=-1) if interest else np.zeros(principal.shape + (0,))
+    principal_paid = np.concatenate(principal_paid, axis=-1) if principal_paid else np.zeros(principal.shape + (0,))
+    total_interest = interest.sum(axis=-1)
+
+    # Interest of the same loan without extra payments or refinancing
+    baseline_interest = payment * term - principal
+
+    return {
+        'monthly_payment': payment,
+        'total_interest': total_interest,
+        'total_paid': principal + total_interest + costs,
+        'payoff_months': (balances[..., :-1] > 0).sum(axis=-1),
+        'interest_saved': baseline_interest - total_interest - costs,
+        'balances': balances,
+        'interest': interest,
+        'principal': principal_paid
+    }
+
+
+def sensitivity_grid(amount, annual_rate, monthly_income=None, amounts=None, rates=None, terms=None,
+                     extra_payment=0.0, refinance=None):
+    """Amortize every amount x rate x term combination around a loan in one pass.
+
+    Axes default to amounts scaled by DEFAULT_AMOUNT_FACTORS, rates offset by
+    DEFAULT_RATE_OFFSETS (floored at zero) and DEFAULT_TERMS. Returns the axes
+    and heatmap-ready (amounts, rates, terms) arrays as nested lists, plus the
+    payment-to-income ratio and an affordability mask when monthly_income is known.
+    """
+    amounts = np.asarray(amounts if amounts is not None else [amount * f for f in DEFAULT_AMOUNT_FACTORS], dtype=float)
+    rates = np.asarray(
+        rates if rates is not None else sorted({round(max(annual_rate + o, 0.0), 2) for o in DEFAULT_RATE_OFFSETS}),
+        dtype=float
+    )
+    terms = np.asarray(terms if terms is not None else DEFAULT_TERMS, dtype=float)
+
+    result = amortize(
+        amounts[:, None, None], rates[None, :, None], terms[None, None, :],
+        extra_payment=extra_payment, refinance=refinance
+    )
+    surface = {
+        'amounts': amounts.tolist(),
+        'rates': rates.tolist(),
+        'terms': terms.astype(int).tolist(),
+        'monthly_payment': np.round(result['monthly_payment'], 2).tolist(),
+        'total_interest': np.round(result['total_interest'], 2).tolist(),
+        'payoff_months': result['payoff_months'].tolist()
+    }
+    if monthly_income:
+        ratio = (result['monthly_payment'] + extra_payment) / monthly_income
+        surface['payment_to_income'] = np.round(ratio, 4).tolist()
+        surface['affordable'] = (ratio <= AFFORDABLE_PAYMENT_RATIO).tolist()
+    return surface
@@ -1,11 +1,26 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
 import json
+import uuid
+import functools
 from financial_ai import FinancialAI
 from data_processor import DataProcessor
+from expense_store import ExpenseStore
+from statement_import import StatementImporter, TransactionHashes
+from categorizer import Categorizer, parse_rules
 from svg_converter import SVGConverter
+from advisory_engine import AdvisoryEngine
+from background_jobs import BackgroundJobRunner, analysis_steps
+from forecasting import ExpenseForecaster
+from response_cache import canonical_hash
+from model_registry import registry
+from rate_limiter import reset_scheduler
+from resilience import reset_resilient_caller
+from llm_ledger import reset_ledger
+from recommendation_index import reset_recommendation_index
+from model_router import reset_model_router
+from figure_cache import reset_figure_cache
 import os
 from dotenv import load_dotenv
 import traceback
@@ -61,11 +76,67 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Shared resources are built once per server process and reused by every
+# session and rerun; Streamlit serializes their construction across threads.
+@st.cache_resource(show_spinner=False)
+def load_financial_ai():
+    return FinancialAI()
+
+@st.cache_resource(show_spinner=False)
+def load_data_processor():
+    return DataProcessor()
+
+@st.cache_resource(show_spinner=False)
+def load_svg_converter():
+    return SVGConverter()
+
+@st.cache_resource(show_spinner=False)
+def load_advisory_engine():
+    return AdvisoryEngine(load_financial_ai())
+
+@st.cache_resource(show_spinner=False)
+def load_forecaster():
+    return ExpenseForecaster.from_env()
+
+@st.cache_resource(show_spinner=False)
+def load_job_runner():
+    return BackgroundJobRunner.from_env()
+
+@st.cache_resource(show_spinner=False)
+def load_statement_importer():
+    return StatementImporter.from_env()
+
+# One categorizer (and merchant cache) per distinct category list and rule set,
+# shared by the sessions using it
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_categorizer(categories, rules):
+    return Categorizer.from_env(list(categories), list(rules), llm=load_financial_ai().categorize_merchants)
+
+def reload_shared_resources():
+    """Rebuild the shared resources after a configuration change"""
+    load_dotenv(override=True)
+    load_job_runner().close()
+    load_forecaster().close()
+    for loader in (load_advisory_engine, load_financial_ai, load_data_processor, load_svg_converter, load_forecaster,
+                   load_job_runner, load_statement_importer, load_categorizer):
+        loader.clear()
+    reset_scheduler()
+    reset_resilient_caller()
+    reset_ledger()
+    reset_recommendation_index()
+    reset_model_router()
+    reset_figure_cache()
+    registry.reset()
+
 class FinTwinApp:
     def __init__(self):
-        self.financial_ai = FinancialAI()
-        self.data_processor = DataProcessor()
-        self.svg_converter = SVGConverter()
+        self.financial_ai = load_financial_ai()
+        self.data_processor = load_data_processor()
+        self.svg_converter = load_svg_converter()
+        self.advisory_engine = load_advisory_engine()
+        self.forecaster = load_forecaster()
+        self.job_runner = load_job_runner()
+        self.statement_importer = load_statement_importer()
         self.initialize_session_state()
         self.initialize_debug_mode()
 
@@ -76,6 +147,8 @@ class FinTwinApp:
 
     def initialize_session_state(self):
         """Initialize session state variables"""
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
         if 'financial_data' not in st.session_state:
             st.session_state.financial_data = None
         if 'predictions' not in st.session_state:
@@ -86,8 +159,20 @@ class FinTwinApp:
             st.session_state.error_log = []
         if 'user_data' not in st.session_state:
             st.session_state.user_data = None
-        if 'monthly_expenses' not in st.session_state:
-            st.session_state.monthly_expenses = {}
+        if 'expense_store' not in st.session_state:
+            st.session_state.expense_store = ExpenseStore()
+        if 'transaction_hashes' not in st.session_state:
+            st.session_state.transaction_hashes = TransactionHashes()
+        if 'imported_statements' not in st.session_state:
+            st.session_state.imported_statements = set()
+        if 'failed_statements' not in st.session_state:
+            st.session_state.failed_statements = {}
+        if 'category_rules' not in st.session_state:
+            st.session_state.category_rules = []
+        if 'advisory_results' not in st.session_state:
+            st.session_state.advisory_results = None
+        if 'stream_responses' not in st.session_state:
+            st.session_state.stream_responses = True
         if 'expense_categories' not in st.session_state:
             st.session_state.expense_categories = [
                 "Rent/Mortgage",
@@ -128,7 +213,109 @@ class FinTwinApp:
                 st.subheader("System Status")
                 st.write(f"OpenAI API Key: {'Configured' if self.financial_ai.openai_api_key else 'Missing'}")
                 st.write(f"Financial Data: {'Loaded' if st.session_state.financial_data else 'Not Loaded'}")
+
+                cache_stats = self.financial_ai.cache.stats()
+                st.write(
+                    f"Response Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']*100:.0f}% hit rate)"
+                )
+                st.caption(
+                    f"{cache_stats['memory_entries']} in memory, {cache_stats['disk_entries']} on disk "
+                    f"({cache_stats['disk_bytes'] / 1024:.1f} KB), {cache_stats['evictions']} evictions"
+                )
+                if st.button("Clear Response Cache"):
+                    self.financial_ai.cache.clear()
+
+                scheduler_stats = self.financial_ai.scheduler.stats()
+                st.write(
+                    f"Request Queue: {scheduler_stats['queue_depth']} waiting "
+                    f"({scheduler_stats['interactive_waiting']} interactive, {scheduler_stats['background_waiting']} background)"
+                )
+                st.caption(
+                    f"Wait avg {scheduler_stats['avg_wait']:.2f}s / p95 {scheduler_stats['p95_wait']:.2f}s / "
+                    f"max {scheduler_stats['max_wait']:.2f}s, {scheduler_stats['granted']} granted, "
+                    f"{scheduler_stats['rate_limited']} rate limited, {scheduler_stats['timeouts']} timed out"
+                )
+
+                resilience_stats = self.financial_ai.resilience.stats()
+                breaker = resilience_stats['breaker']
+                breaker_label = breaker['state'].replace('_', '-').title()
+                if breaker['state'] == 'open':
+                    breaker_label += f" (retry in {breaker['retry_in']:.0f}s)"
+                st.write(f"Circuit Breaker: {breaker_label}")
+                latency = (
+                    f"p50 {resilience_stats['p50_latency']:.1f}s / p95 {resilience_stats['p95_latency']:.1f}s"
+                    if resilience_stats['p50_latency'] is not None else "no samples yet"
+                )
+                st.caption(
+                    f"{breaker['consecutive_failures']} consecutive failures, opened {breaker['times_opened']} times, "
+                    f"{breaker['short_circuited']} calls short-circuited. Latency {latency}; "
+                    f"{resilience_stats['retries']} retries, {resilience_stats['timeouts']} timeouts, "
+                    f"{resilience_stats['hedges_fired']} hedges fired ({resilience_stats['hedges_won']} won)"
+                )
+
+                self.show_llm_ledger()
+
+                router_stats = self.financial_ai.router.stats()
+                st.caption("Model routing: " + " | ".join(
+                    f"{task} → {route['model']}"
+                    + (f" (downgraded for {route['downgraded_for']:.0f}s)" if route['tier'] > route['preferred_tier'] else "")
+                    + (
+                        f", p{router_stats['slo_percentile']} {route['latency']:.1f}s / SLO {route['slo']:.0f}s"
+                        if route['latency'] is not None else ""
+                    )
+                    for task, route in router_stats['tasks'].items()
+                ) + f"; {router_stats['downgrades']} downgrades")
+
+                flight_stats = self.financial_ai.single_flight.stats()
+                st.caption(
+                    f"In-flight requests: {flight_stats['in_flight']} ({flight_stats['waiting']} duplicates waiting); "
+                    f"{flight_stats['coalesced']} of {flight_stats['calls']} uncached calls coalesced, "
+                    f"at most {flight_stats['max_waiters']} waiting on one request"
+                )
                 
+                forecast_stats = self.forecaster.stats()
+                st.caption(
+                    f"Forecasts: {forecast_stats['forecasts']} runs, {forecast_stats['fits']} category fits, "
+                    f"{forecast_stats['cached_fits']} reused from cache, {forecast_stats['workers']} worker processes"
+                )
+                index_stats = self.financial_ai.recommendation_index.stats()
+                distances = index_stats['distance_percentiles']
+                st.caption(
+                    f"Recommendation reuse: {index_stats['hits']} of {index_stats['lookups']} lookups "
+                    f"({index_stats['hit_rate']*100:.0f}%) within distance {index_stats['threshold']:g}, "
+                    f"{index_stats['entries']} households indexed, {index_stats['evictions']} evicted"
+                    + (
+                        f"; nearest distance p10 {distances['p10']:.3f} / p50 {distances['p50']:.3f} / "
+                        f"p90 {distances['p90']:.3f}" if distances else ""
+                    )
+                )
+                figure_stats = self.data_processor.figure_cache.stats()
+                st.caption(
+                    f"Chart cache: {figure_stats['hits']} of {figure_stats['hits'] + figure_stats['misses']} figures "
+                    f"reused ({figure_stats['hit_rate']*100:.0f}%), {figure_stats['entries']} cached in "
+                    f"{figure_stats['bytes'] / 1024:,.0f} of {figure_stats['max_bytes'] / 1024:,.0f} KB, "
+                    f"{figure_stats['evictions']} evicted"
+                )
+                category_stats = self.get_categorizer().stats()
+                st.caption(
+                    f"Categorization: {category_stats['hits']} of {category_stats['hits'] + category_stats['misses']} "
+                    f"merchants from cache ({category_stats['hit_rate']*100:.0f}%), "
+                    f"{category_stats['rule_matches']} by rules, {category_stats['llm_merchants']} by AI in "
+                    f"{category_stats['llm_batches']} batches ({category_stats['llm_failures']} failed), "
+                    f"{category_stats['entries']} of {category_stats['cache_size']} cached"
+                )
+                job_stats = self.job_runner.stats()
+                st.caption(
+                    f"Background jobs: {job_stats['running']} running, {job_stats['queued']} queued, "
+                    f"{job_stats['completed']} completed, {job_stats['superseded']} superseded, "
+                    f"{job_stats['failed']} with failed steps"
+                )
+                st.caption(f"Loaded models: {', '.join(registry.loaded()) or 'none'}")
+                if st.button("Reload Configuration", help="Re-read .env and rebuild the shared AI client, cache, rate limiter and models"):
+                    reload_shared_resources()
+                    st.success("Configuration reloaded; changes apply from the next interaction.")
+
                 if st.button("Clear Error Log"):
                     st.session_state.error_log = []
                 
@@ -139,6 +326,38 @@ class FinTwinApp:
                         st.write("Error:", error['error'])
                         st.code(error['traceback'])
 
+    def show_llm_ledger(self):
+        """Rolling LLM call aggregates and token budget usage from the ledger"""
+        ledger_stats = self.financial_ai.ledger.stats(st.session_state.session_id)
+        if not ledger_stats['calls']:
+            st.caption("LLM calls: none recorded yet")
+            return
+
+        def budget(used, limit):
+            return f"{used:,} / {limit:,}" if limit else f"{used:,} (no budget)"
+
+        p50_ttft = ledger_stats['p50_ttft']
+        st.write(
+            f"LLM Calls: {ledger_stats['calls']} recent, {ledger_stats['cache_hit_rate']*100:.0f}% from cache, "
+            f"{ledger_stats['fallback_rate']*100:.0f}% fell back"
+        )
+        st.caption(
+            f"Wall time p50 {ledger_stats['p50_wall_time']:.2f}s / p95 {ledger_stats['p95_wall_time']:.2f}s"
+            + (f", time to first token p50 {p50_ttft:.2f}s" if p50_ttft is not None else "")
+            + f"; {ledger_stats['prompt_tokens']:,} prompt + {ledger_stats['completion_tokens']:,} completion tokens. "
+            f"Tokens this session {budget(ledger_stats['session_tokens'], ledger_stats['session_token_budget'])}, "
+            f"process {budget(ledger_stats['process_tokens'], ledger_stats['process_token_budget'])}"
+        )
+        st.caption(" | ".join(
+            f"{call_type}: {row['calls']} calls, {row['tokens']:,} tokens, p95 {row['p95_wall_time']:.2f}s, "
+            f"{row['fallbacks']} fallbacks"
+            for call_type, row in ledger_stats['by_call_type'].items()
+        ))
+        if ledger_stats['fallback_reasons']:
+            st.caption("Fallbacks: " + ", ".join(
+                f"{reason} ({count})" for reason, count in ledger_stats['fallback_reasons'].items()
+            ))
+
     def run(self):
         """Main application flow"""
         st.title("FinTwin - Your AI Financial Advisor")
@@ -151,6 +370,14 @@ class FinTwinApp:
             "Navigation",
             ["Import Data", "Financial Health", "Simulation Playground", "Recommendations"]
         )
+        st.session_state.stream_responses = st.sidebar.toggle(
+            "Stream AI responses",
+            value=st.session_state.stream_responses,
+            help="Render analysis fields as soon as they arrive instead of waiting for the full response"
+        )
+        if st.session_state.financial_data and st.sidebar.button("Run Full Advisory Pass"):
+            self.run_advisory_pass()
+        self.adopt_background_forecast()
 
         if page == "Import Data":
             self.show_data_import()
@@ -161,6 +388,69 @@ class FinTwinApp:
         elif page == "Recommendations":
             self.show_recommendations()
 
+    def run_advisory_pass(self):
+        """Run the health analysis, recommendations and all simulations concurrently"""
+        try:
+            with st.spinner("Running full advisory pass..."):
+                st.session_state.advisory_results = self.advisory_engine.run(
+                    st.session_state.financial_data,
+                    st.session_state.predictions,
+                    st.session_state.simulations,
+                    session_id=st.session_state.session_id
+                )
+            results = st.session_state.advisory_results
+            st.sidebar.success(f"Advisory pass completed in {results['elapsed_seconds']:.1f}s")
+            if results['errors']:
+                st.sidebar.warning(
+                    f"{len(results['errors'])} advisory requests failed and will be retried on their pages: "
+                    f"{', '.join(results['errors'])}"
+                )
+        except Exception as e:
+            self.log_error(e, "Advisory Pass")
+            st.sidebar.error("The advisory pass failed. Please check the debug panel for more information.")
+
+    def start_background_analysis(self):
+        """Precompute the health analysis, recommendations and forecast for the current data"""
+        financial_data = st.session_state.financial_data
+        if not financial_data:
+            return
+        self.job_runner.submit(
+            st.session_state.session_id,
+            canonical_hash(financial_data),
+            analysis_steps(
+                self.financial_ai, self.forecaster,
+                # The job reads a copy, as the session's store keeps changing while it runs
+                {**financial_data, "monthly_expenses": financial_data["monthly_expenses"].copy()},
+                st.session_state.simulations,
+                session_id=st.session_state.session_id
+            )
+        )
+
+    def get_background_job(self):
+        """Return this session's background job if it was started for the current financial data"""
+        if not st.session_state.financial_data:
+            return None
+        return self.job_runner.job(st.session_state.session_id, canonical_hash(st.session_state.financial_data))
+
+    def adopt_background_forecast(self):
+        """Use the background forecast once it is ready, unless one was already computed"""
+        if st.session_state.predictions is None:
+            job = self.get_background_job()
+            if job and job.result('forecast'):
+                st.session_state.predictions = job.result('forecast')
+
+    def show_background_progress(self, job, step):
+        """Show how far the background job is while step has no result yet"""
+        if job and not job.finished and job.result(step) is None:
+            st.progress(job.progress, text=job.describe())
+
+    def get_advisory_results(self):
+        """Return the last advisory pass results if they match the current financial data"""
+        results = st.session_state.advisory_results
+        if results and results['data_key'] == canonical_hash(st.session_state.financial_data):
+            return results
+        return None
+
     def show_data_import(self):
         st.header("📊 Financial Data Management")
         st.markdown("""
@@ -189,11 +479,49 @@ class FinTwinApp:
             uploaded_file = st.file_uploader("Import Financial Data", type=["json"])
             if uploaded_file is not None:
                 self.import_financial_data(uploaded_file)
+
+            statement_file = st.file_uploader("Import Bank Statement", type=["csv", "ofx", "qfx"])
+            if statement_file is not None:
+                self.import_bank_statement(statement_file)
                 
         with col3:
             if st.button("Clear All Data", key="clear_button"):
                 self.clear_financial_data()
 
+        self.show_category_rules()
+
+    def get_categorizer(self):
+        """Categorizer for this session's expense categories and rules"""
+        return load_categorizer(
+            tuple(st.session_state.expense_categories),
+            tuple(tuple(rule) for rule in st.session_state.category_rules)
+        )
+
+    def show_category_rules(self):
+        """Edit the rules that file imported transactions under expense categories"""
+        with st.expander("Categorization Rules"):
+            st.caption(
+                "Imported transactions are filed by built-in merchant keywords, then by AI for unknown merchants. "
+                "Your rules take precedence: one per line as `keyword => Category` or `/regex/ => Category`. "
+                "Keywords match whole words; end one with `*` to match words starting with it. "
+                f"Categories: {', '.join(st.session_state.expense_categories)}."
+            )
+            text = st.text_area(
+                "Rules",
+                value="\n".join(f"{pattern} => {category}" for pattern, category in st.session_state.category_rules),
+                placeholder="blue bottle => Dining Out\n/^acme .*pet/ => Shopping"
+            )
+            if st.button("Save Rules"):
+                try:
+                    rules = parse_rules(text)
+                    # Compiling checks the patterns and categories before the rules are kept
+                    Categorizer(st.session_state.expense_categories, rules)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.category_rules = rules
+                    st.success(f"Saved {len(rules)} categorization rules.")
+
     def show_basic_financial_info(self):
         st.subheader("Basic Financial Information")
         
@@ -235,12 +563,9 @@ class FinTwinApp:
                 range(current_year - 2, current_year + 1)
             )
 
-        # Initialize month data if not exists
+        # Saved expenses of the month, or zeros until it is saved
         month_key = f"{selected_year}-{selected_month}"
-        if month_key not in st.session_state.monthly_expenses:
-            st.session_state.monthly_expenses[month_key] = {
-                category: 0.0 for category in st.session_state.expense_categories
-            }
+        saved_expenses = self.month_expenses(month_key)
 
         # Expense Input Form
         with st.form(f"expense_form_{month_key}"):
@@ -256,12 +581,14 @@ class FinTwinApp:
                     expense_data[category] = st.number_input(
                         f"{category} ($)",
                         min_value=0.0,
-                        value=float(st.session_state.monthly_expenses[month_key][category]),
+                        value=float(saved_expenses.get(category, 0.0)),
                         step=10.0
                     )
 
             if st.form_submit_button("Save Monthly Expenses"):
-                st.session_state.monthly_expenses[month_key] = expense_data
+                # financial_data holds this same store, so the saved month is already part of it
+                st.session_state.expense_store.set_month(month_key, expense_data)
+                self.start_background_analysis()
                 st.success(f"Expenses for {selected_month} {selected_year} saved successfully!")
 
         # Display Monthly Summary
@@ -272,10 +599,16 @@ class FinTwinApp:
         st.markdown("#### Expense History")
         self.show_expense_history()
 
+    def month_expenses(self, month_key):
+        """Saved {category: amount} of month_key, or zeros for every category if it has none"""
+        saved = st.session_state.expense_store.month(month_key)
+        if saved is None:
+            return {category: 0.0 for category in st.session_state.expense_categories}
+        return saved
+
     def show_monthly_summary(self, month_key):
-        if month_key in st.session_state.monthly_expenses:
-            expenses = st.session_state.monthly_expenses[month_key]
-            
+        expenses = self.month_expenses(month_key)
+        if expenses:
             # Create summary metrics
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -304,30 +637,20 @@ class FinTwinApp:
                 st.plotly_chart(fig_bar, use_container_width=True)
 
     def show_expense_history(self):
-        if not st.session_state.monthly_expenses:
+        store = st.session_state.expense_store
+        if not len(store):
             st.info("No expense history available. Start by adding expenses for any month.")
             return
 
-        # Create a DataFrame for all expenses
-        expense_history = []
-        for month_key, expenses in st.session_state.monthly_expenses.items():
-            year, month = month_key.split('-')
-            for category, amount in expenses.items():
-                expense_history.append({
-                    'Year': year,
-                    'Month': month,
-                    'Category': category,
-                    'Amount': amount
-                })
-        
-        df = pd.DataFrame(expense_history)
+        # Months x categories view of the store, shared by both charts
+        expenses = store.frame()
         
         # Create time series visualization
-        fig_timeline = self.data_processor.create_expense_timeline(df)
+        fig_timeline = self.data_processor.create_expense_timeline(expenses)
         st.plotly_chart(fig_timeline, use_container_width=True)
         
         # Create category-wise trend visualization
-        fig_trend = self.data_processor.create_category_trends(df)
+        fig_trend = self.data_processor.create_category_trends(expenses)
         st.plotly_chart(fig_trend, use_container_width=True)
 
     def show_financial_health(self):
@@ -338,32 +661,81 @@ class FinTwinApp:
             return
 
         try:
+            # Reserve slots so each field can render as soon as it arrives
+            col1, col2, col3 = st.columns(3)
+            slots = {
+                'health_score': col1.empty(),
+                'risk_level': col2.empty(),
+                'savings_projection': col3.empty()
+            }
+            st.subheader("Analysis")
+            slots['analysis'] = st.empty()
+
+            advisory_results = self.get_advisory_results()
+            job = self.get_background_job()
+            precomputed = (
+                (advisory_results or {}).get('financial_health')
+                or (job.result('financial_health') if job else None)
+            )
+            if not precomputed:
+                # Instant local score (from the expense store's running aggregates)
+                # while the AI analysis is requested
+                self.render_health_fields(
+                    self.financial_ai.local_health_analysis(st.session_state.financial_data),
+                    slots
+                )
+                self.show_background_progress(job, 'financial_health')
             with st.spinner("Analyzing your financial health..."):
-                # Get analysis from the AI agent
-                analysis = self.financial_ai.analyze_financial_health(st.session_state.financial_data)
-                
-                # Display health score
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Health Score", f"{analysis['health_score']:.1f}/100")
-                with col2:
-                    st.metric("Risk Level", analysis['risk_level'])
-                with col3:
-                    st.metric("Projected Savings", f"${analysis['savings_projection']:,.2f}")
-
-                # Display analysis text
-                st.subheader("Analysis")
-                st.write(analysis['analysis'])
+                # Get analysis from the AI agent; a request still running in the
+                # background is joined rather than sent again
+                if precomputed:
+                    analysis = precomputed
+                    self.render_health_fields(analysis, slots)
+                elif st.session_state.stream_responses:
+                    analysis = {}
+                    for analysis in self.financial_ai.stream_financial_health(
+                        st.session_state.financial_data, session_id=st.session_state.session_id
+                    ):
+                        self.render_health_fields(analysis, slots)
+                else:
+                    analysis = self.financial_ai.analyze_financial_health(
+                        st.session_state.financial_data, session_id=st.session_state.session_id
+                    )
+                    self.render_health_fields(analysis, slots)
 
                 # Display visualization if available
                 if analysis.get('visualization'):
                     st.subheader("Visual Representation")
                     self.svg_converter.display_svg(analysis['visualization'])
 
+            self.show_expense_forecast()
+
         except Exception as e:
             self.log_error(e, "Financial Health Analysis")
             st.error("An error occurred while analyzing your financial health. Please check the debug panel for more information.")
 
+    def show_expense_forecast(self):
+        """Forecast each expense category and chart the resulting projections"""
+        st.subheader("Expense Forecast")
+        if st.button("Forecast Expenses"):
+            with st.spinner("Forecasting expenses..."):
+                st.session_state.predictions = self.forecaster.forecast(st.session_state.financial_data)
+
+        if st.session_state.predictions:
+            fig_projection = self.data_processor.create_projection_chart(st.session_state.predictions)
+            st.plotly_chart(fig_projection, use_container_width=True)
+
+    def render_health_fields(self, analysis, slots):
+        """Render whichever health analysis fields are present into their slots"""
+        if isinstance(analysis.get('health_score'), (int, float)):
+            slots['health_score'].metric("Health Score", f"{analysis['health_score']:.1f}/100")
+        if analysis.get('risk_level'):
+            slots['risk_level'].metric("Risk Level", analysis['risk_level'])
+        if isinstance(analysis.get('savings_projection'), (int, float)):
+            slots['savings_projection'].metric("Projected Savings", f"${analysis['savings_projection']:,.2f}")
+        if analysis.get('analysis'):
+            slots['analysis'].write(analysis['analysis'])
+
     def show_simulation_playground(self):
         st.header("Simulation Playground")
         
@@ -392,10 +764,13 @@ class FinTwinApp:
 
     def simulate_expense_reduction(self):
         st.subheader("Expense Reduction Simulation")
-        
+
+        # Every category x percentage is evaluated locally in one pass
+        surface = self.financial_ai.sweep_scenario(st.session_state.financial_data, "expense_reduction")
+
         expense_type = st.selectbox(
             "Select Expense Category",
-            ["Housing", "Transportation", "Food", "Entertainment", "Utilities", "Other"]
+            surface['rows']
         )
         
         reduction_percentage = st.slider(
@@ -405,20 +780,37 @@ class FinTwinApp:
             value=20,
             step=5
         )
+        self.show_sweep_surface(surface, expense_type, reduction_percentage)
 
         if st.button("Run Simulation"):
-            parameters = {
-                "expense_type": expense_type,
-                "reduction_percentage": reduction_percentage
-            }
-            
-            simulation_result = self.financial_ai.simulate_scenario(
+            # Only the chosen point goes to the AI for a narrative
+            simulation_result = self.financial_ai.sweep_scenario(
                 st.session_state.financial_data,
                 "expense_reduction",
-                parameters
-            )
+                narrate_point=(expense_type, reduction_percentage),
+                session_id=st.session_state.session_id
+            )['narrative']
             
             self.display_simulation_results(simulation_result)
+        else:
+            self.show_precomputed_simulation("expense_reduction")
+
+    def show_sweep_surface(self, surface, row, selected_value):
+        """Chart a scenario's response surface and summarize its break-even and goal points"""
+        fig_sweep = self.data_processor.create_sweep_chart(surface, row, selected_value)
+        st.plotly_chart(fig_sweep, use_container_width=True)
+
+        r = surface['rows'].index(row)
+        i = surface['values'].index(float(selected_value))
+        break_even = surface['break_even'][row]
+        goal = surface['goal']['points'][row]
+        st.caption(
+            f"At {selected_value}%: ${surface['metrics']['monthly_change'][r][i]:,.2f} more per month, "
+            f"health score {surface['metrics']['health_score'][r][i]:.1f}. "
+            + (f"Break-even at {break_even:.0f}%. " if break_even is not None else "No break-even within range. ")
+            + (f"{surface['goal']['target']:.0%} savings rate reached at {goal:.0f}%." if goal is not None
+               else f"{surface['goal']['target']:.0%} savings rate not reached within range.")
+        )
 
     def simulate_income_increase(self):
         st.subheader("Income Increase Simulation")
@@ -430,19 +822,21 @@ class FinTwinApp:
             value=10,
             step=5
         )
+        surface = self.financial_ai.sweep_scenario(st.session_state.financial_data, "income_increase")
+        self.show_sweep_surface(surface, "Income", increase_percentage)
 
         if st.button("Run Simulation"):
-            parameters = {
-                "increase_percentage": increase_percentage
-            }
-            
-            simulation_result = self.financial_ai.simulate_scenario(
+            # Only the chosen point goes to the AI for a narrative
+            simulation_result = self.financial_ai.sweep_scenario(
                 st.session_state.financial_data,
                 "income_increase",
-                parameters
-            )
+                narrate_point=("Income", increase_percentage),
+                session_id=st.session_state.session_id
+            )['narrative']
             
             self.display_simulation_results(simulation_result)
+        else:
+            self.show_precomputed_simulation("income_increase")
 
     def simulate_loan(self):
         st.subheader("Loan Analysis Simulation")
@@ -455,21 +849,66 @@ class FinTwinApp:
             interest_rate = st.number_input("Interest Rate (%)", min_value=0.0, max_value=30.0, step=0.1)
             purpose = st.selectbox("Loan Purpose", ["Home", "Education", "Business", "Personal"])
 
+        with st.expander("Extra Payments and Refinancing"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                extra_payment = st.number_input("Extra Monthly Payment ($)", min_value=0, step=50)
+            with col2:
+                refinance_month = st.number_input("Refinance After (months, 0 = never)", min_value=0, max_value=359, step=12)
+            with col3:
+                refinance_rate = st.number_input("Refinance Rate (%)", min_value=0.0, max_value=30.0, step=0.1)
+        refinance = [{"month": refinance_month, "annual_rate": refinance_rate}] if refinance_month else None
+
+        self.show_loan_sensitivity(amount, interest_rate, extra_payment, refinance)
+
         if st.button("Run Simulation"):
             parameters = {
                 "amount": amount,
                 "term": term,
                 "interest_rate": interest_rate,
-                "purpose": purpose
+                "purpose": purpose,
+                "extra_payment": extra_payment,
+                "refinance": refinance
             }
             
             simulation_result = self.financial_ai.simulate_scenario(
                 st.session_state.financial_data,
                 "loan",
-                parameters
+                parameters,
+                session_id=st.session_state.session_id
             )
             
             self.display_simulation_results(simulation_result)
+        else:
+            self.show_precomputed_simulation("loan")
+
+    def show_loan_sensitivity(self, amount, interest_rate, extra_payment, refinance):
+        """Show affordability of the loan across nearby rates and terms, computed locally"""
+        from amortization import AFFORDABLE_PAYMENT_RATIO, DEFAULT_AMOUNT_FACTORS, sensitivity_grid
+
+        income = (st.session_state.financial_data.get('basic_info') or {}).get('income') or None
+        surface = sensitivity_grid(amount, interest_rate, monthly_income=income,
+                                   extra_payment=extra_payment, refinance=refinance)
+        selected = DEFAULT_AMOUNT_FACTORS.index(1.0)
+
+        if income:
+            fig_sensitivity = self.data_processor.create_sensitivity_heatmap(
+                surface['payment_to_income'][selected], surface['rates'], surface['terms'],
+                f"Payment as Share of Income for ${amount:,.0f}", value_format='.0%'
+            )
+        else:
+            fig_sensitivity = self.data_processor.create_sensitivity_heatmap(
+                surface['monthly_payment'][selected], surface['rates'], surface['terms'],
+                f"Monthly Payment for ${amount:,.0f}"
+            )
+        st.plotly_chart(fig_sensitivity, use_container_width=True)
+
+        if income:
+            options = len(surface['rates']) * len(surface['terms'])
+            st.caption(" | ".join(
+                f"${loan_amount:,.0f}: {sum(map(sum, affordable))}/{options} options affordable"
+                for loan_amount, affordable in zip(surface['amounts'], surface['affordable'])
+            ) + f" (payment at most {AFFORDABLE_PAYMENT_RATIO:.0%} of income)")
 
     def simulate_investment(self):
         st.subheader("Investment Strategy Simulation")
@@ -478,25 +917,41 @@ class FinTwinApp:
         with col1:
             amount = st.number_input("Investment Amount ($)", min_value=1000, step=1000)
             duration = st.number_input("Investment Duration (years)", min_value=1, max_value=30, step=1)
+            monthly_contribution = st.number_input("Monthly Contribution ($)", min_value=0, step=100)
         with col2:
             risk_level = st.selectbox("Risk Level", ["Low", "Moderate", "High"])
             strategy = st.selectbox("Investment Strategy", ["Growth", "Value", "Income", "Balanced"])
+            goal = st.number_input("Target Amount ($, optional)", min_value=0, step=1000)
 
         if st.button("Run Simulation"):
             parameters = {
                 "amount": amount,
                 "duration": duration,
                 "risk_level": risk_level,
-                "strategy": strategy
+                "strategy": strategy,
+                "monthly_contribution": monthly_contribution,
+                "goal": goal
             }
             
             simulation_result = self.financial_ai.simulate_scenario(
                 st.session_state.financial_data,
                 "investment",
-                parameters
+                parameters,
+                session_id=st.session_state.session_id
             )
             
             self.display_simulation_results(simulation_result)
+        else:
+            self.show_precomputed_simulation("investment")
+
+    def show_precomputed_simulation(self, scenario_type):
+        """Display the advisory pass result for a scenario, if one is available"""
+        advisory_results = self.get_advisory_results()
+        if not advisory_results or scenario_type not in advisory_results['simulations']:
+            return
+        simulation = advisory_results['simulations'][scenario_type]
+        st.caption(f"Precomputed by the last advisory pass with parameters: {json.dumps(simulation['parameters'])}")
+        self.display_simulation_results(simulation['result'])
 
     def display_simulation_results(self, simulation_result):
         if not simulation_result:
@@ -520,6 +975,11 @@ class FinTwinApp:
             for col, (label, value) in zip(cols, metrics.items()):
                 col.metric(label, value)
 
+        # Display the simulated outcome distribution if available
+        if simulation_result.get('distribution'):
+            fig_bands = self.data_processor.create_percentile_band_chart(simulation_result['distribution'])
+            st.plotly_chart(fig_bands, use_container_width=True)
+
     def show_recommendations(self):
         st.header("AI Recommendations")
         
@@ -528,13 +988,42 @@ class FinTwinApp:
             return
 
         # Get recommendations from the AI agent
-        recommendations = self.financial_ai.generate_recommendations(
+        args = (
             st.session_state.financial_data,
             st.session_state.predictions if 'predictions' in st.session_state else None,
             st.session_state.simulations if 'simulations' in st.session_state else None
         )
+        advisory_results = self.get_advisory_results()
+        job = self.get_background_job()
+        precomputed = (
+            (advisory_results or {}).get('recommendations')
+            or (job.result('recommendations') if job else None)
+        )
+        if not precomputed:
+            self.show_background_progress(job, 'recommendations')
+        if precomputed:
+            self.render_recommendations(precomputed)
+        elif st.session_state.stream_responses:
+            # Re-render as each category completes; the final item may be the fallback
+            slot = st.empty()
+            for recommendations in self.financial_ai.stream_recommendations(*args, session_id=st.session_state.session_id):
+                with slot.container():
+                    self.render_recommendations(recommendations)
+        else:
+            recommendations = self.financial_ai.generate_recommendations(*args, session_id=st.session_state.session_id)
+            self.render_recommendations(recommendations)
+
+        # Add action buttons
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Apply Recommendations"):
+                st.success("Recommendations applied to your financial plan!")
+        with col2:
+            if st.button("Generate More Recommendations"):
+                st.info("New recommendations generated based on your latest data.")
 
-        # Display recommendations by category
+    def render_recommendations(self, recommendations):
+        """Display recommendations by category"""
         for category, recs in recommendations.items():
             st.subheader(category.title())
             for rec in recs:
@@ -550,38 +1039,26 @@ class FinTwinApp:
             
             st.markdown("---")
 
-        # Add action buttons
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("Apply Recommendations"):
-                st.success("Recommendations applied to your financial plan!")
-        with col2:
-            if st.button("Generate More Recommendations"):
-                st.info("New recommendations generated based on your latest data.")
-
     def export_financial_data(self):
         """Export all financial data to a JSON file."""
         if not st.session_state.user_data:
             st.warning("Please input your basic financial information first!")
             return
             
-        if not st.session_state.monthly_expenses:
+        if not len(st.session_state.expense_store):
             st.warning("Please add some monthly expenses first!")
             return
             
-        # Create data processor instance
-        data_processor = DataProcessor()
-        
         # Generate detailed financial analysis
-        financial_analysis = data_processor.generate_financial_analysis(
+        financial_analysis = self.data_processor.generate_financial_analysis(
             st.session_state.user_data, 
-            st.session_state.monthly_expenses
+            st.session_state.expense_store
         )
         
         # Prepare data for export
         export_data = {
             "basic_info": st.session_state.user_data,
-            "monthly_expenses": st.session_state.monthly_expenses,
+            "monthly_expenses": st.session_state.expense_store.to_monthly_expenses(),
             "financial_analysis": financial_analysis,
             "export_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "version": "1.0"
@@ -650,15 +1127,19 @@ class FinTwinApp:
                 return
                 
             # Update session state with imported data
+            store = ExpenseStore.from_monthly_expenses(import_data["monthly_expenses"])
             st.session_state.user_data = import_data["basic_info"]
-            st.session_state.monthly_expenses = import_data["monthly_expenses"]
+            st.session_state.expense_store = store
+            st.session_state.transaction_hashes = TransactionHashes()
             
             # Create a consolidated financial_data structure
             st.session_state.financial_data = {
                 "basic_info": import_data["basic_info"],
-                "monthly_expenses": import_data["monthly_expenses"],
+                "monthly_expenses": store,
                 "analysis": import_data.get("financial_analysis", {})
             }
+            st.session_state.predictions = None
+            self.start_background_analysis()
             
             st.success("Financial data imported successfully!")
             
@@ -675,8 +1156,8 @@ class FinTwinApp:
                 # Monthly expenses summary
                 st.subheader("Monthly Expenses")
                 st.json({
-                    "months_with_expenses": len(import_data["monthly_expenses"]),
-                    "total_expenses": sum(sum(expenses.values()) for expenses in import_data["monthly_expenses"].values())
+                    "months_with_expenses": store.aggregates.month_count,
+                    "total_expenses": store.aggregates.total
                 })
                 
                 # Display financial analysis if available
@@ -724,12 +1205,61 @@ class FinTwinApp:
             self.log_error(e, "Data Import")
             st.error(f"Error importing data: {str(e)}")
 
+    def import_bank_statement(self, statement_file):
+        """Add the spending in a CSV or OFX bank statement to the expense history."""
+        # Streamlit hands back the same upload on every rerun; import each file once
+        upload_id = getattr(statement_file, 'file_id', None) or f"{statement_file.name}:{statement_file.size}"
+        if upload_id in st.session_state.imported_statements:
+            return
+        if upload_id in st.session_state.failed_statements:
+            # A statement that failed to parse changed nothing; show the error rather than retrying it
+            st.error(f"Error importing statement: {st.session_state.failed_statements[upload_id]}")
+            return
+        try:
+            with st.spinner("Importing statement..."):
+                result = self.statement_importer.import_statement(
+                    statement_file, st.session_state.expense_store, st.session_state.transaction_hashes,
+                    categorize=functools.partial(
+                        self.get_categorizer().categorize, session_id=st.session_state.session_id
+                    )
+                )
+            st.session_state.imported_statements.add(upload_id)
+
+            if result.imported:
+                basic_info = (st.session_state.financial_data or {}).get("basic_info") or st.session_state.user_data
+                if basic_info:
+                    st.session_state.financial_data = {
+                        **(st.session_state.financial_data or {"analysis": {}}),
+                        "basic_info": basic_info,
+                        "monthly_expenses": st.session_state.expense_store
+                    }
+                    st.session_state.predictions = None
+                    self.start_background_analysis()
+
+            st.success(
+                f"Imported {result.imported:,} transactions from {statement_file.name} "
+                f"({result.duplicates:,} already imported, {result.invalid:,} unreadable)."
+            )
+            with st.expander("Statement Import Summary"):
+                st.json(result.as_dict())
+
+        except Exception as e:
+            self.log_error(e, "Statement Import")
+            st.session_state.failed_statements[upload_id] = str(e)
+            st.error(f"Error importing statement: {str(e)}")
+
     def clear_financial_data(self):
         """Clear all financial data from the session state."""
         if st.checkbox("I understand that this will permanently delete all my financial data"):
             st.session_state.user_data = None
-            st.session_state.monthly_expenses = {}
+            st.session_state.expense_store = ExpenseStore()
+            st.session_state.transaction_hashes = TransactionHashes()
+            st.session_state.imported_statements = set()
+            st.session_state.failed_statements = {}
             st.session_state.financial_data = None
+            st.session_state.advisory_results = None
+            st.session_state.predictions = None
+            self.job_runner.cancel(st.session_state.session_id)
             st.success("All financial data has been cleared.")
 
 if __name__ == "__main__":
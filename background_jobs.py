@@ -0,0 +1,219 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A session's precomputation: named steps run in order, with progress and cancellation.
+
+    Each step is a callable receiving the results of the steps before it, so
+    later steps can build on earlier ones (e.g. recommendations on the
+    forecast). Results are available per step as soon as that step finishes.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, session_id, data_key, steps):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.data_key = data_key
+        self.steps = list(steps)
+        self.status = self.QUEUED
+        self.current_step = None
+        self.results = {}
+        self.errors = {}
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def step_names(self):
+        return [name for name, _ in self.steps]
+
+    @property
+    def progress(self):
+        """Fraction of steps finished (successfully or not)"""
+        return (len(self.results) + len(self.errors)) / len(self.steps) if self.steps else 1.0
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED, self.CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop the job before its next step; a step already running completes but its result is dropped"""
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.status = self.CANCELLED
+            self.finished_at = time.time()
+
+    def result(self, step):
+        return self.results.get(step)
+
+    def run(self):
+        self.status = self.RUNNING
+        for name, step in self.steps:
+            if self.cancelled:
+                break
+            self.current_step = name
+            try:
+                result = step(dict(self.results))
+            except Exception as e:
+                logger.warning("Background step %s failed: %s", name, e)
+                self.errors[name] = str(e)
+                continue
+            if self.cancelled:
+                break
+            self.results[name] = result
+        self.current_step = None
+        if self.cancelled:
+            self.status = self.CANCELLED
+        else:
+            self.status = self.FAILED if self.errors else self.DONE
+        self.finished_at = time.time()
+        return self.results
+
+    def describe(self):
+        """Short progress line for the UI"""
+        done = len(self.results) + len(self.errors)
+        if self.status == self.RUNNING and self.current_step:
+            return f"Preparing {self.current_step.replace('_', ' ')} ({done}/{len(self.steps)} done)"
+        return f"{self.status.title()} ({done}/{len(self.steps)} steps)"
+
+
+class BackgroundJobRunner:
+    """Process-wide thread pool running one precomputation job per session.
+
+    Submitting a job for a session supersedes (cancels) that session's
+    previous job unless it was for the same data, in which case the existing
+    job is returned, so Streamlit reruns never queue duplicates. Only the
+    most recent job per session is kept, for at most max_sessions sessions.
+    """
+
+    def __init__(self, max_workers=4, max_sessions=1000):
+        self.max_workers = max_workers
+        self.max_sessions = max_sessions
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'reused': 0, 'superseded': 0, 'completed': 0, 'failed': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a runner configured from FINTWIN_BACKGROUND_* environment variables"""
+        return cls(
+            max_workers=int(os.getenv('FINTWIN_BACKGROUND_WORKERS', 4)),
+            max_sessions=int(os.getenv('FINTWIN_BACKGROUND_MAX_SESSIONS', 1000))
+        )
+
+    def submit(self, session_id, data_key, steps):
+        """Start steps for session_id's data_key, superseding the session's older job"""
+        with self._lock:
+            previous = self._jobs.get(session_id)
+            if previous is not None and previous.data_key == data_key and previous.status != Job.CANCELLED:
+                self._stats['reused'] += 1
+                return previous
+            if previous is not None and not previous.finished:
+                previous.cancel()
+                self._stats['superseded'] += 1
+
+            job = Job(session_id, data_key, steps)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fintwin-bg')
+            job.future = self._executor.submit(job.run)
+            job.future.add_done_callback(lambda future, job=job: self._finished(job))
+            self._jobs[session_id] = job
+            self._jobs.move_to_end(session_id)
+            self._stats['submitted'] += 1
+            self._evict()
+            return job
+
+    def _finished(self, job):
+        with self._lock:
+            if job.status == Job.DONE:
+                self._stats['completed'] += 1
+            elif job.status == Job.FAILED:
+                self._stats['failed'] += 1
+
+    def _evict(self):
+        """Drop the least recently submitted sessions' finished jobs beyond max_sessions"""
+        for session_id in list(self._jobs):
+            if len(self._jobs) <= self.max_sessions:
+                break
+            if self._jobs[session_id].finished:
+                del self._jobs[session_id]
+
+    def job(self, session_id, data_key=None):
+        """The session's latest job, or None (also None if it is for other data than data_key)"""
+        with self._lock:
+            job = self._jobs.get(session_id)
+        if job is None or (data_key is not None and job.data_key != data_key):
+            return None
+        return job
+
+    def cancel(self, session_id):
+        """Cancel and forget the session's job"""
+        with self._lock:
+            job = self._jobs.pop(session_id, None)
+        if job is not None and not job.finished:
+            job.cancel()
+
+    def close(self):
+        """Cancel queued jobs and shut down the worker threads"""
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.finished:
+                    job.cancel()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Return job counts by status and submission outcomes"""
+        with self._lock:
+            stats = dict(self._stats)
+            jobs = list(self._jobs.values())
+        stats['sessions'] = len(jobs)
+        stats['running'] = sum(1 for job in jobs if job.status == Job.RUNNING)
+        stats['queued'] = sum(1 for job in jobs if job.status == Job.QUEUED)
+        stats['workers'] = self.max_workers if self._executor is not None else 0
+        return stats
+
+
+def analysis_steps(financial_ai, forecaster, financial_data, simulations=None, session_id=None):
+    """Steps precomputing what the Financial Health and Recommendations pages request.
+
+    The calls match the pages' own (same payloads, so the same response cache
+    keys), are admitted at BACKGROUND priority and are recorded in the LLM
+    ledger under session_id. Recommendations run after the forecast because
+    the page sends the forecast along with them. A failed LLM call raises
+    rather than returning the fallback, so it lands in the job's errors and
+    the page asks again instead of showing the fallback as precomputed.
+    """
+    simulations = simulations or {}
+    return [
+        ('forecast', lambda results: forecaster.forecast(financial_data)),
+        ('financial_health', lambda results: financial_ai.analyze_financial_health(
+            financial_data, priority=BACKGROUND, session_id=session_id, fallback=False
+        )),
+        ('recommendations', lambda results: financial_ai.generate_recommendations(
+            financial_data, results.get('forecast'), simulations, priority=BACKGROUND, session_id=session_id,
+            fallback=False
+        ))
+    ]
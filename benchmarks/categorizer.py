@@ -0,0 +1,113 @@
+"""Throughput benchmark for transaction auto-categorization.
+
+Builds --rows synthetic bank descriptions ('POS PURCHASE STARBUCKS #4821
+SEATTLE WA', ...) drawn from known merchants and --unknown-merchants
+merchants no rule covers, then categorizes them in --chunk-rows chunks
+(as the statement importer does) with a cold and then a warm merchant
+cache. Unmatched merchants go to an in-process LLM stand-in that answers
+instantly, so only the batching is measured. Also reports the rule
+matcher alone on --distinct all-distinct merchant keys (the worst case for
+the cache). Fails (exit code 1) if the cold pass is slower than
+--min-per-minute descriptions.
+
+Usage:
+    python benchmarks/categorizer.py [--rows 2000000] [--chunk-rows 100000] [--distinct 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from categorizer import Categorizer  # noqa: E402
+
+CATEGORIES = [
+    "Rent/Mortgage", "Utilities", "Groceries", "Transportation", "Entertainment", "Healthcare", "Insurance",
+    "Education", "Shopping", "Dining Out", "Travel", "Other"
+]
+MERCHANTS = [
+    'STARBUCKS', 'WHOLE FOODS MARKET', 'SHELL OIL', 'AMAZON MKTPLACE PMTS', 'NETFLIX.COM', 'CVS/PHARMACY',
+    'UBER *TRIP', 'UBER *EATS', 'DELTA AIR LINES', 'CITY WATER UTIL', 'GEICO *AUTO', 'RENT PAYMENT',
+    "TRADER JOE'S", 'CHIPOTLE', 'APPLE.COM/BILL', 'COMCAST CABLE', 'TARGET', 'WALGREENS', 'LYFT *RIDE',
+    'MARRIOTT HOTELS', 'SPOTIFY USA', 'KROGER', 'HOME DEPOT', 'DOORDASH*', 'STATE FARM INSURANCE'
+]
+PREFIXES = ['', 'POS PURCHASE ', 'DEBIT CARD PURCHASE ', 'SQ *', 'RECURRING PMT ', 'ACH DEBIT ']
+CITIES = ['SEATTLE WA', 'AUSTIN TX', 'NEW YORK NY', 'CHICAGO IL', 'DENVER CO', 'BOSTON MA', '']
+SYLLABLES = ['ka', 'lo', 'mi', 'zu', 're', 'tan', 'vor', 'pel', 'dri', 'qua', 'nox', 'bel']
+
+
+def invented_names(count, rng):
+    """count merchant names made of random syllables, which no keyword matches"""
+    parts = rng.choice(SYLLABLES, size=(count, 4))
+    return [''.join(row[:2]).upper() + ' ' + ''.join(row[2:]).upper() + ' LLC' for row in parts]
+
+
+def descriptions(rows, unknown_merchants, rng):
+    merchants = np.array(MERCHANTS + invented_names(unknown_merchants, rng), dtype=object)
+    # Known merchants make up most of the spending
+    weights = np.concatenate([np.full(len(MERCHANTS), 9.0), np.ones(unknown_merchants)])
+    picks = merchants[rng.choice(len(merchants), rows, p=weights / weights.sum())]
+    prefixes = np.array(PREFIXES, dtype=object)[rng.integers(0, len(PREFIXES), rows)]
+    stores = np.char.mod('#%04d ', rng.integers(0, 10_000, rows)).astype(object)
+    cities = np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), rows)]
+    return pd.Series(prefixes + picks + ' ' + stores + cities, dtype=object)
+
+
+def run(categorizer, column, chunk_rows):
+    started = time.perf_counter()
+    for start in range(0, len(column), chunk_rows):
+        categorizer.categorize(column.iloc[start:start + chunk_rows])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000, help='descriptions to categorize')
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help='descriptions per categorize() call')
+    parser.add_argument('--unknown-merchants', type=int, default=2_000, help='merchants only the LLM can place')
+    parser.add_argument('--distinct', type=int, default=100_000, help='distinct merchant keys for the matcher run')
+    parser.add_argument('--min-per-minute', type=float, default=2_000_000, help='slowest acceptable cold pass')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    column = descriptions(args.rows, args.unknown_merchants, rng)
+    llm_batches = []
+
+    def llm(merchants, categories, session_id=None):
+        llm_batches.append(len(merchants))
+        return {merchant: 'Other' for merchant in merchants}
+
+    categorizer = Categorizer(CATEGORIES, llm=llm, llm_max_merchants=args.unknown_merchants)
+    cold = run(categorizer, column, args.chunk_rows)
+    warm = run(categorizer, column, args.chunk_rows)
+    stats = categorizer.stats()
+
+    keys = [f"{name} {word}" for name, word in zip(
+        invented_names(args.distinct, rng), rng.choice(['market', 'coffee', 'store', 'shop', 'co'], args.distinct)
+    )]
+    keys = [key.lower() for key in keys]
+    started = time.perf_counter()
+    matched = sum(categorizer.match(key) is not None for key in keys)
+    matcher = time.perf_counter() - started
+
+    print(f"{args.rows:,} descriptions ({column.nunique():,} distinct), chunks of {args.chunk_rows:,}")
+    for label, elapsed in (('cold cache', cold), ('warm cache', warm)):
+        print(f"{label:<11} {elapsed:6.2f} s  {args.rows / elapsed * 60:>14,.0f} descriptions/min")
+    print(
+        f"merchants: {stats['rule_matches']:,} by rules, {stats['llm_merchants']:,} by the LLM in "
+        f"{len(llm_batches)} batches, {stats['entries']:,} cached, cache hit rate {stats['hit_rate'] * 100:.0f}%"
+    )
+    print(
+        f"matcher alone: {args.distinct:,} distinct keys in {matcher:.2f} s "
+        f"({args.distinct / matcher * 60:,.0f} keys/min, {matched:,} matched)"
+    )
+    sys.exit(1 if args.rows / cold * 60 < args.min_per_minute else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Import-time benchmark guarding the cold-start budget of the AI modules.
+
+Runs ``python -X importtime`` in a fresh interpreter for each module, reports
+the cumulative import time, and fails (exit code 1) if a module exceeds its
+budget or pulls in a heavy dependency that must only load on first use.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 200] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules on the startup path and the heavy packages they must not import eagerly
+MODULES = ['financial_ai', 'advisory_engine']
+DEFERRED_PACKAGES = ['prophet', 'cmdstanpy', 'sklearn', 'pandas', 'openai', 'tiktoken']
+
+
+def measure(module):
+    """Import module (and construct FinancialAI) in a fresh interpreter; return (ms, imported packages)"""
+    code = f"import {module}"
+    if module == 'financial_ai':
+        code += "; financial_ai.FinancialAI()"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, 'FINTWIN_CACHE_DIR': ''}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000.0, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=200.0, help='maximum median import time per module')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per module')
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        samples = []
+        imported = set()
+        for _ in range(args.runs):
+            elapsed_ms, packages = measure(module)
+            samples.append(elapsed_ms)
+            imported |= packages
+        median = statistics.median(samples)
+        eager = sorted(imported & set(DEFERRED_PACKAGES))
+        status = 'ok'
+        if median > args.budget_ms:
+            status = f'OVER BUDGET ({args.budget_ms:.0f} ms)'
+            failed = True
+        if eager:
+            status = f'EAGER IMPORTS: {", ".join(eager)}'
+            failed = True
+        print(f"{module:<20} median {median:8.1f} ms  min {min(samples):8.1f} ms  max {max(samples):8.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Latency benchmark for the FinancialAI request path.
+
+Drives analyze_financial_health, simulate_scenario and generate_recommendations
+from a thread pool and reports p50/p95/p99 latency, throughput and the rate of
+fallback responses per call type, plus retry, timeout, queueing and
+coalescing stats. Use --profiles 1 to send identical concurrent requests.
+
+By default the calls go to an embedded stub server (see stub_server.py), so
+no API key or network is needed. Alternatively, point the benchmark at any
+OpenAI-compatible endpoint with --base-url, or record and replay real
+responses with --cassette and --record/--replay.
+
+Usage:
+    python benchmarks/llm_latency.py [--requests 60] [--concurrency 8] [--latency-ms 1500] [--error-rate 0.05]
+    python benchmarks/llm_latency.py --base-url https://api.openai.com/v1 --cassette cassettes/llm.json --record
+    python benchmarks/llm_latency.py --cassette cassettes/llm.json --replay [--replay-latency]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from stub_server import add_stub_arguments, config_from_args, start_stub_server  # noqa: E402
+
+CALL_TYPES = ('financial_health', 'simulation', 'recommendations')
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June']
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def user_profile(index):
+    """Distinct but realistic financial data for profile index"""
+    income = 4000 + 125 * index
+    return {
+        'basic_info': {'income': income, 'savings': 5000 + 300 * index, 'debt': 2000 + 50 * index},
+        'monthly_expenses': {
+            f"2024-{month}": {
+                'Rent/Mortgage': round(income * 0.3, 2),
+                'Groceries': 400 + 10 * m,
+                'Transportation': 150 + index % 7 * 10,
+                'Dining Out': 120 + 5 * m
+            }
+            for m, month in enumerate(MONTHS)
+        },
+        'analysis': {}
+    }
+
+
+class FallbackCounter:
+    """Count, per calling thread, whether the last call ended in a local fallback"""
+
+    def __init__(self, ai):
+        self._local = threading.local()
+        for name in ('_fallback_analysis', '_fallback_simulation', '_fallback_recommendations'):
+            setattr(ai, name, self._wrap(getattr(ai, name)))
+
+    def _wrap(self, method):
+        def wrapper(*args, **kwargs):
+            self._local.fell_back = True
+            return method(*args, **kwargs)
+        return wrapper
+
+    def reset(self):
+        self._local.fell_back = False
+
+    @property
+    def fell_back(self):
+        return getattr(self._local, 'fell_back', False)
+
+
+def build_client(args, base_url):
+    """OpenAI client for the benchmark, optionally going through the record/replay transport"""
+    import httpx
+    from openai import OpenAI
+
+    transport = None
+    http_client = None
+    if args.cassette:
+        from record_replay import RecordReplayTransport
+        transport = RecordReplayTransport(
+            args.cassette, mode='record' if args.record else 'replay', replay_latency=args.replay_latency
+        )
+        http_client = httpx.Client(transport=transport)
+    client = OpenAI(
+        api_key=os.getenv('OPENAI_API_KEY') or 'stub-key',
+        base_url=base_url,
+        max_retries=0,
+        http_client=http_client
+    )
+    return client, transport
+
+
+def run_call(ai, counter, call_type, data):
+    counter.reset()
+    started = time.perf_counter()
+    if call_type == 'financial_health':
+        ai.analyze_financial_health(data)
+    elif call_type == 'simulation':
+        ai.simulate_scenario(data, 'expense_reduction', {'expense_type': 'Groceries', 'reduction_percentage': 20})
+    else:
+        ai.generate_recommendations(data)
+    return call_type, time.perf_counter() - started, counter.fell_back
+
+
+def report(results, elapsed, extra):
+    summary = {'elapsed_seconds': round(elapsed, 2), 'throughput_rps': round(len(results) / elapsed, 2), 'calls': {}}
+    for call_type in CALL_TYPES + ('all',):
+        rows = [r for r in results if call_type == 'all' or r[0] == call_type]
+        if not rows:
+            continue
+        latencies = [r[1] for r in rows]
+        summary['calls'][call_type] = {
+            'count': len(rows),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies),
+            'fallback_rate': sum(r[2] for r in rows) / len(rows)
+        }
+    summary.update(extra)
+
+    print(f"{'call':<18}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}{'fallback':>10}")
+    for call_type, stats in summary['calls'].items():
+        print(
+            f"{call_type:<18}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}"
+            f"{stats['p99']:>9.3f}{stats['max']:>9.3f}{stats['fallback_rate']:>9.1%}"
+        )
+    print(f"\n{len(results)} calls in {elapsed:.1f}s ({summary['throughput_rps']} calls/s)")
+    for name, value in extra.items():
+        print(f"{name}: {value}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=60, help='total calls, spread evenly across call types')
+    parser.add_argument('--concurrency', type=int, default=8, help='calls in flight at once')
+    parser.add_argument('--profiles', type=int, default=None,
+                        help='distinct user profiles (default: one per call, so the response cache never hits)')
+    parser.add_argument('--base-url', help='OpenAI-compatible endpoint (default: embedded stub server)')
+    parser.add_argument('--cassette', help='record/replay cassette file')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--record', action='store_true', help='record responses into the cassette')
+    mode.add_argument('--replay', action='store_true', help='replay responses from the cassette (default with --cassette)')
+    parser.add_argument('--replay-latency', action='store_true', help='sleep for the recorded latency when replaying')
+    parser.add_argument('--reuse-threshold', type=float, default=0.0,
+                        help='recommendation reuse distance (default 0: every recommendation call reaches the API)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    # Keep benchmark runs out of the on-disk response cache
+    os.environ.setdefault('FINTWIN_CACHE_DIR', '')
+    os.environ.setdefault('FINTWIN_REC_INDEX_PATH', '')
+    os.environ['FINTWIN_REC_INDEX_THRESHOLD'] = str(args.reuse_threshold)
+    from financial_ai import FinancialAI
+
+    server = None
+    base_url = args.base_url
+    if not base_url and not (args.cassette and not args.record):
+        server = start_stub_server(config_from_args(args))
+        base_url = server.base_url
+
+    ai = FinancialAI()
+    ai.client, transport = build_client(args, base_url)
+    counter = FallbackCounter(ai)
+    profiles = args.profiles or args.requests
+    calls = [(CALL_TYPES[i % len(CALL_TYPES)], user_profile(i % profiles)) for i in range(args.requests)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda call: run_call(ai, counter, *call), calls))
+    elapsed = time.perf_counter() - started
+
+    resilience = ai.resilience.stats()
+    scheduler = ai.scheduler.stats()
+    extra = {
+        'retries': resilience['retries'],
+        'timeouts': resilience['timeouts'],
+        'hedges_fired': resilience['hedges_fired'],
+        'breaker_state': resilience['breaker']['state'],
+        'queue_p95_wait': round(scheduler['p95_wait'], 3),
+        'cache_hit_rate': round(ai.cache.stats()['hit_rate'], 3),
+        'coalesced': ai.single_flight.stats()['coalesced'],
+        'recommendations_reused': ai.recommendation_index.stats()['hits']
+    }
+    if server:
+        extra['stub_responses'] = dict(server.counts)
+        server.shutdown()
+    if transport:
+        extra['cassette'] = dict(transport.stats)
+        if args.record:
+            transport.save()
+
+    summary = report(results, elapsed, extra)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Latency benchmark for the Monte Carlo investment engine.
+
+Simulates every risk level and strategy combination at the longest horizon
+offered in the UI and fails (exit code 1) if the median time per request
+exceeds the budget.
+
+Usage:
+    python benchmarks/monte_carlo.py [--budget-ms 200] [--years 30] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monte_carlo import RISK_PROFILES, STRATEGY_ADJUSTMENTS, MonteCarloEngine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=200.0, help='maximum median time per simulation')
+    parser.add_argument('--years', type=float, default=30, help='investment horizon')
+    parser.add_argument('--runs', type=int, default=5, help='simulations per combination')
+    parser.add_argument('--paths', type=int, default=100_000, help='paths per simulation')
+    args = parser.parse_args()
+
+    engine = MonteCarloEngine(paths=args.paths)
+    # Warm up NumPy's allocator and ufunc dispatch
+    engine.simulate_strategy(10000, 1, 'Moderate', 'Balanced')
+
+    failed = False
+    for risk_level in RISK_PROFILES:
+        for strategy in STRATEGY_ADJUSTMENTS:
+            samples = [
+                engine.simulate_strategy(10000, args.years, risk_level, strategy, 500, 250000, seed=run)['elapsed_ms']
+                for run in range(args.runs)
+            ]
+            median = statistics.median(samples)
+            status = 'ok'
+            if median > args.budget_ms:
+                status = f'OVER BUDGET ({args.budget_ms:.0f} ms)'
+                failed = True
+            print(f"{risk_level:<9} {strategy:<9} median {median:7.1f} ms  max {max(samples):7.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
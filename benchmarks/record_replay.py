@@ -0,0 +1,138 @@
+"""Record/replay httpx transport for deterministic OpenAI benchmarks.
+
+In record mode every request is forwarded to the real transport and the
+response (status, headers, body and elapsed time) is saved to a JSON
+cassette. In replay mode responses are served from the cassette without
+touching the network, optionally sleeping for the recorded latency. Streamed
+(SSE) responses are recorded whole and replayed as the same event stream.
+
+Requests are matched on method, path and a canonical hash of the JSON body.
+The prompt's 'as_of' date is ignored so a cassette stays valid on later days.
+
+Usage:
+    transport = RecordReplayTransport('benchmarks/cassettes/llm.json', mode='record')
+    ai.client = OpenAI(api_key=..., http_client=httpx.Client(transport=transport), max_retries=0)
+    ...
+    transport.save()
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import canonical_hash  # noqa: E402
+
+# Prompt fields that change from day to day without changing the request
+VOLATILE_PATTERNS = [re.compile(r'(\\?"as_of\\?"\s*:\s*\\?")\d{4}-\d{2}-\d{2}')]
+
+# Response headers that must not be replayed verbatim
+SKIPPED_HEADERS = {'content-length', 'content-encoding', 'transfer-encoding', 'connection', 'date'}
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def request_key(request):
+    """Stable key for a request: method, path and canonical body hash"""
+    body = request.content.decode('utf-8', errors='replace')
+    for pattern in VOLATILE_PATTERNS:
+        body = pattern.sub(r'\1', body)
+    try:
+        body = json.loads(body)
+    except ValueError:
+        pass
+    return canonical_hash({'method': request.method, 'path': request.url.path, 'body': body})
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """httpx transport that records responses to, or replays them from, a cassette file"""
+
+    def __init__(self, path, mode='replay', transport=None, replay_latency=False):
+        if mode not in ('record', 'replay'):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._transport = transport or httpx.HTTPTransport()
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._positions = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+    def handle_request(self, request):
+        request.read()
+        key = request_key(request)
+        if self.mode == 'record':
+            return self._record(key, request)
+        return self._replay(key, request)
+
+    def _record(self, key, request):
+        started = time.perf_counter()
+        response = self._transport.handle_request(request)
+        body = response.read()
+        elapsed = time.perf_counter() - started
+        response.close()
+
+        entry = {
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS},
+            'body': body.decode('utf-8', errors='replace'),
+            'elapsed': elapsed
+        }
+        with self._lock:
+            # Repeated identical requests keep every response so retries replay in order
+            self._entries.setdefault(key, []).append(entry)
+            self.stats['recorded'] += 1
+        return self._build(entry, request)
+
+    def _replay(self, key, request):
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats['misses'] += 1
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url.path} ({key[:12]})")
+            position = self._positions.get(key, 0)
+            entry = entries[min(position, len(entries) - 1)]
+            self._positions[key] = position + 1
+            self.stats['replayed'] += 1
+        if self.replay_latency:
+            time.sleep(entry['elapsed'])
+        return self._build(entry, request)
+
+    @staticmethod
+    def _build(entry, request):
+        return httpx.Response(
+            entry['status'],
+            headers=entry['headers'],
+            content=entry['body'].encode('utf-8'),
+            request=request
+        )
+
+    def rewind(self):
+        """Replay every key from its first recorded response again"""
+        with self._lock:
+            self._positions.clear()
+
+    def save(self):
+        """Write the cassette (record mode) atomically"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self._transport.close()
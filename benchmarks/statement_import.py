@@ -0,0 +1,108 @@
+"""Throughput and memory benchmark for the streaming bank statement importer.
+
+Writes a synthetic CSV (or OFX) statement of --rows transactions to a
+temporary file, imports it twice (the second upload is entirely duplicates)
+and reports rows per second and peak resident memory. Fails (exit code 1)
+if the first import is slower than --min-rows-per-second or the repeat
+upload imports anything.
+
+Usage:
+    python benchmarks/statement_import.py [--rows 1000000] [--format csv] [--chunk-rows 100000]
+"""
+import argparse
+import importlib
+import os
+import resource
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expense_store import ExpenseStore  # noqa: E402
+from statement_import import StatementImporter, TransactionHashes  # noqa: E402
+
+MERCHANTS = np.array([
+    'STARBUCKS #1234', 'WHOLE FOODS MARKET', 'SHELL OIL 5521', 'AMAZON MKTPLACE', 'NETFLIX.COM',
+    'CVS PHARMACY', 'UBER TRIP', 'DELTA AIR LINES', 'CITY WATER UTIL', 'GEICO AUTO', 'RENT PAYMENT',
+    'TRADER JOES', 'CHIPOTLE 0032', 'APPLE.COM/BILL', 'COMCAST CABLE'
+])
+WRITE_BLOCK = 200_000
+# Slowest acceptable first import; an OFX transaction is about three times the bytes of a CSV row
+MIN_ROWS_PER_SECOND = {'csv': 250_000, 'ofx': 150_000}
+
+
+def write_statement(path, rows, fmt, seed=7):
+    """Write rows synthetic transactions spread over ten years"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2015-01-01')
+    with open(path, 'w') as f:
+        if fmt == 'csv':
+            f.write('Transaction Date,Description,Amount\n')
+        else:
+            f.write('OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n')
+        for offset in range(0, rows, WRITE_BLOCK):
+            count = min(WRITE_BLOCK, rows - offset)
+            days = np.sort(rng.integers(0, 3650, count)).astype('timedelta64[D]') + start
+            amounts = -np.round(rng.gamma(2.0, 30.0, count), 2)
+            amounts[rng.random(count) < 0.03] *= -20   # occasional deposits
+            merchants = MERCHANTS[rng.integers(0, len(MERCHANTS), count)]
+            if fmt == 'csv':
+                f.writelines(f"{d},{m},{a:.2f}\n" for d, m, a in zip(days.astype(str), merchants, amounts))
+            else:
+                compact = np.char.replace(days.astype(str), '-', '')
+                f.writelines(
+                    f"<STMTTRN><TRNTYPE>POS<DTPOSTED>{d}<TRNAMT>{a:.2f}<FITID>{offset + i}<NAME>{m}</STMTTRN>\n"
+                    for i, (d, m, a) in enumerate(zip(compact, merchants, amounts))
+                )
+        if fmt == 'ofx':
+            f.write('</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n')
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='transactions in the statement')
+    parser.add_argument('--format', choices=['csv', 'ofx'], default='csv')
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help='transactions per chunk')
+    parser.add_argument('--min-rows-per-second', type=float, help='slowest acceptable import (default by format)')
+    args = parser.parse_args()
+    min_rows_per_second = args.min_rows_per_second or MIN_ROWS_PER_SECOND[args.format]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'statement.{args.format}')
+        write_statement(path, args.rows, args.format)
+        size_mb = os.path.getsize(path) / 1e6
+        # Loaded before timing, as it is in the running app
+        importlib.import_module('pandas')
+        baseline = peak_rss_mb()
+
+        store = ExpenseStore()
+        seen = TransactionHashes()
+        importer = StatementImporter(chunk_rows=args.chunk_rows)
+        first = importer.import_statement(path, store, seen)
+        after_first = peak_rss_mb()
+        repeat = importer.import_statement(path, store, seen)
+
+    print(f"{args.rows:,} {args.format} rows ({size_mb:,.0f} MB), chunks of {args.chunk_rows:,}")
+    for label, result in (('first upload', first), ('repeat upload', repeat)):
+        print(
+            f"{label:<14} {result.elapsed:6.2f} s  {result.rows_per_second:>12,.0f} rows/s  "
+            f"imported {result.imported:,}, duplicates {result.duplicates:,}, invalid {result.invalid:,}"
+        )
+    print(
+        f"store: {len(store)} months x {len(store.categories)} categories; "
+        f"peak RSS {baseline:,.0f} MB before import, {after_first:,.0f} MB after, {peak_rss_mb():,.0f} MB at end "
+        f"(dedupe set {len(seen) * 8 / 1e6:,.0f} MB)"
+    )
+
+    failed = first.rows_per_second < min_rows_per_second or repeat.imported != 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""OpenAI-compatible stub server for offline latency benchmarking.
+
+Serves POST /v1/chat/completions with canned FinTwin-shaped JSON replies
+(health analysis, simulation, recommendations or merchant categories, picked
+from the request's instruction). Latency, streaming pace and failures are configurable:
+
+    - latency: log-normal with a given median and sigma (sigma 0 = fixed)
+    - streaming: SSE chunks with a time-to-first-token and per-chunk delay
+    - errors: a fraction of requests fail with 500, 429 (with Retry-After)
+      or hang past the client timeout
+
+Usage:
+    python benchmarks/stub_server.py [--port 8080] [--latency-ms 1500] [--error-rate 0.05]
+
+then point the app or benchmark at it with OPENAI_BASE_URL=http://127.0.0.1:8080/v1.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLIES = {
+    'financial_health': {
+        'health_score': 72.5,
+        'risk_level': 'Moderate',
+        'savings_projection': 18250.0,
+        'analysis': 'Spending is stable and below income, leaving a healthy monthly surplus. '
+                    'Debt is manageable, but the emergency fund covers less than three months of expenses.',
+        'visualization': None
+    },
+    'simulation': {
+        'impact': 'positive',
+        'analysis': 'The scenario improves monthly cash flow and shortens the time needed to reach your savings goal.',
+        'metrics': {'Monthly Impact': '$250.00', 'Annual Impact': '$3,000.00', 'Risk Change': 'Lower'},
+        'visualization': None
+    },
+    'recommendations': {
+        'savings': ['Automate a monthly transfer to a high-yield savings account'],
+        'investments': ['Increase retirement contributions to capture the full employer match'],
+        'debt': ['Pay down the highest-interest balance first']
+    }
+}
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 1500.0          # median total latency
+    latency_sigma: float = 0.4          # log-normal sigma (0 = fixed latency)
+    ttft_ms: float = 400.0              # median time to first token when streaming
+    chunk_chars: int = 24               # characters per streamed chunk
+    error_rate: float = 0.0             # fraction of requests answered with 500
+    rate_limit_rate: float = 0.0        # fraction answered with 429
+    retry_after: float = 1.0            # Retry-After seconds sent with 429s
+    hang_rate: float = 0.0              # fraction that sleep hang_seconds before answering
+    hang_seconds: float = 60.0
+    seed: int = 0
+
+
+def categorization_reply(content):
+    """File every requested merchant under 'Other' (or the last category offered)"""
+    try:
+        data = json.loads(content.rsplit('Data: ', 1)[1])
+    except (IndexError, ValueError):
+        return {'categories': {}}
+    categories = data.get('categories') or ['Other']
+    category = 'Other' if 'Other' in categories else categories[-1]
+    return {'categories': {merchant: category for merchant in data.get('merchants', [])}}
+
+
+def reply_for(messages):
+    """Pick the canned reply matching the request's instruction"""
+    content = messages[-1].get('content', '') if messages else ''
+    # Only look at the instruction, not the JSON data appended after it
+    instruction = content.split(':', 1)[0].lower()
+    if 'merchant' in instruction:
+        return categorization_reply(content)
+    if 'recommendation' in instruction:
+        return REPLIES['recommendations']
+    if 'simulate' in instruction:
+        return REPLIES['simulation']
+    return REPLIES['financial_health']
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+
+        outcome, latency = server.draw()
+        server.count(outcome)
+        if outcome == 'hang':
+            time.sleep(server.config.hang_seconds)
+        if outcome == 'rate_limited':
+            time.sleep(latency * 0.1)
+            return self._send_json(
+                429, {'error': {'message': 'Rate limit reached (stub)', 'type': 'rate_limit_error'}},
+                {'Retry-After': str(server.config.retry_after)}
+            )
+        if outcome == 'error':
+            time.sleep(latency * 0.5)
+            return self._send_json(500, {'error': {'message': 'Internal error (stub)', 'type': 'server_error'}})
+
+        content = json.dumps(reply_for(request.get('messages', [])))
+        model = request.get('model', 'stub-model')
+        if request.get('stream'):
+            self._stream(model, content, latency)
+        else:
+            time.sleep(latency)
+            prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+            completion_tokens = len(content) // 4
+            self._send_json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens
+                }
+            })
+
+    def _stream(self, model, content, latency):
+        config = self.server.config
+        chunks = [content[i:i + config.chunk_chars] for i in range(0, len(content), config.chunk_chars)]
+        ttft = min(self.server.sample(config.ttft_ms), latency)
+        per_chunk = max(latency - ttft, 0.0) / max(len(chunks), 1)
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(ttft)
+        try:
+            for i, piece in enumerate(chunks + [None]):
+                delta = {'content': piece} if piece is not None else {}
+                if i == 0:
+                    delta['role'] = 'assistant'
+                event = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': None if piece is not None else 'stop'}]
+                }
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                if piece is not None:
+                    time.sleep(per_chunk)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout or hedge cancelled)
+            pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub configuration, seeded RNG and counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config=None):
+        super().__init__(address, StubHandler)
+        self.config = config or StubConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.counts = {'ok': 0, 'error': 0, 'rate_limited': 0, 'hang': 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def sample(self, median_ms):
+        """Log-normal latency in seconds around median_ms"""
+        with self._lock:
+            factor = math.exp(self._random.gauss(0, self.config.latency_sigma)) if self.config.latency_sigma else 1.0
+        return median_ms * factor / 1000
+
+    def draw(self):
+        """Pick the outcome and total latency of the next request"""
+        config = self.config
+        with self._lock:
+            roll = self._random.random()
+        if roll < config.error_rate:
+            outcome = 'error'
+        elif roll < config.error_rate + config.rate_limit_rate:
+            outcome = 'rate_limited'
+        elif roll < config.error_rate + config.rate_limit_rate + config.hang_rate:
+            outcome = 'hang'
+        else:
+            outcome = 'ok'
+        return outcome, self.sample(config.latency_ms)
+
+    def count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+
+def start_stub_server(config=None, host='127.0.0.1', port=0):
+    """Start a stub server on a background thread; returns the server (see server.base_url)"""
+    server = StubServer((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, name='openai-stub', daemon=True)
+    thread.start()
+    return server
+
+
+def add_stub_arguments(parser):
+    """Register the StubConfig options on an argparse parser"""
+    defaults = StubConfig()
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms, help='median response latency')
+    parser.add_argument('--latency-sigma', type=float, default=defaults.latency_sigma, help='log-normal sigma of latency')
+    parser.add_argument('--ttft-ms', type=float, default=defaults.ttft_ms, help='median time to first streamed token')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='fraction of 500 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=defaults.rate_limit_rate, help='fraction of 429 responses')
+    parser.add_argument('--retry-after', type=float, default=defaults.retry_after, help='Retry-After sent with 429s')
+    parser.add_argument('--hang-rate', type=float, default=defaults.hang_rate, help='fraction of requests that hang')
+    parser.add_argument('--hang-seconds', type=float, default=defaults.hang_seconds, help='how long hanging requests sleep')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='seed for latency and error draws')
+
+
+def config_from_args(args):
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        ttft_ms=args.ttft_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), config_from_args(args))
+    print(f"OpenAI stub listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from statement_import import UNCATEGORIZED
+
+# Keywords of the predefined expense categories, in merchant-key form (lower-case
+# letters and single spaces). A keyword matches whole words of the key ('metro'
+# does not match 'metropolitan'); one ending in '*' is a stem matching at the
+# start of a word ('optometr*' matches 'optometry'). The longest keyword at the
+# leftmost position wins ('uber eats' over 'uber').
+DEFAULT_KEYWORDS = {
+    'Rent/Mortgage': (
+        'rent', 'mortgage', 'apartment*', 'apts', 'landlord', 'property management', 'property mgmt', 'hoa dues',
+        'homeowners assoc*', 'home loan'
+    ),
+    'Utilities': (
+        'electric*', 'utility', 'utilities', 'water util*', 'water dept', 'sewer', 'natural gas', 'gas co',
+        'power co', 'light co', 'energy', 'con edison', 'pg e', 'comcast', 'xfinity', 'verizon', 'at t',
+        't mobile', 'metropcs', 'spectrum', 'cox comm*', 'internet', 'waste management', 'trash'
+    ),
+    'Groceries': (
+        'grocer*', 'supermarket*', 'whole foods', 'wholefds', 'trader joe*', 'safeway', 'kroger',
+        'aldi', 'lidl', 'costco', 'publix', 'wegmans', 'h e b', 'heb', 'food lion', 'albertsons', 'sprouts',
+        'meijer', 'giant eagle', 'stop shop', 'winco', 'instacart', 'fresh market'
+    ),
+    'Transportation': (
+        'uber', 'lyft', 'shell', 'chevron', 'exxon', 'mobil', 'sunoco', 'valero', 'citgo', 'arco', 'speedway',
+        'marathon petro*', 'fuel', 'gas station', 'parking', 'parkmobile', 'toll', 'ez pass', 'e zpass', 'fastrak',
+        'transit', 'metro', 'mta', 'bart', 'jiffy lube', 'autozone', 'auto repair', 'car wash', 'dmv'
+    ),
+    'Entertainment': (
+        'netflix', 'spotify', 'hulu', 'disney plus', 'disneyplus', 'hbo', 'peacock', 'paramount', 'youtube',
+        'audible', 'amc', 'regal', 'cinema*', 'theater*', 'theatre*', 'movie*', 'ticketmaster', 'live nation',
+        'concert*', 'steam', 'playstation', 'xbox', 'nintendo', 'bowling'
+    ),
+    'Healthcare': (
+        'pharmac*', 'cvs', 'walgreens', 'rite aid', 'hospital*', 'clinic*', 'medical', 'dental', 'dentist*',
+        'doctor*', 'physician*', 'urgent care', 'optometr*', 'labcorp', 'quest diag*', 'health', 'kaiser',
+        'orthodont*', 'therap*', 'pediatric*', 'chiropract*', 'dermatolog*'
+    ),
+    'Insurance': (
+        'insurance', 'geico', 'state farm', 'allstate', 'progressive', 'liberty mutual', 'usaa', 'farmers ins*',
+        'nationwide', 'metlife', 'aflac', 'health insurance', 'renters insurance'
+    ),
+    'Education': (
+        'tuition', 'university', 'college', 'school*', 'academy', 'coursera', 'udemy', 'edx', 'chegg',
+        'duolingo', 'textbook*'
+    ),
+    'Shopping': (
+        'amazon', 'amzn', 'target', 'walmart', 'wal mart', 'best buy', 'ebay', 'etsy', 'home depot', 'lowes',
+        'lowe s', 'ikea', 'macy s', 'macys', 'nordstrom', 'tj maxx', 'marshalls', 'kohl s', 'kohls', 'old navy',
+        'apple com', 'apple store', 'nike', 'sephora', 'ulta', 'dollar tree', 'dollar general', 'staples',
+        'office depot'
+    ),
+    'Dining Out': (
+        'restaurant*', 'cafe', 'coffee', 'starbucks', 'dunkin', 'mcdonald*', 'burger king', 'wendy s', 'wendys',
+        'taco bell', 'chipotle', 'subway', 'pizza*', 'pizzeria', 'domino s', 'dominos', 'papa john*', 'kfc',
+        'popeyes', 'chick fil a', 'panera', 'five guys', 'shake shack', 'sweetgreen', 'grill', 'diner', 'bistro', 'sushi', 'bakery', 'uber eats',
+        'doordash*', 'grubhub', 'postmates', 'seamless', 'tst'
+    ),
+    'Travel': (
+        'airline*', 'air lines', 'airways', 'delta air*', 'united air*', 'american air*', 'southwest',
+        'jetblue', 'alaska air*', 'spirit air*', 'frontier air*', 'airport', 'airbnb', 'vrbo', 'hotel*', 'motel*',
+        'resort*', 'marriott', 'hilton', 'hyatt', 'holiday inn', 'expedia', 'booking com', 'priceline', 'hertz',
+        'avis', 'enterprise rent*', 'budget rent*', 'rental car', 'rent a car', 'amtrak', 'greyhound', 'travel'
+    )
+}
+
+# Words of a merchant key sent to the LLM as the merchant's name (dropping locations and references)
+MERCHANT_NAME_WORDS = 3
+
+_KEY_NOISE = re.compile(r'[^a-z]+')
+# Card network and payment processor words that banks put before the merchant
+_PAYMENT_PREFIX = re.compile(r'^(?:(?:pos|purchase|debit|credit|card|checkcard|recurring|pmt|ach|sq|paypal|visa|online) )+')
+_RULE_LINE = re.compile(r'^\s*(.+?)\s*=>\s*(.+?)\s*$')
+# Inline flags at the start of a rule regex, e.g. '(?i)', which are only valid at
+# the start of the combined regex and so are rewritten as a scoped group
+_LEADING_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+# Numbered backreferences and conditionals ('\1', '(?(1)...)'), which would
+# refer to the wrong group once the rule is nested in the combined regex
+_NUMBERED_REFERENCE = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)')
+
+
+def merchant_keys(descriptions):
+    """Merchant keys (lower-case letters and single spaces) of a Series of descriptions.
+
+    Digits, punctuation and leading payment words are dropped, so
+    'POS PURCHASE STARBUCKS #1234' and 'Starbucks 0877' share the key
+    'starbucks'.
+    """
+    keys = descriptions.fillna('').astype(str).str.lower().str.replace(_KEY_NOISE, ' ', regex=True).str.strip()
+    return keys.str.replace(_PAYMENT_PREFIX, '', regex=True)
+
+
+def keyword_pattern(keywords):
+    """Regex source matching any of keywords, built as a trie of shared prefixes.
+
+    Python's re tries alternatives one by one; nesting them by prefix
+    ('s(?:hell|tarbucks)') lets each position reject every keyword not
+    sharing its first letters at once, much like an Aho-Corasick automaton.
+    Optional longer branches are tried first, so the longest keyword wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def keyword_source(keywords):
+    """Regex source matching any of keywords at the start of a word of a merchant key.
+
+    Keywords must end at a word boundary, except stems marked with a
+    trailing '*', which match as prefixes. The matched text is the keyword
+    itself (without the '*').
+    """
+    words = [keyword for keyword in keywords if not keyword.endswith('*')]
+    stems = [keyword[:-1] for keyword in keywords if keyword.endswith('*')]
+    branches = ([f'(?:{keyword_pattern(words)})\\b'] if words else []) + ([keyword_pattern(stems)] if stems else [])
+    return r'\b(?:' + '|'.join(branches) + ')'
+
+
+def parse_rules(text):
+    """[(pattern, category)] from lines of 'pattern => Category'.
+
+    A pattern is a keyword matched like the built-in ones (whole words, or
+    a stem with a trailing '*', e.g. 'blue bott* => Dining Out'), or a
+    regular expression between slashes matched against the merchant key
+    (e.g. '/^sq .*coffee/ => Dining Out'). Leading inline flags such as
+    '(?i)' apply to that rule only; numbered backreferences are rejected
+    (use named groups). Blank lines and lines starting
+    with '#' are ignored; other malformed lines raise ValueError.
+    """
+    rules = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = _RULE_LINE.match(line)
+        if not match:
+            raise ValueError(f"Line {number}: expected 'pattern => Category'")
+        rules.append((match.group(1), match.group(2)))
+    return rules
+
+
+def _rule_source(pattern):
+    if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+        source = pattern[1:-1]
+        try:
+            re.compile(source)
+        except re.error as e:
+            raise ValueError(f"Invalid rule pattern {pattern}: {e}") from e
+        if _NUMBERED_REFERENCE.search(source):
+            raise ValueError(
+                f"Invalid rule pattern {pattern}: numbered group references are not supported, "
+                "use a named group and (?P=name)"
+            )
+        flags = _LEADING_FLAGS.match(source)
+        if flags:
+            source = f'(?{flags.group(1)}:{source[flags.end():]})'
+        return source
+    keyword = _KEY_NOISE.sub(' ', pattern.lower()).strip()
+    if not keyword:
+        raise ValueError(f"Rule keyword {pattern!r} has no letters")
+    return r'\b' + re.escape(keyword) + ('' if pattern.rstrip().endswith('*') else r'\b')
+
+
+class Categorizer:
+    """Map transaction descriptions onto expense categories.
+
+    User rules are compiled into one regex with a named group per rule and
+    take precedence; the built-in keywords of the given categories are
+    compiled into one trie-shaped regex. A column of descriptions is
+    factorized twice (descriptions, then merchant keys), so each distinct
+    merchant is decided once per call, and decisions are kept in a bounded
+    LRU across calls. The names (first MERCHANT_NAME_WORDS words) of
+    merchants no rule matches are sent to llm, when given, in batches of
+    llm_batch_size (at most llm_max_merchants per call);
+    llm(merchants, categories, session_id=...) returns
+    {merchant: category}, or None on failure. Undecided merchants are
+    UNCATEGORIZED and, after an LLM failure, retried on a later call.
+    """
+
+    def __init__(self, categories, rules=None, cache_size=50_000, llm=None, llm_batch_size=100,
+                 llm_max_merchants=500):
+        self.categories = list(categories)
+        self.rules = list(rules or [])
+        self.cache_size = cache_size
+        self.llm = llm
+        self.llm_batch_size = llm_batch_size
+        self.llm_max_merchants = llm_max_merchants
+        self._rule_categories = {}
+        sources = []
+        for i, (pattern, category) in enumerate(self.rules):
+            if category not in self.categories:
+                raise ValueError(f"Rule {pattern!r} assigns unknown category {category!r}")
+            sources.append(f'(?P<r{i}>{_rule_source(pattern)})')
+            self._rule_categories[f'r{i}'] = category
+        try:
+            self._rule_regex = re.compile('|'.join(sources)) if sources else None
+        except re.error as e:
+            # e.g. a rule's own group named like the generated ones
+            raise ValueError(f"Invalid rule patterns: {e}") from e
+        keywords = {
+            keyword: category
+            for category, keywords in DEFAULT_KEYWORDS.items() if category in self.categories
+            for keyword in keywords
+        }
+        # Matches are looked up by their text, which never includes a stem's '*'
+        self._keyword_categories = {keyword.rstrip('*'): category for keyword, category in keywords.items()}
+        self._keyword_regex = re.compile(keyword_source(keywords)) if keywords else None
+        self._decisions = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rule_matches': 0, 'llm_merchants': 0,
+                       'llm_batches': 0, 'llm_failures': 0, 'uncategorized': 0}
+
+    @classmethod
+    def from_env(cls, categories, rules=None, llm=None):
+        """Build a categorizer configured from FINTWIN_CATEGORY_* environment variables"""
+        return cls(
+            categories, rules,
+            cache_size=int(os.getenv('FINTWIN_CATEGORY_CACHE_SIZE', 50_000)),
+            llm=llm,
+            llm_batch_size=int(os.getenv('FINTWIN_CATEGORY_LLM_BATCH', 100)),
+            llm_max_merchants=int(os.getenv('FINTWIN_CATEGORY_LLM_MAX', 500))
+        )
+
+    def categorize(self, descriptions, session_id=None):
+        """Category of each description in a Series, as an object ndarray"""
+        import pandas as pd
+        codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+        key_codes, merchants = pd.factorize(merchant_keys(pd.Series(uniques, dtype=object)))
+        decided = np.array(self.categorize_merchants(list(merchants), session_id), dtype=object)
+        return decided[key_codes][codes]
+
+    def categorize_merchants(self, merchants, session_id=None):
+        """Category of each merchant key in a list"""
+        decisions = [None] * len(merchants)
+        with self._lock:
+            for i, merchant in enumerate(merchants):
+                category = self._decisions.get(merchant)
+                if category is not None:
+                    self._decisions.move_to_end(merchant)
+                    decisions[i] = category
+        counts = {'hits': sum(category is not None for category in decisions)}
+        counts['misses'] = len(merchants) - counts['hits']
+
+        decided, unmatched = {}, []
+        for i, merchant in enumerate(merchants):
+            if decisions[i] is None:
+                # A description without letters names no merchant to match or ask about
+                category = self.match(merchant) if merchant else UNCATEGORIZED
+                if category is None:
+                    unmatched.append(i)
+                else:
+                    decisions[i] = decided[merchant] = category
+        counts['rule_matches'] = len(decided)
+
+        if unmatched and self.llm is not None and self.llm_max_merchants > 0:
+            # Keys differing only after the merchant's name (a city, a reference) share one question
+            names = {}
+            for i in unmatched:
+                names.setdefault(' '.join(merchants[i].split()[:MERCHANT_NAME_WORDS]), []).append(i)
+            replies = self._ask_llm(list(names)[:self.llm_max_merchants], session_id, counts)
+            for name, category in replies.items():
+                category = category if category in self.categories else UNCATEGORIZED
+                for i in names[name]:
+                    decisions[i] = decided[merchants[i]] = category
+        elif unmatched:
+            # No LLM to consult, so the rules' verdict is final
+            for i in unmatched:
+                decided[merchants[i]] = UNCATEGORIZED
+
+        counts['uncategorized'] = 0
+        for i, category in enumerate(decisions):
+            if category is None:
+                decisions[i] = UNCATEGORIZED
+                counts['uncategorized'] += 1
+        self._remember(decided, counts)
+        return decisions
+
+    def match(self, merchant):
+        """Category of the leftmost user rule match (earliest rule on ties), else of the longest built-in keyword"""
+        if self._rule_regex is not None:
+            found = self._rule_regex.search(merchant)
+            if found:
+                return self._rule_categories[found.lastgroup]
+        if self._keyword_regex is not None:
+            found = self._keyword_regex.search(merchant)
+            if found:
+                return self._keyword_categories[found.group()]
+        return None
+
+    def _ask_llm(self, merchants, session_id, counts):
+        """{merchant: category} from batched LLM calls; merchants of failed batches are left out"""
+        replies = {}
+        counts.update(llm_batches=0, llm_failures=0, llm_merchants=0)
+        for start in range(0, len(merchants), self.llm_batch_size):
+            batch = merchants[start:start + self.llm_batch_size]
+            reply = self.llm(batch, self.categories, session_id=session_id)
+            counts['llm_batches'] += 1
+            if reply is None:
+                counts['llm_failures'] += 1
+                continue
+            counts['llm_merchants'] += len(batch)
+            replies.update({merchant: reply.get(merchant, UNCATEGORIZED) for merchant in batch})
+        return replies
+
+    def _remember(self, decided, counts):
+        with self._lock:
+            for merchant, category in decided.items():
+                self._decisions[merchant] = category
+                self._decisions.move_to_end(merchant)
+            while len(self._decisions) > self.cache_size:
+                self._decisions.popitem(last=False)
+                self._stats['evictions'] += 1
+            for name, count in counts.items():
+                self._stats[name] += count
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+
+    def stats(self):
+        """Return cache hit/miss counts and how merchants were decided"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._decisions)
+        stats['cache_size'] = self.cache_size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -3,6 +3,64 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from expense_store import ExpenseStore, as_expense_store
+from figure_cache import cached_figure, get_figure_cache
+
+
+@lru_cache(maxsize=1024)
+def _month_start(year, month):
+    """First day of a (year, month) pair such as ('2024', 'January') or ('2024', '01')"""
+    return pd.to_datetime(f"{year}-{month}-01")
+
+
+def expense_pivot(df):
+    """Reshape Year/Month/Category/Amount rows into a dates x categories table of summed amounts.
+
+    Year, Month and Category are each factorized once, the amounts are summed
+    per (month, category) cell in a single bincount pass, and dates are
+    parsed only for the distinct months (and cached across calls). Rows are
+    in date order, categories keep their order of first appearance so chart
+    colors stay stable, and months without a category's expenses are NaN.
+    The input frame is not modified.
+    """
+    year_codes, years = pd.factorize(df['Year'])
+    month_codes, months = pd.factorize(df['Month'])
+    category_codes, categories = pd.factorize(df['Category'])
+    period_codes, period_index = np.unique(year_codes * len(months) + month_codes, return_inverse=True)
+    dates = pd.DatetimeIndex(
+        [_month_start(years[code // len(months)], months[code % len(months)]) for code in period_codes],
+        name='Date'
+    )
+
+    cells = period_index * len(categories) + category_codes
+    size = len(period_codes) * len(categories)
+    amounts = np.bincount(cells, weights=df['Amount'].to_numpy(dtype=float), minlength=size).astype(float, copy=False)
+    amounts[np.bincount(cells, minlength=size) == 0] = np.nan
+    pivot = pd.DataFrame(
+        amounts.reshape(len(period_codes), len(categories)),
+        index=dates,
+        columns=pd.Index(categories, name='Category')
+    )
+    return pivot.sort_index()
+
+
+def expense_table(expenses):
+    """Months x categories amounts indexed by month start date.
+
+    Accepts an ExpenseStore, its frame() view or Year/Month/Category/Amount
+    rows (reshaped by expense_pivot). The input is not modified.
+    """
+    if isinstance(expenses, ExpenseStore):
+        expenses = expenses.frame()
+    if 'Category' in expenses.columns:
+        return expense_pivot(expenses)
+    table = expenses.copy(deep=False)
+    if isinstance(table.index, pd.PeriodIndex):
+        table.index = table.index.to_timestamp().rename('Date')
+    return table
+
 
 class DataProcessor:
     def __init__(self):
@@ -17,6 +75,10 @@ class DataProcessor:
             'neutral': '#95a5a6'
         }
         self.category_colors = px.colors.qualitative.Set3
+        # Built figures are shared across sessions; anything that changes how a
+        # chart looks belongs in figure_options so it is part of the cache key
+        self.figure_cache = get_figure_cache()
+        self.figure_options = {'colors': self.colors, 'category_colors': list(self.category_colors)}
 
     def create_projection_chart(self, predictions):
         """Create a chart showing financial projections."""
@@ -122,6 +184,124 @@ class DataProcessor:
         
         return fig
 
+    def create_percentile_band_chart(self, distribution):
+        """Create a fan chart of simulated P5/P50/P95 outcomes over time."""
+        years = distribution['years']
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=distribution['p95'],
+            name='P95',
+            line=dict(color=self.colors['savings'], width=0)
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=distribution['p5'],
+            name='P5 - P95',
+            fill='tonexty',
+            fillcolor='rgba(52, 152, 219, 0.2)',
+            line=dict(color=self.colors['savings'], width=0)
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=distribution['p50'],
+            name='Median',
+            line=dict(color=self.colors['savings'], width=2)
+        ))
+
+        fig.update_layout(
+            title='Simulated Portfolio Value',
+            xaxis_title='Years',
+            yaxis_title='Amount ($)',
+            hovermode='x unified',
+            template='plotly_white',
+            showlegend=True,
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
+        )
+
+        return fig
+
+    def create_sensitivity_heatmap(self, values, rates, terms, title, value_format='$,.0f'):
+        """Create a rate x term heatmap, e.g. of monthly payments from a loan sensitivity grid."""
+        fig = go.Figure(go.Heatmap(
+            z=values,
+            x=[f"{t}m" for t in terms],
+            y=[f"{r:.1f}%" for r in rates],
+            colorscale='RdYlGn_r',
+            texttemplate=f"%{{z:{value_format}}}",
+            hovertemplate=f"Term %{{x}}<br>Rate %{{y}}<br>%{{z:{value_format}}}<extra></extra>"
+        ))
+
+        fig.update_layout(
+            title=title,
+            xaxis_title='Term',
+            yaxis_title='Interest Rate',
+            template='plotly_white',
+            height=450
+        )
+
+        return fig
+
+    def create_sweep_chart(self, surface, row, selected_value=None):
+        """Create a chart of health score across a scenario parameter sweep, marking key points."""
+        r = surface['rows'].index(row)
+        values = surface['values']
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(
+            x=values,
+            y=surface['metrics']['health_score'][r],
+            name='Health Score',
+            line=dict(color=self.colors['primary'], width=2)
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=values,
+            y=[rate * 100 for rate in surface['metrics']['savings_rate'][r]],
+            name='Savings Rate (%)',
+            line=dict(color=self.colors['savings'], width=2, dash='dot')
+        ))
+
+        # Mark break-even, goal and the currently selected value
+        break_even = surface['break_even'][row]
+        goal = surface['goal']['points'][row]
+        if break_even is not None:
+            fig.add_vline(x=break_even, line=dict(color=self.colors['accent'], dash='dash'),
+                          annotation_text='Break-even')
+        if goal is not None:
+            fig.add_vline(x=goal, line=dict(color=self.colors['secondary'], dash='dash'),
+                          annotation_text=f"{surface['goal']['target']:.0%} savings goal")
+        if selected_value is not None:
+            fig.add_vline(x=selected_value, line=dict(color=self.colors['neutral']))
+
+        fig.update_layout(
+            title=f"Impact of {surface['parameter'].replace('_', ' ').title()}",
+            xaxis_title='Percentage',
+            yaxis_title='Score / Rate',
+            hovermode='x unified',
+            template='plotly_white',
+            showlegend=True,
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
+        )
+
+        return fig
+
+    @cached_figure
     def create_expense_breakdown(self, expenses):
         """Create an enhanced pie chart showing expense breakdown."""
         # Prepare data
@@ -167,6 +347,7 @@ class DataProcessor:
         
         return fig
 
+    @cached_figure
     def create_expense_comparison(self, expenses):
         """Create a bar chart comparing expenses."""
         # Prepare data
@@ -202,22 +383,21 @@ class DataProcessor:
         
         return fig
 
-    def create_expense_timeline(self, df):
+    @cached_figure
+    def create_expense_timeline(self, expenses):
         """Create a time series visualization of expenses using stacked columns."""
-        # Convert Month to datetime for proper sorting
-        df['Date'] = pd.to_datetime(df['Year'] + '-' + df['Month'] + '-01')
+        pivot = expense_table(expenses)
         
         # Create figure
         fig = go.Figure()
         
         # Add stacked bar for each category
-        for category in df['Category'].unique():
-            category_data = df[df['Category'] == category].groupby('Date')['Amount'].sum().reset_index()
+        for position, category in enumerate(pivot.columns):
             fig.add_trace(go.Bar(
-                x=category_data['Date'],
-                y=category_data['Amount'],
+                x=pivot.index,
+                y=pivot[category],
                 name=category,
-                marker_color=self.category_colors[list(df['Category'].unique()).index(category) % len(self.category_colors)]
+                marker_color=self.category_colors[position % len(self.category_colors)]
             ))
         
         # Update layout
@@ -240,22 +420,21 @@ class DataProcessor:
         
         return fig
 
-    def create_category_trends(self, df):
+    @cached_figure
+    def create_category_trends(self, expenses):
         """Create a visualization showing category-wise trends using comparison charts."""
-        # Convert Month to datetime for proper sorting
-        df['Date'] = pd.to_datetime(df['Year'] + '-' + df['Month'] + '-01')
+        pivot = expense_table(expenses)
         
         # Create figure
         fig = go.Figure()
         
         # Add bar for each category
-        for category in df['Category'].unique():
-            category_data = df[df['Category'] == category].groupby('Date')['Amount'].sum().reset_index()
+        for position, category in enumerate(pivot.columns):
             fig.add_trace(go.Bar(
-                x=category_data['Date'],
-                y=category_data['Amount'],
+                x=pivot.index,
+                y=pivot[category],
                 name=category,
-                marker_color=self.category_colors[list(df['Category'].unique()).index(category) % len(self.category_colors)]
+                marker_color=self.category_colors[position % len(self.category_colors)]
             ))
         
         # Update layout
@@ -278,28 +457,28 @@ class DataProcessor:
         
         return fig
 
-    def create_monthly_comparison(self, df):
+    @cached_figure
+    def create_monthly_comparison(self, expenses):
         """Create a visualization comparing expenses across months."""
-        # Prepare data
-        monthly_data = df.groupby(['Year', 'Month'])['Amount'].sum().reset_index()
-        monthly_data['Date'] = pd.to_datetime(monthly_data['Year'] + '-' + monthly_data['Month'] + '-01')
+        # Prepare data: monthly totals in date order
+        monthly_totals = expense_table(expenses).sum(axis=1)
         
         # Create figure
         fig = go.Figure()
         
         # Add bar chart
         fig.add_trace(go.Bar(
-            x=monthly_data['Date'],
-            y=monthly_data['Amount'],
+            x=monthly_totals.index,
+            y=monthly_totals.values,
             marker_color=self.colors['primary'],
-            text=monthly_data['Amount'].apply(lambda x: f'${x:,.2f}'),
+            text=[f'${x:,.2f}' for x in monthly_totals.values],
             textposition='auto',
         ))
         
         # Add line for trend
         fig.add_trace(go.Scatter(
-            x=monthly_data['Date'],
-            y=monthly_data['Amount'].rolling(window=3, min_periods=1).mean(),
+            x=monthly_totals.index,
+            y=monthly_totals.rolling(window=3, min_periods=1).mean(),
             name='3-Month Average',
             line=dict(color=self.colors['accent'], width=2, dash='dash'),
             mode='lines'
@@ -445,7 +624,8 @@ class DataProcessor:
 
     def generate_financial_analysis(self, user_data, monthly_expenses):
         """Generate detailed financial analysis for export."""
-        if not user_data or not monthly_expenses:
+        store = as_expense_store(monthly_expenses)
+        if not user_data or not len(store):
             return {}
             
         # Calculate basic metrics
@@ -453,23 +633,13 @@ class DataProcessor:
         total_savings = user_data.get("savings", 0)
         total_debt = user_data.get("debt", 0)
         
-        # Calculate expense metrics
-        total_expenses_by_month = {}
-        category_totals = {}
-        all_categories = set()
-        
-        for month_key, expenses in monthly_expenses.items():
-            month_total = sum(expenses.values())
-            total_expenses_by_month[month_key] = month_total
-            
-            for category, amount in expenses.items():
-                all_categories.add(category)
-                if category not in category_totals:
-                    category_totals[category] = 0
-                category_totals[category] += amount
-                
-        # Calculate averages and trends
-        avg_monthly_expense = sum(total_expenses_by_month.values()) / len(total_expenses_by_month) if total_expenses_by_month else 0
+        # Expense metrics come from the store's running aggregates (months in calendar order)
+        aggregates = store.aggregates
+        months = store.month_keys
+        categories = store.categories
+        total_expenses_by_month = dict(zip(months, aggregates.month_totals.tolist()))
+        category_totals = dict(zip(categories, aggregates.category_totals.tolist()))
+        avg_monthly_expense = aggregates.mean
         
         # Calculate savings rate
         savings_rate = (total_income - avg_monthly_expense) / total_income if total_income > 0 else 0
@@ -478,25 +648,22 @@ class DataProcessor:
         debt_to_income = total_debt / total_income if total_income > 0 else 0
         
         # Identify top expense categories
-        sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-        top_categories = [{"category": cat, "amount": amt} for cat, amt in sorted_categories[:5]]
+        top_categories = [
+            {"category": categories[i], "amount": float(aggregates.category_totals[i])}
+            for i in aggregates.top_categories(5)
+        ]
         
         # Calculate monthly trends
-        monthly_trends = []
-        sorted_months = sorted(total_expenses_by_month.items())
-        
-        for i in range(1, len(sorted_months)):
-            prev_month, prev_amount = sorted_months[i-1]
-            curr_month, curr_amount = sorted_months[i]
-            change = curr_amount - prev_amount
-            change_percent = (change / prev_amount * 100) if prev_amount > 0 else 0
-            
-            monthly_trends.append({
-                "from_month": prev_month,
-                "to_month": curr_month,
+        previous_totals = aggregates.month_totals[:-1].tolist()
+        monthly_trends = [
+            {
+                "from_month": months[i],
+                "to_month": months[i + 1],
                 "change": change,
-                "change_percent": change_percent
-            })
+                "change_percent": change / previous * 100 if previous > 0 else 0
+            }
+            for i, (change, previous) in enumerate(zip(aggregates.changes[1:].tolist(), previous_totals))
+        ]
             
         # Generate analysis
         analysis = {
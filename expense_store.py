@@ -0,0 +1,400 @@
+import hashlib
+import json
+from copy import deepcopy
+from functools import lru_cache
+
+import numpy as np
+
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
+# Pandas monthly period ordinals count months since January 1970
+_EPOCH_YEAR = 1970
+
+
+@lru_cache(maxsize=4096)
+def _parse_month_key(month_key):
+    year, _, month = month_key.strip().partition('-')
+    if month.isdigit():
+        number = int(month)
+    else:
+        names = [m.lower() for m in MONTHS]
+        month = month.strip().lower()
+        number = names.index(month) + 1 if month in names else [n[:3] for n in names].index(month[:3]) + 1
+    if not 1 <= number <= 12:
+        raise ValueError
+    return (int(year) - _EPOCH_YEAR) * 12 + number - 1
+
+
+def month_ordinal(month):
+    """Monthly period ordinal of a 'YYYY-Month' / 'YYYY-MM' key, a pandas Period, a date or an ordinal"""
+    if isinstance(month, (int, np.integer)):
+        return int(month)
+    if isinstance(month, str):
+        try:
+            return _parse_month_key(month)
+        except (ValueError, IndexError):
+            raise ValueError(f"Unrecognized month '{month}', expected e.g. '2024-January' or '2024-01'") from None
+    return (month.year - _EPOCH_YEAR) * 12 + month.month - 1
+
+
+def month_key(ordinal):
+    """Canonical 'YYYY-Month' key of a monthly period ordinal"""
+    year, month = divmod(int(ordinal), 12)
+    return f"{year + _EPOCH_YEAR}-{MONTHS[month]}"
+
+
+class ExpenseAggregates:
+    """Running aggregates of an ExpenseStore, updated as its cells change.
+
+    Keeps each month's total and its change from the month before, each
+    category's total and number of recorded months, and the sum and sum of
+    squares of the month totals. A cell update is O(1), so saving one
+    month's expenses is O(categories), and the mean, spread, category totals
+    and top categories are read without walking the history.
+    """
+
+    def __init__(self):
+        self.month_count = 0
+        self.total = 0.0
+        self._sum_squares = 0.0
+        self._month_totals = np.zeros(0)
+        self._changes = np.zeros(0)
+        self._category_totals = np.zeros(0)
+        self._category_counts = np.zeros(0, dtype=np.int64)
+        self._category_count = 0
+
+    @property
+    def month_totals(self):
+        return self._month_totals[:self.month_count]
+
+    @property
+    def changes(self):
+        """Change of each month's total from the previous month's (0 for the first month)"""
+        return self._changes[:self.month_count]
+
+    @property
+    def category_totals(self):
+        return self._category_totals[:self._category_count]
+
+    @property
+    def category_counts(self):
+        """Number of months with a recorded amount, per category"""
+        return self._category_counts[:self._category_count]
+
+    @property
+    def mean(self):
+        """Average month total"""
+        return self.total / self.month_count if self.month_count else 0.0
+
+    @property
+    def std(self):
+        """Population standard deviation of the month totals"""
+        if not self.month_count:
+            return 0.0
+        mean_square = self.mean ** 2
+        variance = self._sum_squares / self.month_count - mean_square
+        # Below round-off of the running sums the months are equal
+        return float(np.sqrt(variance)) if variance > 1e-12 * mean_square else 0.0
+
+    def concentration(self):
+        """Sum of squared category shares of all spending (1.0 without spending)"""
+        totals = self.category_totals
+        total = totals.sum()
+        return float(np.square(totals / total).sum()) if total > 0 else 1.0
+
+    def top_categories(self, n=5):
+        """Column positions of the n largest category totals, largest first (ties in category order)"""
+        return np.argsort(-self.category_totals, kind='stable')[:n]
+
+    def _reserve(self, months, categories):
+        for name, size in (('_month_totals', months), ('_changes', months),
+                           ('_category_totals', categories), ('_category_counts', categories)):
+            current = getattr(self, name)
+            if len(current) < size:
+                grown = np.zeros(size, dtype=current.dtype)
+                grown[:len(current)] = current
+                setattr(self, name, grown)
+
+    def _add_column(self):
+        self._category_count += 1
+
+    def _insert_month(self, row):
+        """Account for an empty month inserted at row"""
+        count = self.month_count
+        self._month_totals[row + 1:count + 1] = self._month_totals[row:count].copy()
+        self._changes[row + 1:count + 1] = self._changes[row:count].copy()
+        self._month_totals[row] = 0.0
+        self.month_count = count + 1
+        self._changes[row] = -self._month_totals[row - 1] if row else 0.0
+        if row + 1 < self.month_count:
+            self._changes[row + 1] = self._month_totals[row + 1]
+
+    def _update(self, row, column, old, new, was_recorded, recorded=True):
+        """Account for the cell at (row, column) changing from old to new"""
+        delta = new - old
+        before = self._month_totals[row]
+        after = before + delta
+        self._month_totals[row] = after
+        self._sum_squares += after * after - before * before
+        self.total += delta
+        self._category_totals[column] += delta
+        self._category_counts[column] += int(recorded) - int(was_recorded)
+        if row:
+            self._changes[row] += delta
+        if row + 1 < self.month_count:
+            self._changes[row + 1] -= delta
+
+
+class ExpenseStore:
+    """A household's expense history as a months x categories float array.
+
+    Rows are calendar months in order, identified by pandas monthly period
+    ordinals; columns are the category vocabulary, interned in order of first
+    use. Cells never recorded hold 0 and are tracked in a mask, so the
+    month -> category -> amount dict form round-trips exactly.
+
+    Changing an existing cell is O(1). New categories and months after the
+    latest one are appended into spare capacity; only a month earlier than
+    the latest shifts the rows after it. values, recorded and frame() are
+    views of the underlying array, valid until the next month or category
+    is added. aggregates holds totals maintained alongside every change.
+    """
+
+    def __init__(self):
+        self._ordinals = np.empty(0, dtype=np.int64)
+        self._values = np.zeros((0, 0))
+        self._recorded = np.zeros((0, 0), dtype=bool)
+        self._rows = {}
+        self._columns = {}
+        self._categories = []
+        self._month_count = 0
+        self.aggregates = ExpenseAggregates()
+        self.version = 0
+        self._fingerprint = None
+
+    @classmethod
+    def from_monthly_expenses(cls, monthly_expenses):
+        """Build a store from {'YYYY-Month': {category: amount}}"""
+        store = cls()
+        months = sorted((month_ordinal(k), expenses) for k, expenses in (monthly_expenses or {}).items())
+        store._reserve(len(months), len({c for _, expenses in months for c in expenses}))
+        for ordinal, expenses in months:
+            store._row(ordinal)
+            for category, amount in expenses.items():
+                store.set(ordinal, category, amount)
+        return store
+
+    def to_monthly_expenses(self):
+        """The recorded cells as {'YYYY-Month': {category: amount}}, months in calendar order"""
+        values, recorded = self.values, self.recorded
+        return {
+            month_key(ordinal): {self._categories[j]: float(values[i, j]) for j in np.flatnonzero(recorded[i])}
+            for i, ordinal in enumerate(self.ordinals)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a store from to_dict() output"""
+        store = cls()
+        months = [month_ordinal(m) for m in data.get('months', [])]
+        categories = list(data.get('categories', []))
+        store._reserve(len(months), len(categories))
+        for category in categories:
+            store._column(category)
+        for ordinal, row in sorted(zip(months, data.get('values', []))):
+            store._row(ordinal)
+            for category, amount in zip(categories, row):
+                if amount is not None:
+                    store.set(ordinal, category, amount)
+        return store
+
+    def to_dict(self):
+        """Compact JSON-serializable form: month keys, categories and rows (None where not recorded)"""
+        values, recorded = self.values, self.recorded
+        return {
+            'months': self.iso_months,
+            'categories': list(self._categories),
+            'values': [
+                [float(v) if r else None for v, r in zip(row, mask)]
+                for row, mask in zip(values.tolist(), recorded.tolist())
+            ]
+        }
+
+    def copy(self):
+        """Independent copy, made from the arrays rather than a serialized form"""
+        return deepcopy(self)
+
+    def fingerprint(self):
+        """SHA-256 hex digest of the months and recorded cells, cached until the store next changes.
+
+        Categories are taken in name order and those without a recorded cell
+        are left out, so stores holding the same expenses share a
+        fingerprint however they were built.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            recorded = self.recorded
+            columns = sorted(np.flatnonzero(recorded.any(axis=0)).tolist(), key=self._categories.__getitem__)
+            digest = hashlib.sha256(json.dumps([self._categories[j] for j in columns]).encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.ordinals).tobytes())
+            digest.update(np.ascontiguousarray(np.where(recorded, self.values, 0.0)[:, columns]).tobytes())
+            digest.update(np.ascontiguousarray(recorded[:, columns]).tobytes())
+            self._fingerprint = (self.version, digest.hexdigest())
+        return self._fingerprint[1]
+
+    def __len__(self):
+        return self._month_count
+
+    def __contains__(self, month):
+        return month_ordinal(month) in self._rows
+
+    @property
+    def ordinals(self):
+        return self._ordinals[:self._month_count]
+
+    @property
+    def month_keys(self):
+        return [month_key(ordinal) for ordinal in self.ordinals.tolist()]
+
+    @property
+    def iso_months(self):
+        """'YYYY-MM' label of each row"""
+        return [f"{ordinal // 12 + _EPOCH_YEAR}-{ordinal % 12 + 1:02d}" for ordinal in self.ordinals.tolist()]
+
+    @property
+    def periods(self):
+        """Monthly PeriodIndex of the rows"""
+        import pandas as pd
+        return pd.PeriodIndex.from_ordinals(self.ordinals, freq='M')
+
+    @property
+    def categories(self):
+        return list(self._categories)
+
+    @property
+    def values(self):
+        """months x categories view of the amounts"""
+        return self._values[:self._month_count, :len(self._categories)]
+
+    @property
+    def recorded(self):
+        """months x categories view of which cells were recorded"""
+        return self._recorded[:self._month_count, :len(self._categories)]
+
+    def frame(self):
+        """Zero-copy DataFrame view: PeriodIndex rows, one column per category"""
+        import pandas as pd
+        return pd.DataFrame(
+            self.values, index=self.periods, columns=pd.Index(self._categories, name='Category'), copy=False
+        )
+
+    def month_totals(self):
+        return self.aggregates.month_totals
+
+    def category_totals(self):
+        return self.aggregates.category_totals
+
+    def month(self, month):
+        """Recorded {category: amount} of month, or None if the month has no entry"""
+        row = self._rows.get(month_ordinal(month))
+        if row is None:
+            return None
+        return {
+            self._categories[j]: float(self._values[row, j])
+            for j in np.flatnonzero(self._recorded[row, :len(self._categories)])
+        }
+
+    def get(self, month, category, default=0.0):
+        row = self._rows.get(month_ordinal(month))
+        column = self._columns.get(category)
+        if row is None or column is None or not self._recorded[row, column]:
+            return default
+        return float(self._values[row, column])
+
+    def set(self, month, category, amount):
+        """Record one cell, adding the month or category if needed"""
+        self._write(self._row(month_ordinal(month)), self._column(category), amount)
+        self.version += 1
+
+    def add(self, month, category, amount):
+        """Add amount to one cell (recording it), adding the month or category if needed"""
+        row, column = self._row(month_ordinal(month)), self._column(category)
+        self._write(row, column, self._values[row, column] + amount)
+        self.version += 1
+
+    def set_month(self, month, expenses):
+        """Replace month's expenses with {category: amount}"""
+        row = self._row(month_ordinal(month))
+        for column in np.flatnonzero(self._recorded[row, :len(self._categories)]).tolist():
+            self.aggregates._update(row, column, self._values[row, column], 0.0, True, recorded=False)
+            self._values[row, column] = 0.0
+            self._recorded[row, column] = False
+        for category, amount in expenses.items():
+            self._write(row, self._column(category), amount)
+        self.version += 1
+
+    def _write(self, row, column, amount):
+        amount = float(amount or 0.0)
+        self.aggregates._update(row, column, self._values[row, column], amount, self._recorded[row, column])
+        self._values[row, column] = amount
+        self._recorded[row, column] = True
+
+    def clear(self):
+        self.__init__()
+
+    def _reserve(self, months, categories):
+        """Grow the buffers (doubling) to hold at least months rows and categories columns"""
+        rows, columns = self._values.shape
+        if months <= rows and categories <= columns:
+            return
+        shape = (
+            rows if months <= rows else max(months, rows * 2, 4),
+            columns if categories <= columns else max(categories, columns * 2, 4)
+        )
+        values = np.zeros(shape)
+        recorded = np.zeros(shape, dtype=bool)
+        values[:rows, :columns] = self._values
+        recorded[:rows, :columns] = self._recorded
+        ordinals = np.zeros(shape[0], dtype=np.int64)
+        ordinals[:len(self._ordinals)] = self._ordinals
+        self._values, self._recorded, self._ordinals = values, recorded, ordinals
+        self.aggregates._reserve(*shape)
+
+    def _row(self, ordinal):
+        row = self._rows.get(ordinal)
+        if row is not None:
+            return row
+        count = self._month_count
+        self._reserve(count + 1, len(self._categories))
+        row = int(np.searchsorted(self._ordinals[:count], ordinal))
+        if row < count:
+            # Earlier than the latest month: shift the later rows down by one
+            self._values[row + 1:count + 1] = self._values[row:count].copy()
+            self._recorded[row + 1:count + 1] = self._recorded[row:count].copy()
+            self._ordinals[row + 1:count + 1] = self._ordinals[row:count].copy()
+            self._values[row] = 0.0
+            self._recorded[row] = False
+            for later in self._ordinals[row + 1:count + 1].tolist():
+                self._rows[later] += 1
+        self._ordinals[row] = ordinal
+        self._rows[ordinal] = row
+        self._month_count = count + 1
+        self.aggregates._insert_month(row)
+        return row
+
+    def _column(self, category):
+        column = self._columns.get(category)
+        if column is None:
+            column = len(self._categories)
+            self._reserve(self._month_count, column + 1)
+            self._columns[category] = column
+            self._categories.append(category)
+            self.aggregates._add_column()
+        return column
+
+
+def as_expense_store(monthly_expenses):
+    """An ExpenseStore for monthly_expenses, which may already be one or a month -> category dict"""
+    if isinstance(monthly_expenses, ExpenseStore):
+        return monthly_expenses
+    return ExpenseStore.from_monthly_expenses(monthly_expenses)
@@ -0,0 +1,132 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from response_cache import canonical_hash
+
+
+def _content_fingerprint(value):
+    """JSON-serializable stand-in for value; expense stores, DataFrames and Series are reduced to a hash of their contents"""
+    import pandas as pd
+    from expense_store import ExpenseStore
+    if isinstance(value, ExpenseStore):
+        return {'expense_store': value.fingerprint()}
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        return {'frame': digest.hexdigest(), 'columns': [str(c) for c in columns]}
+    return value
+
+
+def figure_key(chart, options, args, kwargs):
+    """Content hash of a chart's name, its builder options and its input data"""
+    return canonical_hash({
+        'chart': chart,
+        'options': options,
+        'args': [_content_fingerprint(a) for a in args],
+        'kwargs': {k: _content_fingerprint(v) for k, v in kwargs.items()}
+    })
+
+
+class FigureCache:
+    """Process-wide LRU cache of built Plotly figures, bounded by their serialized size.
+
+    Cached figures are shared by every session and rerun, so callers must
+    treat them as read-only (st.plotly_chart only serializes them). Each
+    entry is charged the length of the figure's JSON, and the least recently
+    used figures are evicted once the total exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from FINTWIN_FIGURE_CACHE_* environment variables"""
+        return cls(max_bytes=int(float(os.getenv('FINTWIN_FIGURE_CACHE_MB', 64)) * 1024 * 1024))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._figures.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, figure):
+        size = len(figure.to_json())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._figures.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._figures[key] = (figure, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._figures.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counts, hit rate and memory use"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._figures)
+            stats['bytes'] = self._bytes
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def cached_figure(method):
+    """Serve a DataProcessor chart method from the figure cache.
+
+    The key covers the method name, the processor's figure options (colors)
+    and a content hash of the arguments, so equal data yields the same
+    figure object from any session.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = figure_key(method.__name__, self.figure_options, args, kwargs)
+        figure = self.figure_cache.get(key)
+        if figure is None:
+            figure = method(self, *args, **kwargs)
+            self.figure_cache.set(key, figure)
+        return figure
+    return wrapper
+
+
+_figure_cache = None
+_figure_cache_lock = threading.Lock()
+
+
+def get_figure_cache():
+    """Return the figure cache shared by every session in this server process"""
+    global _figure_cache
+    if _figure_cache is None:
+        with _figure_cache_lock:
+            if _figure_cache is None:
+                _figure_cache = FigureCache.from_env()
+    return _figure_cache
+
+
+def reset_figure_cache():
+    """Drop the shared figure cache so the next get_figure_cache() re-reads its configuration"""
+    global _figure_cache
+    with _figure_cache_lock:
+        _figure_cache = None
@@ -1,23 +1,75 @@
-import pandas as pd
-import numpy as np
-from prophet import Prophet
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from openai import OpenAI
 from datetime import datetime, timedelta
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import json
+import math
+from llm_ledger import get_ledger
+from model_registry import registry
+from model_router import get_model_router
+from response_cache import ResponseCache
+from stream_parser import PartialJSONParser
+from prompt_builder import PromptBuilder, count_tokens
+from rate_limiter import INTERACTIVE, get_scheduler
+from resilience import get_resilient_caller
+from single_flight import get_single_flight
+
+# Bump whenever the context prompt or request instructions change so that
+# cached responses produced by the old prompt are no longer served.
+PROMPT_VERSION = "2"
+
+# Static per-call-type instructions; the request data is appended after them
+INSTRUCTIONS = {
+    "financial_health": "Please analyze the following financial data and provide a comprehensive health assessment. Include SVG visualizations for key metrics. Data: ",
+    "simulation": "Please simulate the following financial scenario and provide detailed analysis with SVG visualizations. Scenario: ",
+    "recommendations": "Please generate personalized financial recommendations based on the following data. Include SVG visualizations for key recommendations. Data: ",
+    "categorization": "Assign each merchant below to exactly one of the given expense categories, using \"Other\" when none fits. Reply with JSON of the form {\"categories\": {\"<merchant>\": \"<category>\"}} covering every merchant, and nothing else. Data: "
+}
 
 class FinancialAI:
     def __init__(self):
         load_dotenv()
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        if self.openai_api_key:
-            self.client = OpenAI(api_key=self.openai_api_key)
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Model, max_tokens, temperature and timeout are chosen per task by the router
+        self.router = get_model_router()
+        self.cache = ResponseCache.from_env()
+        self.scheduler = get_scheduler()
+        self.resilience = get_resilient_caller()
+        self.single_flight = get_single_flight()
+        self.ledger = get_ledger()
         self._initialize_models()
         self._initialize_context()
 
+    @property
+    def client(self):
+        """OpenAI client, created (and the SDK imported) on the first API call.
+
+        The instance is shared by every session, so the client and its HTTP
+        keep-alive connection pool are reused across calls and reruns.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if not self.openai_api_key:
+                        raise RuntimeError("OPENAI_API_KEY is not configured")
+                    from openai import OpenAI
+                    # Retries are handled by the shared ResilientCaller, not the SDK
+                    self._client = OpenAI(api_key=self.openai_api_key, max_retries=0)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def recommendation_index(self):
+        """Nearest-neighbour index of recommendations shared by every session (loaded on first use)"""
+        from recommendation_index import get_recommendation_index
+        return get_recommendation_index()
+
     def _initialize_context(self):
         """Initialize the context prompt for the AI"""
         self.context_prompt = """You are an advanced Financial Intelligence Assistant designed to help users understand, manage, and optimize their personal finances. You analyze financial data with precision and communicate insights clearly, acting as both a financial analyst and advisor.
@@ -75,122 +127,431 @@ INTERACTION GUIDELINES:
 - Base all recommendations on the specific financial data provided
 - Consider both short-term needs and long-term financial health
 - Always provide visual representations of key data points and forecasts"""
+        self.prompt_builder = PromptBuilder.from_env(self.context_prompt, INSTRUCTIONS)
 
     def _initialize_models(self):
-        self.health_model = RandomForestRegressor()
-        self.risk_model = RandomForestRegressor()
-        self.scaler = StandardScaler()
+        # Models are built by the shared registry on first use, not per instance
+        self.models = registry
 
-    def analyze_financial_health(self, user_data):
-        """Analyze financial health using OpenAI API"""
-        try:
-            # Prepare the data for analysis
-            analysis_data = {
-                "user_data": user_data,
-                "timestamp": datetime.now().isoformat(),
-                "analysis_type": "financial_health"
-            }
-
-            # Create the messages for the API call
-            messages = [
-                {"role": "system", "content": self.context_prompt},
-                {"role": "user", "content": f"Please analyze the following financial data and provide a comprehensive health assessment. Include SVG visualizations for key metrics. Data: {json.dumps(analysis_data)}"}
-            ]
-
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
-
-            # Parse the response
+    def analyze_financial_health(self, user_data, priority=INTERACTIVE, session_id=None, fallback=True):
+        """Analyze financial health using OpenAI API; with fallback=False, failures raise instead"""
+        with self.ledger.track("financial_health", session_id) as entry:
             try:
-                response_data = json.loads(response.choices[0].message.content)
-                return {
-                    'health_score': response_data.get('health_score', 0),
-                    'risk_level': response_data.get('risk_level', 'Unknown'),
-                    'savings_projection': response_data.get('savings_projection', 0),
-                    'analysis': response_data.get('analysis', ''),
-                    'visualization': response_data.get('visualization', '')
-                }
-            except json.JSONDecodeError:
+                # Call OpenAI API (served from the response cache when possible)
+                response_data = self._request_completion(
+                    "financial_health",
+                    self._health_payload(user_data),
+                    priority,
+                    entry
+                )
+                return self._format_health_response(response_data)
+
+            except json.JSONDecodeError as e:
+                entry.fallback(e)
+                if not fallback:
+                    raise
+                return self._fallback_analysis(user_data)
+            except Exception as e:
+                print(f"Error in OpenAI analysis: {e}")
+                entry.fallback(e)
+                if not fallback:
+                    raise
                 return self._fallback_analysis(user_data)
 
-        except Exception as e:
-            print(f"Error in OpenAI analysis: {e}")
-            return self._fallback_analysis(user_data)
-
-    def simulate_scenario(self, user_data, scenario_type, parameters):
+    def simulate_scenario(self, user_data, scenario_type, parameters, priority=INTERACTIVE, session_id=None):
         """Run simulations using OpenAI API"""
-        try:
-            # Prepare simulation data
-            simulation_data = {
-                "user_data": user_data,
-                "scenario_type": scenario_type,
-                "parameters": parameters,
-                "timestamp": datetime.now().isoformat()
-            }
-
-            # Create the messages for the API call
-            messages = [
-                {"role": "system", "content": self.context_prompt},
-                {"role": "user", "content": f"Please simulate the following financial scenario and provide detailed analysis with SVG visualizations. Scenario: {json.dumps(simulation_data)}"}
-            ]
-
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
-
-            # Parse the response
+        with self.ledger.track("simulation", session_id) as entry:
+            try:
+                # Call OpenAI API (served from the response cache when possible)
+                return self._request_completion(
+                    "simulation",
+                    self._simulation_payload(user_data, scenario_type, parameters),
+                    priority,
+                    entry
+                )
+
+            except json.JSONDecodeError as e:
+                entry.fallback(e)
+                return self._fallback_simulation(scenario_type, parameters, user_data)
+            except Exception as e:
+                print(f"Error in OpenAI simulation: {e}")
+                entry.fallback(e)
+                return self._fallback_simulation(scenario_type, parameters, user_data)
+
+    def categorize_merchants(self, merchants, categories, priority=INTERACTIVE, session_id=None):
+        """Assign merchant names to expense categories using OpenAI API; returns {merchant: category}, or None on failure"""
+        with self.ledger.track("categorization", session_id) as entry:
             try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return self._fallback_simulation(scenario_type, parameters)
+                # Call OpenAI API (served from the response cache when possible)
+                response_data = self._request_completion(
+                    "categorization",
+                    {"merchants": list(merchants), "categories": list(categories)},
+                    priority,
+                    entry
+                )
+                return {str(merchant): str(category)
+                        for merchant, category in (response_data.get('categories') or {}).items()}
+
+            except Exception as e:
+                print(f"Error in OpenAI categorization: {e}")
+                entry.fallback(e)
+                return None
+
+    def sweep_scenario(self, user_data, scenario_type, narrate_point=None, priority=INTERACTIVE, session_id=None,
+                       **options):
+        """Evaluate a scenario across its whole parameter grid locally.
+
+        Returns the response surface from scenario_sweep. If narrate_point is
+        given as (row, value), only that point is sent to the API, and the
+        simulation result is added under 'narrative'.
+        """
+        from scenario_sweep import point_parameters, sweep
+        surface = sweep(user_data, scenario_type, **options)
+        if narrate_point is not None:
+            parameters = point_parameters(surface, *narrate_point)
+            surface['narrative'] = self.simulate_scenario(user_data, scenario_type, parameters, priority, session_id)
+        return surface
+
+    def generate_recommendations(self, user_data, predictions=None, simulations=None, priority=INTERACTIVE,
+                                 session_id=None, fallback=True):
+        """Generate recommendations using OpenAI API; with fallback=False, failures raise instead"""
+        with self.ledger.track("recommendations", session_id) as entry:
+            try:
+                vector, reused = self._similar_recommendations(user_data, entry)
+                if reused is not None:
+                    return reused
+
+                # Call OpenAI API (served from the response cache when possible)
+                recommendations = self._request_completion(
+                    "recommendations",
+                    self._recommendation_payload(user_data, predictions, simulations),
+                    priority,
+                    entry
+                )
+                self.recommendation_index.add(vector, recommendations)
+                return recommendations
+
+            except json.JSONDecodeError as e:
+                entry.fallback(e)
+                if not fallback:
+                    raise
+                return self._fallback_recommendations()
+            except Exception as e:
+                print(f"Error in OpenAI recommendations: {e}")
+                entry.fallback(e)
+                if not fallback:
+                    raise
+                return self._fallback_recommendations()
 
-        except Exception as e:
-            print(f"Error in OpenAI simulation: {e}")
-            return self._fallback_simulation(scenario_type, parameters)
+    def stream_financial_health(self, user_data, session_id=None):
+        """Stream the health analysis, yielding the fields received so far.
 
-    def generate_recommendations(self, user_data, predictions=None, simulations=None):
-        """Generate recommendations using OpenAI API"""
-        try:
-            # Prepare recommendation data
-            recommendation_data = {
-                "user_data": user_data,
-                "predictions": predictions,
-                "simulations": simulations,
-                "timestamp": datetime.now().isoformat()
-            }
-
-            # Create the messages for the API call
-            messages = [
-                {"role": "system", "content": self.context_prompt},
-                {"role": "user", "content": f"Please generate personalized financial recommendations based on the following data. Include SVG visualizations for key recommendations. Data: {json.dumps(recommendation_data)}"}
-            ]
-
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
-
-            # Parse the response
+        Each yielded dict holds whatever top-level fields have arrived (string
+        fields such as 'analysis' grow as tokens stream in). The last item is
+        the complete analysis, or the fallback analysis if the call fails.
+        """
+        with self.ledger.track("financial_health", session_id) as entry:
             try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return self._fallback_recommendations()
+                response_data = yield from self._stream_completion(
+                    "financial_health",
+                    self._health_payload(user_data),
+                    entry=entry
+                )
+                yield self._format_health_response(response_data)
+            except json.JSONDecodeError as e:
+                entry.fallback(e)
+                yield self._fallback_analysis(user_data)
+            except Exception as e:
+                print(f"Error in OpenAI streaming analysis: {e}")
+                entry.fallback(e)
+                yield self._fallback_analysis(user_data)
+
+    def stream_recommendations(self, user_data, predictions=None, simulations=None, session_id=None):
+        """Stream recommendations, yielding each category as soon as it is complete"""
+        with self.ledger.track("recommendations", session_id) as entry:
+            try:
+                vector, reused = self._similar_recommendations(user_data, entry)
+                if reused is not None:
+                    yield reused
+                    return
+
+                response_data = yield from self._stream_completion(
+                    "recommendations",
+                    self._recommendation_payload(user_data, predictions, simulations),
+                    complete_only=True,
+                    entry=entry
+                )
+                self.recommendation_index.add(vector, response_data)
+                yield response_data
+            except json.JSONDecodeError as e:
+                entry.fallback(e)
+                yield self._fallback_recommendations()
+            except Exception as e:
+                print(f"Error in OpenAI streaming recommendations: {e}")
+                entry.fallback(e)
+                yield self._fallback_recommendations()
+
+    def _similar_recommendations(self, user_data, entry=None):
+        """Return the household's feature vector and the recommendations of a near-identical household, if any"""
+        from recommendation_index import household_vector
+        vector = household_vector(user_data)
+        reused = self.recommendation_index.lookup(vector)
+        if reused is not None:
+            self._note_source(entry, 'similar')
+        return vector, reused
+
+    def _health_payload(self, user_data):
+        return {
+            "user_data": user_data,
+            "timestamp": datetime.now().isoformat(),
+            "analysis_type": "financial_health"
+        }
+
+    def _simulation_payload(self, user_data, scenario_type, parameters):
+        return {
+            "user_data": user_data,
+            "scenario_type": scenario_type,
+            "parameters": parameters,
+            "timestamp": datetime.now().isoformat()
+        }
 
-        except Exception as e:
-            print(f"Error in OpenAI recommendations: {e}")
-            return self._fallback_recommendations()
+    def _recommendation_payload(self, user_data, predictions, simulations):
+        return {
+            "user_data": user_data,
+            "predictions": predictions,
+            "simulations": simulations,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _format_health_response(self, response_data):
+        return {
+            'health_score': response_data.get('health_score', 0),
+            'risk_level': response_data.get('risk_level', 'Unknown'),
+            'savings_projection': response_data.get('savings_projection', 0),
+            'analysis': response_data.get('analysis', ''),
+            'visualization': response_data.get('visualization', '')
+        }
+
+    def _cache_key(self, call_type, payload, route=None):
+        route = route or self.router.route(call_type)
+        return self.cache.make_key(
+            route.model,
+            PROMPT_VERSION,
+            {**route.params, "input_budget": self.prompt_builder.budgets.get(call_type)},
+            {"call_type": call_type, **payload}
+        )
+
+    def _stream_completion(self, call_type, payload, complete_only=False, entry=None):
+        """Stream a chat completion, yielding parsed snapshots of the partial JSON reply.
+
+        Returns the fully parsed reply (via StopIteration) and caches it under
+        the same key as _request_completion, so streamed and blocking calls
+        share results. With complete_only, in-progress string values are not
+        included in the snapshots. If the same request is already in flight,
+        nothing is yielded and its reply is returned once it completes. Usage,
+        time to first token and the reply's source are noted on entry.
+        """
+        route = self.router.route(call_type)
+        key = self._cache_key(call_type, payload, route)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._note_source(entry, 'cache')
+            return cached
+
+        # Each caller is checked against its own budget before joining a flight,
+        # so a session over budget never fails the requests coalesced with it
+        messages, prompt_tokens = self.prompt_builder.build_messages(call_type, payload)
+        self._check_budget(entry, prompt_tokens, route)
+
+        # An identical request is already in flight: wait for its complete reply
+        call, leader = self.single_flight.begin(key)
+        if not leader:
+            self._note_source(entry, 'coalesced')
+            return call.wait()
+
+        try:
+            response_data = yield from self._stream_reply(key, messages, prompt_tokens, route, complete_only, entry)
+        except BaseException as error:
+            self.single_flight.finish(key, call, error=error)
+            raise
+        self.single_flight.finish(key, call, result=response_data)
+        return response_data
+
+    def _stream_reply(self, key, messages, prompt_tokens, route, complete_only, entry=None):
+        """Stream one chat completion for _stream_completion and cache the parsed reply"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._note_source(entry, 'cache')
+            return cached
+
+        self._note_source(entry, 'api')
+        stream = self._create_completion(messages, prompt_tokens, INTERACTIVE, route, stream=True)
+
+        parser = PartialJSONParser()
+        seen = 0
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if entry is not None:
+                    entry.first_token()
+                parser.feed(delta)
+                snapshot = dict(parser.fields) if complete_only else parser.snapshot()
+                if complete_only and len(snapshot) == seen:
+                    continue
+                seen = len(snapshot)
+                yield snapshot
+        finally:
+            stream.close()
+            if entry is not None:
+                # Streamed replies carry no usage, so the completion is counted locally
+                entry.usage(route.model, prompt_tokens, count_tokens(parser.buffer), estimated=True)
+
+        # Parse the complete response, without any preamble such as a ```json fence
+        response_data = json.loads(parser.text)
+        self.cache.set(key, response_data)
+        return response_data
+
+    def _create_completion(self, messages, prompt_tokens, priority, route, entry=None, **kwargs):
+        """Call the chat completions API through the shared scheduler and resilience layer.
+
+        Each attempt is admitted by the process-wide scheduler and bounded by
+        a timeout; retryable errors back off and retry within the latency
+        budget, and CircuitOpenError is raised without calling the provider
+        while the breaker is open. Streaming calls are never hedged. The model,
+        completion parameters and attempt timeout come from route. Each
+        attempt's own latency is reported to the router (timed-out attempts as
+        at least route.timeout; see ModelRouter.observe_failure), and the
+        token usage of blocking calls is noted on entry.
+        """
+        client = self.client
+        estimated_tokens = prompt_tokens + route.max_tokens
+        stream = kwargs.get('stream')
+
+        def send(timeout):
+            started = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    timeout=timeout,
+                    **route.params,
+                    **kwargs
+                )
+            except Exception as e:
+                self.router.observe_failure(route, time.perf_counter() - started, e)
+                raise
+            if stream:
+                return self._timed_stream(response, route, time.perf_counter() - started)
+            self.router.observe(route, time.perf_counter() - started)
+            return response
+
+        response = self.resilience.call(
+            send, self.scheduler, estimated_tokens, priority,
+            hedge=not stream, timeout=route.timeout
+        )
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.scheduler.report_usage(estimated_tokens, usage.total_tokens)
+            if entry is not None:
+                entry.usage(route.model, usage.prompt_tokens, usage.completion_tokens)
+        elif entry is not None and not stream:
+            entry.usage(route.model, prompt_tokens, 0, estimated=True)
+        return response
+
+    def _timed_stream(self, stream, route, elapsed):
+        """Yield the chunks of stream, reporting to the router only the time spent waiting on them.
+
+        elapsed is the time the attempt took to open the stream. The caller's
+        own work between chunks is not counted, and a stream that fails
+        partway is reported as a failed attempt.
+        """
+        chunks = iter(stream)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    self.router.observe_failure(route, elapsed + time.perf_counter() - started, e)
+                    raise
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield chunk
+        finally:
+            stream.close()
+        self.router.observe(route, elapsed)
+
+    def _check_budget(self, entry, prompt_tokens, route):
+        """Raise BudgetExceeded before an API call that would exceed the session or process budget"""
+        self.ledger.check_budget(
+            entry.session_id if entry is not None else None,
+            prompt_tokens + route.max_tokens
+        )
+
+    @staticmethod
+    def _note_source(entry, source):
+        if entry is not None:
+            entry.source = source
+
+    def _request_completion(self, call_type, payload, priority=INTERACTIVE, entry=None):
+        """Send the payload for call_type to the chat API and return the parsed JSON reply.
+
+        The model and completion parameters are routed per call type (see
+        model_router). Successful replies are cached under a hash of the routed
+        model, prompt version, completion parameters, call type and payload
+        (minus its timestamp), so repeated requests for the same data never
+        reach the API. Concurrent identical requests are coalesced: the first
+        caller makes the API call and the others wait for its reply (or its
+        error). Unparseable replies raise json.JSONDecodeError and are not
+        cached. A caller over its token budget raises BudgetExceeded before
+        joining an in-flight request. The reply's source and usage are noted
+        on entry, a LedgerEntry, when given.
+        """
+        route = self.router.route(call_type)
+        key = self._cache_key(call_type, payload, route)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._note_source(entry, 'cache')
+            return cached
+
+        # Create the compacted, token-budgeted messages for the API call. Each
+        # caller is checked against its own budget before joining a flight, so
+        # a session over budget never fails the requests coalesced with it
+        messages, prompt_tokens = self.prompt_builder.build_messages(call_type, payload)
+        self._check_budget(entry, prompt_tokens, route)
+        response_data = self.single_flight.do(
+            key, lambda: self._fetch_reply(key, messages, prompt_tokens, route, priority, entry)
+        )
+        if entry is not None and entry.source is None:
+            entry.source = 'coalesced'
+        return response_data
+
+    def _fetch_reply(self, key, messages, prompt_tokens, route, priority, entry=None):
+        """Call the API for _request_completion and cache the parsed reply"""
+        # A caller that finished just before this one registered may have cached it
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._note_source(entry, 'cache')
+            return cached
+
+        self._note_source(entry, 'api')
+
+        response = self._create_completion(messages, prompt_tokens, priority, route, entry)
+
+        # Parse the response
+        response_data = json.loads(response.choices[0].message.content)
+        self.cache.set(key, response_data)
+        return response_data
+
+    def local_health_analysis(self, user_data):
+        """Score financial health locally (no API call) with the vectorized scoring engine"""
+        return self._fallback_analysis(user_data)
 
     def _fallback_analysis(self, user_data):
         """Fallback analysis when OpenAI API fails"""
@@ -207,12 +568,12 @@ INTERACTION GUIDELINES:
             'visualization': None
         }
 
-    def _fallback_simulation(self, scenario_type, parameters):
+    def _fallback_simulation(self, scenario_type, parameters, user_data=None):
         """Fallback simulation when OpenAI API fails"""
         if scenario_type == "expense_reduction":
-            return self.simulate_expense_reduction_fallback(parameters)
+            return self.simulate_expense_reduction_fallback(parameters, user_data)
         elif scenario_type == "income_increase":
-            return self.simulate_income_increase_fallback(parameters)
+            return self.simulate_income_increase_fallback(parameters, user_data)
         elif scenario_type == "loan":
             return self.simulate_loan_fallback(parameters)
         elif scenario_type == "investment":
@@ -228,35 +589,72 @@ INTERACTION GUIDELINES:
         }
 
     def _prepare_features(self, user_data):
-        features = []
-        if user_data:
-            features.extend([
-                user_data.get('income', 0),
-                user_data.get('savings', 0),
-                user_data.get('debt', 0)
-            ])
-        return np.array(features).reshape(1, -1)
+        """1 x len(health_scoring.FEATURES) feature matrix for the local scoring engine"""
+        from health_scoring import compute_features, household_inputs
+        return compute_features(household_inputs(user_data))
 
     def _predict_health_score(self, features):
-        # Placeholder for actual prediction logic
-        return 75.0
+        from health_scoring import health_scores
+        return float(health_scores(features)[0])
 
     def _predict_risk_level(self, features):
-        # Placeholder for actual prediction logic
-        return "Moderate"
+        from health_scoring import health_scores, risk_tiers
+        return str(risk_tiers(health_scores(features))[0])
 
     def _project_savings(self, user_data):
-        # Placeholder for actual projection logic
-        return 10000.0
+        from health_scoring import household_inputs, project_savings
+        return float(project_savings(household_inputs(user_data))[0])
 
     def _generate_ai_analysis(self, user_data, health_score, risk_level, savings_projection):
-        # Placeholder for actual AI analysis
-        return "Your financial health is in good shape. Consider increasing your savings rate."
-
-    def simulate_expense_reduction_fallback(self, parameters):
+        """Deterministic summary of the local score, used when no AI narrative is available"""
+        from health_scoring import weakest_features
+        features = self._prepare_features(user_data)
+        savings_rate, debt_to_income, _, runway, _ = features[0]
+        focus = {
+            'savings_rate': 'raising your monthly savings rate',
+            'debt_to_income': 'paying down debt',
+            'expense_volatility': 'smoothing out irregular spending',
+            'runway_months': 'building an emergency fund',
+            'category_concentration': 'reducing reliance on your largest expense category'
+        }
+        priorities = ' and '.join(focus[name] for name in weakest_features(features)[0])
+        # Debt without any reported income has no finite ratio
+        debt = (
+            f"your debt is {debt_to_income * 100:.0f}% of annual income" if math.isfinite(debt_to_income)
+            else "you have debt but no reported income"
+        )
+        return (
+            f"Your financial health score is {health_score:.1f}/100 ({risk_level} risk). "
+            f"You save {savings_rate * 100:.1f}% of your income, {debt} "
+            f"and your savings cover {runway:.1f} months of expenses. "
+            f"Focus on {priorities} to improve your position."
+        )
+
+    def _project_scenario(self, user_data, scenario_type, row, value):
+        """Locally computed metrics of one scenario point, as carried by parameter sweep points"""
+        from scenario_sweep import ALL_EXPENSES, point_parameters, sweep
+        if scenario_type == 'expense_reduction':
+            surface = sweep(user_data, scenario_type, percentages=[0, value], categories=[row])
+            if row not in surface['rows']:
+                # Cutting a category the household does not spend on changes nothing
+                row, value = ALL_EXPENSES, 0
+        else:
+            surface = sweep(user_data, scenario_type, percentages=[value])
+        return point_parameters(surface, row, value)['projected']
+
+    def simulate_expense_reduction_fallback(self, parameters, user_data=None):
         """Fallback method for expense reduction simulation"""
         expense_type = parameters.get('expense_type', 'Unknown')
         reduction_percentage = parameters.get('reduction_percentage', 0)
+        # Points from a parameter sweep carry their locally computed impact
+        projected = parameters.get('projected') or self._project_scenario(
+            user_data, 'expense_reduction', expense_type, reduction_percentage
+        )
+        metrics = {
+            'Monthly Savings': f"${projected['monthly_change']:,.2f}",
+            'Annual Impact': f"${projected['annual_impact']:,.2f}",
+            'Health Score': f"{projected['health_score']:.1f}/100"
+        }
         
         return {
             'scenario': 'expense_reduction',
@@ -264,38 +662,53 @@ INTERACTION GUIDELINES:
             'reduction': reduction_percentage,
             'impact': 'positive',
             'analysis': f'Reducing {expense_type} by {reduction_percentage}% would improve your financial health.',
-            'metrics': {
-                'Monthly Savings': f'${1000 * (reduction_percentage/100):.2f}',
-                'Annual Impact': f'${12000 * (reduction_percentage/100):.2f}',
-                'Risk Reduction': 'Moderate'
-            }
+            'metrics': metrics
         }
 
-    def simulate_income_increase_fallback(self, parameters):
+    def simulate_income_increase_fallback(self, parameters, user_data=None):
         """Fallback method for income increase simulation"""
         increase_percentage = parameters.get('increase_percentage', 0)
+        # Points from a parameter sweep carry their locally computed impact
+        projected = parameters.get('projected') or self._project_scenario(
+            user_data, 'income_increase', 'Income', increase_percentage
+        )
+        metrics = {
+            'Monthly Increase': f"${projected['monthly_change']:,.2f}",
+            'Annual Impact': f"${projected['annual_impact']:,.2f}",
+            'Savings Rate': f"{projected['savings_rate']*100:.1f}%"
+        }
         
         return {
             'scenario': 'income_increase',
             'increase': increase_percentage,
             'impact': 'positive',
             'analysis': f'Increasing income by {increase_percentage}% would significantly improve your financial position.',
-            'metrics': {
-                'Monthly Increase': f'${500 * (increase_percentage/100):.2f}',
-                'Annual Impact': f'${6000 * (increase_percentage/100):.2f}',
-                'Savings Potential': 'High'
-            }
+            'metrics': metrics
         }
 
     def simulate_loan_fallback(self, parameters):
-        """Fallback method for loan simulation"""
+        """Fallback method for loan simulation (full amortization schedule and sensitivity grid)"""
+        from amortization import amortize, sensitivity_grid
         amount = parameters.get('amount', 0)
         term = parameters.get('term', 12)
         interest_rate = parameters.get('interest_rate', 0)
         purpose = parameters.get('purpose', 'Unknown')
-        
-        monthly_payment = (amount * (interest_rate/100/12)) / (1 - (1 + (interest_rate/100/12))**(-term))
-        
+        extra_payment = parameters.get('extra_payment', 0) or 0
+        refinance = parameters.get('refinance') or None
+
+        schedule = amortize(amount, interest_rate, term, extra_payment, refinance)
+        monthly_payment = float(schedule['monthly_payment'])
+        total_interest = float(schedule['total_interest'])
+        payoff_months = int(schedule['payoff_months'])
+
+        metrics = {
+            'Monthly Payment': f'${monthly_payment + extra_payment:,.2f}',
+            'Total Interest': f'${total_interest:,.2f}',
+            'Payoff Time': f'{payoff_months} months'
+        }
+        if extra_payment or refinance:
+            metrics['Interest Saved'] = f"${float(schedule['interest_saved']):,.2f}"
+
         return {
             'scenario': 'loan',
             'amount': amount,
@@ -303,36 +716,58 @@ INTERACTION GUIDELINES:
             'interest_rate': interest_rate,
             'purpose': purpose,
             'impact': 'neutral',
-            'analysis': f'A {purpose} loan of ${amount} over {term} months at {interest_rate}% interest.',
-            'metrics': {
-                'Monthly Payment': f'${monthly_payment:.2f}',
-                'Total Interest': f'${(monthly_payment * term - amount):.2f}',
-                'Debt-to-Income Impact': 'Moderate'
-            }
+            'analysis': (
+                f'A {purpose} loan of ${amount:,} over {term} months at {interest_rate}% interest costs '
+                f'${monthly_payment:,.2f} a month and ${total_interest:,.2f} in interest'
+                + (f', paid off in {payoff_months} months.' if payoff_months != term else '.')
+            ),
+            'metrics': metrics,
+            'schedule': {
+                'balance': [round(b, 2) for b in schedule['balances'].tolist()],
+                'interest': [round(i, 2) for i in schedule['interest'].tolist()],
+                'principal': [round(p, 2) for p in schedule['principal'].tolist()]
+            },
+            'sensitivity': sensitivity_grid(amount, interest_rate, extra_payment=extra_payment, refinance=refinance)
         }
 
     def simulate_investment_fallback(self, parameters):
-        """Fallback method for investment simulation"""
+        """Fallback method for investment simulation (Monte Carlo over the risk profile and strategy)"""
+        from monte_carlo import MonteCarloEngine
         amount = parameters.get('amount', 0)
         duration = parameters.get('duration', 1)
         risk_level = parameters.get('risk_level', 'Moderate')
         strategy = parameters.get('strategy', 'Balanced')
-        
-        # Simple compound interest calculation
-        annual_return = 0.07 if risk_level == 'Low' else 0.10 if risk_level == 'Moderate' else 0.15
-        future_value = amount * (1 + annual_return) ** duration
-        
+        monthly_contribution = parameters.get('monthly_contribution', 0) or 0
+        goal = parameters.get('goal') or None
+
+        result = MonteCarloEngine.from_env().simulate_strategy(
+            amount, duration, risk_level, strategy, monthly_contribution, goal
+        )
+        p5, p50, p95 = (result['percentiles'][p] for p in ('p5', 'p50', 'p95'))
+        metrics = {
+            'Median Value': f'${p50:,.2f}',
+            'P5 - P95 Range': f'${p5:,.0f} - ${p95:,.0f}',
+            'Probability of Loss': f"{result['probability_of_loss']*100:.1f}%",
+            'Expected Annual Return': f"{result['annual_return']*100:.1f}%"
+        }
+        if goal:
+            months = result['median_months_to_goal']
+            metrics['Time to Goal'] = f'{months / 12:.1f} years' if months is not None else 'Unlikely'
+
         return {
             'scenario': 'investment',
             'amount': amount,
             'risk_level': risk_level,
             'duration': duration,
             'strategy': strategy,
-            'impact': 'positive',
-            'analysis': f'Investing ${amount} in a {risk_level} {strategy} strategy over {duration} years.',
-            'metrics': {
-                'Future Value': f'${future_value:.2f}',
-                'Total Return': f'${(future_value - amount):.2f}',
-                'Annual Return': f'{annual_return*100:.1f}%'
-            }
-        } 
\ No newline at end of file
+            'impact': 'positive' if result['probability_of_loss'] < 0.5 else 'negative',
+            'analysis': (
+                f"Investing ${amount:,} in a {risk_level} {strategy} strategy over {duration} years"
+                + (f" with ${monthly_contribution:,} added monthly" if monthly_contribution else "")
+                + f": across {result['paths']:,} simulated market paths the median outcome is ${p50:,.0f}, "
+                f"with a 90% range of ${p5:,.0f} to ${p95:,.0f} and a {result['probability_of_loss']*100:.1f}% "
+                f"chance of ending below the ${result['contributed']:,.0f} invested."
+            ),
+            'metrics': metrics,
+            'distribution': result['bands']
+        }
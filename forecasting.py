@@ -0,0 +1,235 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from expense_store import as_expense_store
+from response_cache import ResponseCache, canonical_hash
+
+# Bump whenever the fitting logic changes so cached forecasts are recomputed
+FORECAST_VERSION = "1"
+
+# Prophet needs some history to separate trend from noise; shorter series use a linear trend
+MIN_PROPHET_MONTHS = 6
+# Yearly seasonality is only identifiable with two full years of data
+MIN_SEASONAL_MONTHS = 24
+# z-score of the 80% interval, matching Prophet's default interval_width
+INTERVAL_Z = 1.2816
+
+logger = logging.getLogger(__name__)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def category_series(monthly_expenses):
+    """Split month -> category -> amount history (or an ExpenseStore) into (dates, {category: values})"""
+    store = as_expense_store(monthly_expenses)
+    dates = [f"{month}-01" for month in store.iso_months]
+    values = store.values
+    series = {
+        category: values[:, j].tolist()
+        for j, category in sorted(enumerate(store.categories), key=lambda item: item[1])
+    }
+    return dates, series
+
+
+def fit_category(dates, values, horizon):
+    """Fit one category's history and forecast horizon months ahead.
+
+    Runs in a worker process. Uses Prophet when there is enough history and
+    its Stan backend is available, otherwise a least-squares linear trend.
+    Returns {'method', 'yhat', 'yhat_lower', 'yhat_upper'} with one value per
+    future month, floored at zero.
+    """
+    result = None
+    if len(values) >= MIN_PROPHET_MONTHS and any(values):
+        try:
+            result = _fit_prophet(dates, values, horizon)
+        except Exception as e:
+            logger.warning(f"Prophet fit failed, using linear trend: {e}")
+    if result is None:
+        result = _fit_linear(values, horizon)
+    for field in ('yhat', 'yhat_lower', 'yhat_upper'):
+        result[field] = [round(max(v, 0.0), 2) for v in result[field]]
+    return result
+
+
+def _fit_prophet(dates, values, horizon):
+    import pandas as pd
+    from model_registry import registry
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+    Prophet = registry.get('prophet')
+    model = Prophet(
+        yearly_seasonality=len(values) >= MIN_SEASONAL_MONTHS,
+        weekly_seasonality=False,
+        daily_seasonality=False
+    )
+    model.fit(pd.DataFrame({'ds': pd.to_datetime(dates), 'y': values}))
+    future = model.make_future_dataframe(periods=horizon, freq='MS', include_history=False)
+    forecast = model.predict(future)
+    return {
+        'method': 'prophet',
+        'yhat': forecast['yhat'].tolist(),
+        'yhat_lower': forecast['yhat_lower'].tolist(),
+        'yhat_upper': forecast['yhat_upper'].tolist()
+    }
+
+
+def _fit_linear(values, horizon):
+    import numpy as np
+
+    y = np.asarray(values, dtype=float)
+    x = np.arange(len(y))
+    if len(y) >= 2:
+        slope, intercept = np.polyfit(x, y, 1)
+        spread = INTERVAL_Z * np.std(y - (slope * x + intercept))
+    else:
+        slope, intercept, spread = 0.0, (y[0] if len(y) else 0.0), 0.0
+    yhat = slope * np.arange(len(y), len(y) + horizon) + intercept
+    return {
+        'method': 'linear',
+        'yhat': yhat.tolist(),
+        'yhat_lower': (yhat - spread).tolist(),
+        'yhat_upper': (yhat + spread).tolist()
+    }
+
+
+class ExpenseForecaster:
+    """Per-category expense forecasts combined into income/expense/savings projections.
+
+    Each category is fitted independently in a process pool, so a dozen
+    Prophet fits run in parallel instead of serially on the UI thread. Fits are
+    cached by a hash of the category's history and the horizon, so only
+    categories whose data changed are refitted.
+    """
+
+    def __init__(self, horizon_months=12, max_workers=None, cache=None):
+        self.horizon_months = horizon_months
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 8)
+        self.cache = cache or ResponseCache(max_entries=1024, ttl_seconds=7 * 24 * 3600)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'forecasts': 0,
+            'fits': 0,
+            'cached_fits': 0,
+            'pool_failures': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a forecaster configured from FINTWIN_FORECAST_* environment variables"""
+        workers = os.getenv('FINTWIN_FORECAST_WORKERS')
+        cache_dir = os.getenv('FINTWIN_FORECAST_CACHE_DIR')
+        return cls(
+            horizon_months=int(os.getenv('FINTWIN_FORECAST_HORIZON', 12)),
+            max_workers=int(workers) if workers else None,
+            cache=ResponseCache(max_entries=1024, ttl_seconds=7 * 24 * 3600, disk_dir=cache_dir or None)
+        )
+
+    def forecast(self, financial_data, horizon_months=None):
+        """Forecast every expense category and project income, expenses and savings.
+
+        Returns {'generated_at', 'horizon_months', 'categories', 'projections'}
+        where categories maps each category to its method and monthly forecast
+        and projections is the [{date, income, expenses, savings}] list
+        consumed by DataProcessor.create_projection_chart.
+        """
+        horizon = horizon_months or self.horizon_months
+        basic_info = financial_data.get('basic_info') or {}
+        dates, series = category_series(financial_data.get('monthly_expenses') or {})
+        if not dates:
+            return None
+
+        keys = {
+            category: canonical_hash({'version': FORECAST_VERSION, 'dates': dates, 'values': values, 'horizon': horizon})
+            for category, values in series.items()
+        }
+        fits = {}
+        for category, key in keys.items():
+            cached = self.cache.get(key)
+            if cached is not None:
+                fits[category] = cached
+        stale = [category for category in series if category not in fits]
+        for category, fit in self._fit_all(dates, series, stale, horizon).items():
+            self.cache.set(keys[category], fit)
+            fits[category] = fit
+
+        with self._lock:
+            self._stats['forecasts'] += 1
+            self._stats['fits'] += len(stale)
+            self._stats['cached_fits'] += len(series) - len(stale)
+
+        last_month = date.fromisoformat(dates[-1])
+        future_dates = [add_months(last_month, i + 1).isoformat() for i in range(horizon)]
+        income = float(basic_info.get('income', 0) or 0)
+        savings = float(basic_info.get('savings', 0) or 0)
+        projections = []
+        for i, day in enumerate(future_dates):
+            expenses = round(sum(fit['yhat'][i] for fit in fits.values()), 2)
+            savings += income - expenses
+            projections.append({
+                'date': day,
+                'income': income,
+                'expenses': expenses,
+                'savings': round(savings, 2)
+            })
+
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'horizon_months': horizon,
+            'categories': {
+                category: {'method': fit['method'], 'forecast': fit['yhat']}
+                for category, fit in sorted(fits.items())
+            },
+            'projections': projections
+        }
+
+    def _fit_all(self, dates, series, categories, horizon):
+        """Fit the given categories, in the process pool when there is more than one"""
+        if len(categories) > 1:
+            try:
+                executor = self._get_executor()
+                futures = {c: executor.submit(fit_category, dates, series[c], horizon) for c in categories}
+                return {c: future.result() for c, future in futures.items()}
+            except Exception as e:
+                # A broken pool must not break forecasting; fit in-process instead
+                logger.error(f"Forecast process pool failed, fitting in-process: {e}")
+                with self._lock:
+                    self._stats['pool_failures'] += 1
+                    self._shutdown_executor()
+        return {c: fit_category(dates, series[c], horizon) for c in categories}
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the server's threads or locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self._lock:
+            self._shutdown_executor()
+
+    def stats(self):
+        """Return fit counts, cache reuse and pool status"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['workers'] = self.max_workers if self._executor is not None else 0
+        stats['cache'] = self.cache.stats()
+        return stats
@@ -0,0 +1,135 @@
+import numpy as np
+
+from expense_store import as_expense_store
+
+# Raw per-household inputs, one column each in the input matrix
+INPUTS = ('income', 'savings', 'debt', 'avg_expense', 'expense_std', 'category_concentration')
+
+# Derived features, one column each in the feature matrix
+FEATURES = ('savings_rate', 'debt_to_income', 'expense_volatility', 'runway_months', 'category_concentration')
+
+# Each feature is mapped linearly onto [0, 1] between a "worst" and a "best" value
+FEATURE_BOUNDS = {
+    'savings_rate': (-0.1, 0.3),           # spending 10% over income .. saving 30% of it
+    'debt_to_income': (0.8, 0.0),          # total debt vs annual income
+    'expense_volatility': (0.5, 0.0),      # coefficient of variation of monthly spend
+    'runway_months': (0.0, 6.0),           # months of spending covered by savings
+    'category_concentration': (0.8, 0.2)   # Herfindahl index of category totals
+}
+
+FEATURE_WEIGHTS = {
+    'savings_rate': 0.30,
+    'debt_to_income': 0.25,
+    'expense_volatility': 0.10,
+    'runway_months': 0.25,
+    'category_concentration': 0.10
+}
+
+# Lowest health score of each risk tier, highest tier first (matches the health gauge bands)
+RISK_TIERS = ((66.0, 'Low'), (33.0, 'Moderate'), (float('-inf'), 'High'))
+
+MAX_RUNWAY_MONTHS = 120.0
+
+
+def household_inputs(user_data):
+    """Extract one INPUTS row from a financial data dict.
+
+    Accepts either imported financial data ({'basic_info': {...},
+    'monthly_expenses': {...}}, where monthly_expenses may also be an
+    ExpenseStore) or the flat basic info dict alone.
+    """
+    user_data = user_data or {}
+    basic_info = user_data.get('basic_info', user_data) or {}
+    aggregates = as_expense_store(user_data.get('monthly_expenses')).aggregates
+
+    return np.array([
+        basic_info.get('income', 0) or 0,
+        basic_info.get('savings', 0) or 0,
+        basic_info.get('debt', 0) or 0,
+        aggregates.mean,
+        aggregates.std,
+        # Without spending history, assume the least diversified spending
+        aggregates.concentration()
+    ], dtype=float)
+
+
+def input_matrix(records):
+    """Stack household_inputs() for each record into an N x len(INPUTS) matrix"""
+    rows = [household_inputs(record) for record in records]
+    return np.vstack(rows) if rows else np.empty((0, len(INPUTS)))
+
+
+def compute_features(inputs):
+    """Derive the N x len(FEATURES) feature matrix from an N x len(INPUTS) input matrix"""
+    inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+    income, savings, debt, avg_expense, expense_std, concentration = inputs.T
+
+    has_income = income > 0
+    has_expenses = avg_expense > 0
+
+    # Without income, any spending counts as the worst savings rate
+    savings_rate = np.where(has_expenses, -1.0, 0.0)
+    np.divide(income - avg_expense, income, out=savings_rate, where=has_income)
+
+    debt_to_income = np.where(debt > 0, np.inf, 0.0)
+    np.divide(debt, income * 12, out=debt_to_income, where=has_income)
+
+    volatility = np.zeros_like(avg_expense)
+    np.divide(expense_std, avg_expense, out=volatility, where=has_expenses)
+
+    runway = np.where(savings > 0, MAX_RUNWAY_MONTHS, 0.0)
+    np.divide(savings, avg_expense, out=runway, where=has_expenses)
+    runway = np.minimum(runway, MAX_RUNWAY_MONTHS)
+
+    return np.column_stack([savings_rate, debt_to_income, volatility, runway, concentration])
+
+
+def component_scores(features):
+    """Map each feature column onto [0, 1], where 1 is the healthiest value"""
+    features = np.atleast_2d(features)
+    worst = np.array([FEATURE_BOUNDS[f][0] for f in FEATURES])
+    best = np.array([FEATURE_BOUNDS[f][1] for f in FEATURES])
+    return np.clip((features - worst) / (best - worst), 0.0, 1.0)
+
+
+def health_scores(features):
+    """Weighted 0-100 health score for every row of the feature matrix"""
+    weights = np.array([FEATURE_WEIGHTS[f] for f in FEATURES])
+    return np.round(100.0 * component_scores(features) @ weights / weights.sum(), 1)
+
+
+def risk_tiers(scores):
+    """Risk tier label for every health score"""
+    scores = np.asarray(scores, dtype=float)
+    conditions = [scores >= threshold for threshold, _ in RISK_TIERS]
+    return np.select(conditions, [tier for _, tier in RISK_TIERS], default=RISK_TIERS[-1][1])
+
+
+def project_savings(inputs, months=12):
+    """Savings balance after months at the current net monthly cash flow (floored at zero)"""
+    inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+    income, savings, avg_expense = inputs[:, 0], inputs[:, 1], inputs[:, 3]
+    return np.round(np.maximum(savings + months * (income - avg_expense), 0.0), 2)
+
+
+def weakest_features(features, count=2):
+    """Names of the lowest-scoring features for each row, weakest first"""
+    order = np.argsort(component_scores(features), axis=1, kind='stable')[:, :count]
+    return [[FEATURES[i] for i in row] for row in order]
+
+
+def score_inputs(inputs, months=12):
+    """Score an N x len(INPUTS) matrix; return arrays of features, scores, tiers and projections"""
+    features = compute_features(inputs)
+    scores = health_scores(features)
+    return {
+        'features': features,
+        'health_score': scores,
+        'risk_level': risk_tiers(scores),
+        'savings_projection': project_savings(inputs, months)
+    }
+
+
+def score_households(records, months=12):
+    """Score a batch of financial data dicts in one vectorized pass"""
+    return score_inputs(input_matrix(records), months)
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# Short fallback reasons for the errors FinancialAI degrades on; others are
+# recorded as "<ErrorType>: <message>"
+FALLBACK_REASONS = {
+    'BudgetExceeded': 'token_budget',
+    'JSONDecodeError': 'invalid_json',
+    'CircuitOpenError': 'circuit_open',
+    'SchedulerTimeout': 'queue_timeout',
+    'APITimeoutError': 'timeout',
+    'RateLimitError': 'rate_limited',
+    'APIConnectionError': 'connection_error',
+    'InternalServerError': 'server_error'
+}
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of calling the API when a session or the process is over its token budget"""
+
+
+def fallback_reason(error):
+    """Short description of why a call fell back to the local engines"""
+    name = type(error).__name__
+    return FALLBACK_REASONS.get(name) or f"{name}: {error}"[:120]
+
+
+class LedgerEntry:
+    """One LLM call as seen by its caller, filled in along the request path.
+
+    source is 'cache' (response cache hit), 'similar' (reused the reply of a
+    near-identical household from the recommendation index), 'api' (this
+    caller made the API call), 'coalesced' (joined an identical in-flight
+    call) or None when the call failed before any of these.
+    """
+
+    def __init__(self, call_type, session_id=None):
+        self.call_type = call_type
+        self.session_id = session_id
+        self.model = None
+        self.source = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tokens_estimated = False
+        self.started = time.perf_counter()
+        self.wall_time = None
+        self.ttft = None
+        self.fallback_reason = None
+
+    @property
+    def cache_hit(self):
+        return self.source == 'cache'
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def first_token(self):
+        """Mark the arrival of the first streamed token"""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def usage(self, model, prompt_tokens, completion_tokens, estimated=False):
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.tokens_estimated = estimated
+
+    def fallback(self, error):
+        self.fallback_reason = fallback_reason(error)
+
+    def as_dict(self):
+        return {
+            'call_type': self.call_type,
+            'session_id': self.session_id,
+            'model': self.model,
+            'source': self.source,
+            'cache_hit': self.cache_hit,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'tokens_estimated': self.tokens_estimated,
+            'wall_time': self.wall_time,
+            'ttft': self.ttft,
+            'fallback_reason': self.fallback_reason
+        }
+
+
+class _Tracker:
+    """Context manager recording its entry in the ledger when the call completes"""
+
+    def __init__(self, ledger, entry):
+        self.ledger = ledger
+        self.entry = entry
+
+    def __enter__(self):
+        return self.entry
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self.entry.fallback_reason is None and isinstance(exc, Exception):
+            self.entry.fallback(exc)
+        self.ledger.record(self.entry)
+        return False
+
+
+class LLMLedger:
+    """Rolling record of every LLM call with per-session and per-process token budgets.
+
+    The last max_entries calls are kept for the aggregates shown in the debug
+    panel. Token usage is also summed per budget window (budget_window
+    seconds); once a session or the whole process has used its budget,
+    check_budget() raises BudgetExceeded so callers degrade to the local
+    engines until the window rolls over. A budget of None is unlimited.
+    """
+
+    def __init__(self, max_entries=1000, session_token_budget=None, process_token_budget=None, budget_window=86400.0):
+        self.session_token_budget = session_token_budget
+        self.process_token_budget = process_token_budget
+        self.budget_window = budget_window
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._window_started = time.monotonic()
+        self._process_tokens = 0
+        self._session_tokens = Counter()
+        self._totals = Counter()
+
+    @classmethod
+    def from_env(cls):
+        """Build a ledger configured from FINTWIN_LEDGER_* and FINTWIN_*_TOKEN_BUDGET environment variables"""
+        session_budget = os.getenv('FINTWIN_SESSION_TOKEN_BUDGET')
+        process_budget = os.getenv('FINTWIN_PROCESS_TOKEN_BUDGET')
+        return cls(
+            max_entries=int(os.getenv('FINTWIN_LEDGER_MAX_ENTRIES', 1000)),
+            session_token_budget=int(session_budget) if session_budget else None,
+            process_token_budget=int(process_budget) if process_budget else None,
+            budget_window=float(os.getenv('FINTWIN_TOKEN_BUDGET_WINDOW', 86400))
+        )
+
+    def track(self, call_type, session_id=None):
+        """Context manager yielding a LedgerEntry that is recorded on exit"""
+        return _Tracker(self, LedgerEntry(call_type, session_id))
+
+    def _roll_window(self):
+        if time.monotonic() - self._window_started >= self.budget_window:
+            self._window_started = time.monotonic()
+            self._process_tokens = 0
+            self._session_tokens.clear()
+
+    def check_budget(self, session_id, estimated_tokens):
+        """Raise BudgetExceeded if a call of estimated_tokens would exceed a budget"""
+        with self._lock:
+            self._roll_window()
+            if self.process_token_budget is not None and self._process_tokens + estimated_tokens > self.process_token_budget:
+                raise BudgetExceeded(f"Process token budget of {self.process_token_budget} exhausted")
+            if (session_id is not None and self.session_token_budget is not None
+                    and self._session_tokens[session_id] + estimated_tokens > self.session_token_budget):
+                raise BudgetExceeded(f"Session token budget of {self.session_token_budget} exhausted")
+
+    def record(self, entry):
+        if entry.wall_time is None:
+            entry.wall_time = time.perf_counter() - entry.started
+        with self._lock:
+            self._roll_window()
+            self._entries.append(entry)
+            self._totals['calls'] += 1
+            self._totals['tokens'] += entry.total_tokens
+            if entry.fallback_reason:
+                self._totals['fallbacks'] += 1
+            if entry.total_tokens:
+                self._process_tokens += entry.total_tokens
+                if entry.session_id is not None:
+                    self._session_tokens[entry.session_id] += entry.total_tokens
+
+    def entries(self, session_id=None):
+        """Recorded calls (as dicts), oldest first, optionally for one session"""
+        with self._lock:
+            entries = list(self._entries)
+        return [e.as_dict() for e in entries if session_id is None or e.session_id == session_id]
+
+    def stats(self, session_id=None):
+        """Aggregates over the recorded calls, plus budget usage for the process and session_id"""
+        with self._lock:
+            entries = list(self._entries)
+            totals = dict(self._totals)
+            process_tokens = self._process_tokens
+            session_tokens = self._session_tokens[session_id] if session_id is not None else None
+
+        api_calls = [e for e in entries if e.source == 'api']
+        wall_times = sorted(e.wall_time for e in entries)
+        ttfts = sorted(e.ttft for e in entries if e.ttft is not None)
+        by_call_type = {}
+        for call_type in sorted({e.call_type for e in entries}):
+            rows = [e for e in entries if e.call_type == call_type]
+            times = sorted(e.wall_time for e in rows)
+            by_call_type[call_type] = {
+                'calls': len(rows),
+                'tokens': sum(e.total_tokens for e in rows),
+                'p50_wall_time': _percentile(times, 50),
+                'p95_wall_time': _percentile(times, 95),
+                'fallbacks': sum(1 for e in rows if e.fallback_reason)
+            }
+
+        return {
+            'calls': len(entries),
+            'total_calls': totals.get('calls', 0),
+            'total_tokens': totals.get('tokens', 0),
+            'sources': dict(Counter(e.source or 'failed' for e in entries)),
+            'cache_hit_rate': sum(1 for e in entries if e.cache_hit) / len(entries) if entries else 0.0,
+            'prompt_tokens': sum(e.prompt_tokens for e in api_calls),
+            'completion_tokens': sum(e.completion_tokens for e in api_calls),
+            'models': dict(Counter(e.model for e in api_calls)),
+            'p50_wall_time': _percentile(wall_times, 50),
+            'p95_wall_time': _percentile(wall_times, 95),
+            'p50_ttft': _percentile(ttfts, 50),
+            'fallback_rate': sum(1 for e in entries if e.fallback_reason) / len(entries) if entries else 0.0,
+            'fallback_reasons': dict(Counter(e.fallback_reason for e in entries if e.fallback_reason)),
+            'by_call_type': by_call_type,
+            'process_tokens': process_tokens,
+            'process_token_budget': self.process_token_budget,
+            'session_tokens': session_tokens,
+            'session_token_budget': self.session_token_budget
+        }
+
+
+def _percentile(ordered, q):
+    return ordered[int(q / 100 * (len(ordered) - 1))] if ordered else None
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Return the LLM call ledger shared by every session in this server process"""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = LLMLedger.from_env()
+    return _ledger
+
+
+def reset_ledger():
+    """Drop the shared ledger so the next get_ledger() re-reads its configuration"""
+    global _ledger
+    with _ledger_lock:
+        _ledger = None
@@ -0,0 +1,57 @@
+import importlib
+import threading
+
+
+class LazyModelRegistry:
+    """Build expensive models and heavy dependencies on first use.
+
+    Factories are registered by name and only invoked the first time get() is
+    called, so importing a module or constructing a FinancialAI never pays for
+    prophet or the OpenAI SDK unless they are actually needed.
+    Instances are shared process-wide and construction is thread-safe.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """Register a zero-argument factory under name (replacing any previous one)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        """Return the instance for name, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def loaded(self):
+        """Names of the entries that have been built so far"""
+        return sorted(self._instances)
+
+    def reset(self, name=None):
+        """Drop one (or every) built instance so it is rebuilt on next use"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+def lazy_attribute(module_name, attribute):
+    """Factory returning module_name.attribute, importing the module when first called"""
+    return lambda: getattr(importlib.import_module(module_name), attribute)
+
+
+registry = LazyModelRegistry()
+registry.register('prophet', lazy_attribute('prophet', 'Prophet'))
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Model tiers, most capable (and slowest) first; downgrades move one tier down the list
+MODEL_TIERS = ("gpt-4-turbo-preview", "gpt-3.5-turbo-0125")
+
+# Per-task routing table. tier is the preferred model tier, slo the latency (seconds)
+# that the slo_percentile of recent calls must stay under before the task is
+# moved to the next, faster tier. timeout is the per-attempt timeout.
+DEFAULT_ROUTES = {
+    "financial_health": {"tier": 0, "max_tokens": 2000, "temperature": 0.7, "timeout": 20.0, "slo": 12.0},
+    "recommendations": {"tier": 0, "max_tokens": 2000, "temperature": 0.7, "timeout": 20.0, "slo": 12.0},
+    "simulation": {"tier": 1, "max_tokens": 1000, "temperature": 0.4, "timeout": 10.0, "slo": 5.0},
+    "categorization": {"tier": 1, "max_tokens": 1500, "temperature": 0.0, "timeout": 15.0, "slo": 8.0}
+}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Model and completion settings chosen for one request"""
+    task: str
+    model: str
+    tier: int
+    temperature: float
+    max_tokens: int
+    timeout: float
+    slo: float
+
+    @property
+    def params(self):
+        """Completion parameters passed to the chat API (and hashed into cache keys)"""
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens}
+
+
+class ModelRouter:
+    """Pick the model, max_tokens and timeout for each task and downgrade tasks missing their SLO.
+
+    Latency is observed per (task, model) over the last window calls. When a
+    task's slo_percentile latency on its current model exceeds the task's
+    SLO (with at least min_samples observations), the task moves to the next
+    tier for cooldown seconds, after which it returns to its preferred tier
+    and is re-evaluated from fresh samples.
+    """
+
+    def __init__(self, routes=None, tiers=MODEL_TIERS, window=50, min_samples=5, cooldown=300.0, slo_percentile=90):
+        self.routes = {task: dict(config) for task, config in (routes or DEFAULT_ROUTES).items()}
+        self.tiers = tuple(tiers)
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.slo_percentile = slo_percentile
+        self._samples = {}
+        self._current = {task: self._preferred(task) for task in self.routes}
+        self._downgraded_until = {}
+        self._lock = threading.Lock()
+        self._stats = {'downgrades': 0, 'recoveries': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a router configured from FINTWIN_MODEL_* and FINTWIN_ROUTER_* environment variables.
+
+        FINTWIN_MODEL_ROUTES is a JSON object of per-task settings merged over
+        DEFAULT_ROUTES, e.g. {"simulation": {"tier": 0, "slo": 8}}.
+        FINTWIN_MODEL_TIERS is a comma-separated model list, most capable first.
+        """
+        routes = {task: dict(config) for task, config in DEFAULT_ROUTES.items()}
+        overrides = os.getenv('FINTWIN_MODEL_ROUTES')
+        if overrides:
+            try:
+                for task, config in json.loads(overrides).items():
+                    routes.setdefault(task, dict(DEFAULT_ROUTES['financial_health'])).update(config)
+            except (ValueError, AttributeError) as e:
+                logger.warning("Ignoring invalid FINTWIN_MODEL_ROUTES: %s", e)
+        tiers = os.getenv('FINTWIN_MODEL_TIERS')
+        return cls(
+            routes=routes,
+            tiers=[t.strip() for t in tiers.split(',') if t.strip()] if tiers else MODEL_TIERS,
+            window=int(os.getenv('FINTWIN_ROUTER_WINDOW', 50)),
+            min_samples=int(os.getenv('FINTWIN_ROUTER_MIN_SAMPLES', 5)),
+            cooldown=float(os.getenv('FINTWIN_ROUTER_COOLDOWN', 300))
+        )
+
+    def _preferred(self, task):
+        return min(max(int(self._config(task)['tier']), 0), len(self.tiers) - 1)
+
+    def _config(self, task):
+        return self.routes.get(task) or self.routes.get('financial_health') or DEFAULT_ROUTES['financial_health']
+
+    def route(self, task):
+        """Route for the next call of task"""
+        config = self._config(task)
+        with self._lock:
+            tier = self._current.get(task)
+            if tier is None:
+                tier = self._current[task] = self._preferred(task)
+            until = self._downgraded_until.get(task)
+            if until is not None and time.monotonic() >= until:
+                # Cooldown over: try the preferred tier again with fresh samples
+                del self._downgraded_until[task]
+                tier = self._current[task] = self._preferred(task)
+                self._samples.pop((task, self.tiers[tier]), None)
+                self._stats['recoveries'] += 1
+        return Route(
+            task=task,
+            model=self.tiers[tier],
+            tier=tier,
+            temperature=float(config['temperature']),
+            max_tokens=int(config['max_tokens']),
+            timeout=float(config['timeout']),
+            slo=float(config['slo'])
+        )
+
+    def observe(self, route, seconds):
+        """Record the latency of a completed call and downgrade route.task if it is missing its SLO"""
+        with self._lock:
+            samples = self._samples.setdefault((route.task, route.model), deque(maxlen=self.window))
+            samples.append(seconds)
+            if self._current.get(route.task) != route.tier or route.tier >= len(self.tiers) - 1:
+                return
+            if len(samples) >= self.min_samples and _percentile(samples, self.slo_percentile) > route.slo:
+                self._current[route.task] = route.tier + 1
+                self._downgraded_until[route.task] = time.monotonic() + self.cooldown
+                self._stats['downgrades'] += 1
+                logger.warning(
+                    "%s p%d latency on %s is over its %.1fs SLO; using %s for %.0fs",
+                    route.task, self.slo_percentile, route.model, route.slo, self.tiers[route.tier + 1], self.cooldown
+                )
+
+    def observe_failure(self, route, seconds, error):
+        """Record a failed attempt if its error says anything about the model's latency.
+
+        Timeouts are counted as taking at least route.timeout; connection
+        errors and 5xx responses at the time they actually took. Rate limits
+        (429), other 4xx responses and any other error are ignored so they
+        cannot downgrade the task.
+        """
+        # Imported here so importing this module does not load the OpenAI SDK
+        from openai import APITimeoutError
+        if isinstance(error, APITimeoutError):
+            self.observe(route, max(seconds, route.timeout))
+        elif self.is_latency_failure(error):
+            self.observe(route, seconds)
+
+    @staticmethod
+    def is_latency_failure(error):
+        from openai import APIConnectionError, APIStatusError
+        # APITimeoutError is an APIConnectionError
+        if isinstance(error, APIConnectionError):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+
+    def stats(self):
+        """Return each task's current model and recent latency, and per-model latency"""
+        now = time.monotonic()
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            current = dict(self._current)
+            until = dict(self._downgraded_until)
+            stats = dict(self._stats)
+
+        tasks = {}
+        for task in sorted(set(self.routes) | set(current)):
+            tier = current.get(task, self._preferred(task))
+            model = self.tiers[tier]
+            task_samples = samples.get((task, model), [])
+            tasks[task] = {
+                'model': model,
+                'tier': tier,
+                'preferred_tier': self._preferred(task),
+                'slo': float(self._config(task)['slo']),
+                'latency': _percentile(task_samples, self.slo_percentile) if task_samples else None,
+                'downgraded_for': max(0.0, until[task] - now) if task in until else 0.0
+            }
+        models = {}
+        for model in self.tiers:
+            values = sorted(v for (_, m), vs in samples.items() if m == model for v in vs)
+            if values:
+                models[model] = {
+                    'calls': len(values),
+                    'p50': _percentile(values, 50),
+                    'p95': _percentile(values, 95)
+                }
+        stats['tasks'] = tasks
+        stats['models'] = models
+        stats['slo_percentile'] = self.slo_percentile
+        return stats
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q / 100 * (len(ordered) - 1))]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_model_router():
+    """Return the model router shared by every session in this server process"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter.from_env()
+    return _router
+
+
+def reset_model_router():
+    """Drop the shared router so the next get_model_router() re-reads its configuration"""
+    global _router
+    with _router_lock:
+        _router = None
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from expense_store import as_expense_store
+
+# Default input-token budgets (system prompt + instruction + data) per call type
+DEFAULT_INPUT_BUDGETS = {
+    'financial_health': 3000,
+    'simulation': 2500,
+    'recommendations': 3500,
+    'categorization': 3000
+}
+
+# Progressively more aggressive summaries tried until the prompt fits its budget
+COMPACTION_LEVELS = [
+    {'recent_months': 3, 'older_by_category': True, 'trends': True, 'analysis': True},
+    {'recent_months': 1, 'older_by_category': True, 'trends': True, 'analysis': True},
+    {'recent_months': 1, 'older_by_category': False, 'trends': True, 'analysis': False},
+    {'recent_months': 0, 'older_by_category': False, 'trends': False, 'analysis': False}
+]
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; False if tiktoken or its data is unavailable"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding('cl100k_base')
+                except Exception:
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """Count tokens locally with tiktoken, or estimate ~4 characters per token without it"""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+class PromptBuilder:
+    """Build compact, token-budgeted chat messages for FinancialAI requests.
+
+    Monthly expense history is summarized into per-category totals, trends,
+    the most recent months in full and older months rolled up per year. The
+    summary is made more aggressive until the prompt fits the call type's
+    input budget. Messages always start with the unchanging system prompt and
+    per-call-type instruction, so the prefix stays stable (and cacheable on the
+    provider side) with only the data varying at the end.
+    """
+
+    def __init__(self, system_prompt, instructions, budgets=None):
+        self.system_prompt = system_prompt
+        self.instructions = instructions
+        self.budgets = dict(DEFAULT_INPUT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self._system_tokens = None
+
+    @property
+    def system_tokens(self):
+        # Counted on first use so construction never loads the tokenizer
+        if self._system_tokens is None:
+            self._system_tokens = count_tokens(self.system_prompt)
+        return self._system_tokens
+
+    @classmethod
+    def from_env(cls, system_prompt, instructions):
+        """Build a prompt builder with budgets from FINTWIN_INPUT_BUDGET_<CALL_TYPE> variables"""
+        budgets = {}
+        for call_type in instructions:
+            value = os.getenv(f"FINTWIN_INPUT_BUDGET_{call_type.upper()}")
+            if value:
+                budgets[call_type] = int(value)
+        return cls(system_prompt, instructions, budgets)
+
+    def build_messages(self, call_type, payload):
+        """Return (messages, prompt_tokens) for the request, compacted to fit its budget"""
+        instruction = self.instructions[call_type]
+        budget = self.budgets.get(call_type)
+        for level in COMPACTION_LEVELS:
+            content = instruction + self._serialize(self.compact_payload(payload, level))
+            prompt_tokens = self.system_tokens + count_tokens(content)
+            if budget is None or prompt_tokens <= budget:
+                break
+        else:
+            # Still over budget: drop auxiliary context before giving up
+            compact = self.compact_payload(payload, COMPACTION_LEVELS[-1])
+            for field in ('predictions', 'simulations'):
+                if compact.get(field):
+                    compact[field] = None
+            content = instruction + self._serialize(compact)
+            prompt_tokens = self.system_tokens + count_tokens(content)
+            if prompt_tokens > budget:
+                print(f"Prompt for {call_type} uses {prompt_tokens} tokens, over its {budget} token budget")
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": content}
+        ]
+        return messages, prompt_tokens
+
+    def compact_payload(self, payload, level=COMPACTION_LEVELS[0]):
+        """Replace the raw user data in payload with a compact summary"""
+        compact = {k: v for k, v in payload.items() if k != 'timestamp'}
+        compact['as_of'] = datetime.now().strftime('%Y-%m-%d')
+        if 'user_data' in compact:
+            compact['user_data'] = self.summarize_user_data(compact['user_data'], level)
+        return compact
+
+    def summarize_user_data(self, user_data, level=COMPACTION_LEVELS[0]):
+        """Summarize imported financial data; other shapes are passed through unchanged"""
+        if not isinstance(user_data, dict) or 'monthly_expenses' not in user_data:
+            return user_data
+
+        summary = {
+            'basic_info': user_data.get('basic_info', {}),
+            'expenses': self.summarize_expenses(user_data.get('monthly_expenses') or {}, level)
+        }
+        analysis_summary = (user_data.get('analysis') or {}).get('summary')
+        if level['analysis'] and analysis_summary:
+            summary['analysis_summary'] = analysis_summary
+        return summary
+
+    def summarize_expenses(self, monthly_expenses, level=COMPACTION_LEVELS[0]):
+        """Aggregate month -> category -> amount history (or an ExpenseStore) into a compact summary"""
+        store = as_expense_store(monthly_expenses)
+        if not len(store):
+            return {'months': 0}
+
+        months = store.month_keys
+        categories = store.categories
+        values = store.values
+        monthly_totals = [round(total, 2) for total in store.month_totals().tolist()]
+        category_totals = dict(zip(categories, store.category_totals().tolist()))
+
+        summary = {
+            'months': len(months),
+            'period': [months[0], months[-1]],
+            'monthly_average': round(sum(monthly_totals) / len(months), 2),
+            'category_totals': {c: round(a, 2) for c, a in category_totals.items() if a},
+        }
+
+        if level['trends'] and len(months) > 1:
+            summary['monthly_total_trend'] = round(self._slope(monthly_totals), 2)
+            summary['category_trends'] = {
+                category: round(self._slope(values[:, j].tolist()), 2)
+                for j, category in enumerate(categories) if category_totals[category]
+            }
+
+        recent_start = max(len(months) - level['recent_months'], 0) if level['recent_months'] else len(months)
+        if recent_start < len(months):
+            summary['recent_months'] = {
+                months[i]: {c: a for c, a in zip(categories, values[i].tolist()) if a}
+                for i in range(recent_start, len(months))
+            }
+
+        if recent_start:
+            rollup = {}
+            years = [month.partition('-')[0] for month in months[:recent_start]]
+            for year in dict.fromkeys(years):
+                rows = [i for i, y in enumerate(years) if y == year]
+                bucket = rollup[year] = {'months': len(rows), 'total': round(float(values[rows].sum()), 2)}
+                if level['older_by_category']:
+                    bucket['by_category'] = {
+                        c: round(a, 2) for c, a in zip(categories, values[rows].sum(axis=0).tolist()) if a
+                    }
+            summary['older_months'] = rollup
+
+        return summary
+
+    @staticmethod
+    def _slope(values):
+        """Least-squares change per month"""
+        n = len(values)
+        mean_x = (n - 1) / 2
+        mean_y = sum(values) / n
+        variance = sum((x - mean_x) ** 2 for x in range(n))
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+        return covariance / variance if variance else 0.0
+
+    @staticmethod
+    def _serialize(payload):
+        return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
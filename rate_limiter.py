@@ -0,0 +1,201 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+# Request priorities (lower is served first)
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a request waits in the scheduler queue longer than allowed"""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity_per_minute / 60 per second"""
+
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount, now):
+        """Seconds until amount tokens are available (amount is capped at capacity)"""
+        self.refill(now)
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate) if self.rate > 0 else float('inf')
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) tokens after the real usage is known"""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RequestScheduler:
+    """Process-wide admission control for outbound OpenAI calls.
+
+    Callers block in acquire() until both the requests/min and tokens/min
+    buckets allow the call. Waiting callers are served strictly by priority
+    and then arrival order, so interactive page loads overtake background
+    precomputation queued earlier.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=150000, queue_timeout=60.0, max_rate_limit_retries=3):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.queue_timeout = queue_timeout
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._wait_times = deque(maxlen=1000)
+        self._stats = {
+            'granted': 0,
+            'rate_limited': 0,
+            'timeouts': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a scheduler configured from FINTWIN_RATE_LIMIT_* environment variables"""
+        return cls(
+            requests_per_minute=float(os.getenv('FINTWIN_RATE_LIMIT_RPM', 500)),
+            tokens_per_minute=float(os.getenv('FINTWIN_RATE_LIMIT_TPM', 150000)),
+            queue_timeout=float(os.getenv('FINTWIN_QUEUE_TIMEOUT', 60)),
+            max_rate_limit_retries=int(os.getenv('FINTWIN_RATE_LIMIT_RETRIES', 3))
+        )
+
+    def acquire(self, estimated_tokens, priority=INTERACTIVE, timeout=None):
+        """Block until the request may be sent; return the time spent waiting"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        ticket = (priority, next(self._sequence))
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == ticket:
+                        wait = max(
+                            self._paused_until - now,
+                            self.request_bucket.time_until(1, now),
+                            self.token_bucket.time_until(estimated_tokens, now)
+                        )
+                        if wait <= 0:
+                            self.request_bucket.consume(1)
+                            self.token_bucket.consume(estimated_tokens)
+                            heapq.heappop(self._queue)
+                            waited = now - started
+                            self._wait_times.append(waited)
+                            self._stats['granted'] += 1
+                            return waited
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._queue.remove(ticket)
+                            heapq.heapify(self._queue)
+                            self._stats['timeouts'] += 1
+                            raise SchedulerTimeout(f"Request waited {now - started:.1f}s in the OpenAI request queue")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                # Let the next ticket at the head of the queue re-evaluate
+                self._condition.notify_all()
+
+    def try_acquire(self, estimated_tokens):
+        """Admit the request only if nobody is queued and both buckets allow it right now"""
+        with self._condition:
+            now = time.monotonic()
+            if self._queue or self._paused_until > now:
+                return False
+            if self.request_bucket.time_until(1, now) > 0 or self.token_bucket.time_until(estimated_tokens, now) > 0:
+                return False
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self._wait_times.append(0.0)
+            self._stats['granted'] += 1
+            return True
+
+    def report_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the provider reports real usage"""
+        with self._condition:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+            self._condition.notify_all()
+
+    def report_rate_limited(self, retry_after=None):
+        """Back off after a provider 429 so queued requests wait instead of failing"""
+        with self._condition:
+            self._stats['rate_limited'] += 1
+            self.request_bucket.drain()
+            self.token_bucket.drain()
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return queue depth, wait-time and throttling metrics"""
+        with self._condition:
+            now = time.monotonic()
+            self.request_bucket.refill(now)
+            self.token_bucket.refill(now)
+            waits = sorted(self._wait_times)
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+            stats['interactive_waiting'] = sum(1 for priority, _ in self._queue if priority <= INTERACTIVE)
+            stats['background_waiting'] = stats['queue_depth'] - stats['interactive_waiting']
+            stats['avg_wait'] = sum(waits) / len(waits) if waits else 0.0
+            stats['p95_wait'] = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+            stats['max_wait'] = waits[-1] if waits else 0.0
+            stats['requests_available'] = self.request_bucket.tokens
+            stats['tokens_available'] = self.token_bucket.tokens
+            stats['paused_for'] = max(0.0, self._paused_until - now)
+            return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the scheduler shared by every session in this server process"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler.from_env()
+    return _scheduler
+
+
+def reset_scheduler():
+    """Drop the shared scheduler so the next get_scheduler() re-reads its configuration"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
+
+
+def retry_after_seconds(error):
+    """Extract the Retry-After delay from a provider error, if present"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,247 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from expense_store import as_expense_store
+from health_scoring import FEATURES, component_scores, compute_features, household_inputs
+
+# Monthly income band edges; households in the same band share the income coordinate
+INCOME_BANDS = (0, 2000, 3000, 4000, 5000, 6500, 8000, 10000, 15000, 25000)
+
+# Categories of the spending mix (the app's expense categories); anything else counts as 'Other'
+MIX_CATEGORIES = (
+    "Rent/Mortgage", "Utilities", "Groceries", "Transportation", "Entertainment", "Healthcare",
+    "Insurance", "Education", "Shopping", "Dining Out", "Travel", "Other"
+)
+
+VECTOR_FEATURES = ('income_band', 'savings_rate', 'debt_to_income') + tuple(f'mix:{c}' for c in MIX_CATEGORIES)
+
+# Recent nearest-neighbour distances kept for the distance distribution
+DISTANCE_SAMPLES = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def household_vector(user_data):
+    """Normalized feature vector of a household: income band, savings rate, DTI and category mix.
+
+    Every coordinate lies in [0, 1]: the income band index is scaled by the
+    number of bands, savings rate and debt-to-income use the health scoring
+    bounds (1 is healthiest), and the mix holds each category's share of
+    total spending.
+    """
+    user_data = user_data or {}
+    store = as_expense_store(user_data.get('monthly_expenses'))
+    inputs = household_inputs({**user_data, 'monthly_expenses': store})
+    scores = component_scores(compute_features(inputs))[0]
+    band = np.searchsorted(INCOME_BANDS, inputs[0], side='right') - 1
+    income_band = max(band, 0) / (len(INCOME_BANDS) - 1)
+
+    mix = np.zeros(len(MIX_CATEGORIES))
+    other = MIX_CATEGORIES.index('Other')
+    positions = [MIX_CATEGORIES.index(c) if c in MIX_CATEGORIES else other for c in store.categories]
+    np.add.at(mix, positions, store.category_totals())
+    total = mix.sum()
+    if total > 0:
+        mix /= total
+
+    return np.concatenate([
+        [income_band, scores[FEATURES.index('savings_rate')], scores[FEATURES.index('debt_to_income')]],
+        mix
+    ])
+
+
+class RecommendationIndex:
+    """In-memory nearest-neighbour index from household vectors to stored recommendations.
+
+    Lookups compare the query against every stored vector at once (NumPy
+    brute force, which stays well under a millisecond for thousands of
+    households). A stored result is reused when its Euclidean distance to
+    the query is below threshold; a threshold of 0 disables reuse. Beyond
+    max_entries, the least recently used tenth is evicted. With a path, the
+    index is loaded from and periodically saved to a compressed .npz file.
+    """
+
+    def __init__(self, dim=len(VECTOR_FEATURES), threshold=0.05, max_entries=5000, path=None, save_every=20):
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self._vectors = np.empty((0, dim))
+        self._payloads = []
+        self._last_used = np.empty(0, dtype=np.int64)
+        self._clock = 0
+        self._unsaved = 0
+        self._distances = deque(maxlen=DISTANCE_SAMPLES)
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'added': 0, 'replaced': 0, 'evictions': 0}
+        if path:
+            self.load()
+
+    @classmethod
+    def from_env(cls):
+        """Build an index configured from FINTWIN_REC_INDEX_* environment variables"""
+        return cls(
+            threshold=float(os.getenv('FINTWIN_REC_INDEX_THRESHOLD', 0.05)),
+            max_entries=int(os.getenv('FINTWIN_REC_INDEX_MAX_ENTRIES', 5000)),
+            path=os.getenv('FINTWIN_REC_INDEX_PATH', '.fintwin_index/recommendations.npz') or None
+        )
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def _nearest(self, vector):
+        """Position and distance of the stored vector closest to vector, or (None, inf)"""
+        if not self._payloads:
+            return None, float('inf')
+        distances = np.sqrt(np.square(self._vectors - vector).sum(axis=1))
+        position = int(distances.argmin())
+        return position, float(distances[position])
+
+    def lookup(self, vector):
+        """Stored recommendations for the nearest household within threshold, or None"""
+        vector = np.asarray(vector, dtype=float)
+        with self._lock:
+            self._stats['lookups'] += 1
+            position, distance = self._nearest(vector)
+            if position is not None:
+                self._distances.append(distance)
+            if position is None or distance >= self.threshold:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._clock += 1
+            self._last_used[position] = self._clock
+            return self._payloads[position]
+
+    def add(self, vector, recommendations):
+        """Store recommendations for vector (replacing an identical vector's entry)"""
+        vector = np.asarray(vector, dtype=float)
+        with self._lock:
+            self._clock += 1
+            position, distance = self._nearest(vector)
+            if position is not None and distance < 1e-9:
+                self._payloads[position] = recommendations
+                self._last_used[position] = self._clock
+                self._stats['replaced'] += 1
+            else:
+                if len(self._payloads) >= self.max_entries:
+                    self._evict()
+                self._vectors = np.vstack([self._vectors, vector])
+                self._payloads.append(recommendations)
+                self._last_used = np.append(self._last_used, self._clock)
+                self._stats['added'] += 1
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def _evict(self):
+        """Drop the least recently used tenth of the entries (at least one)"""
+        count = max(1, len(self._payloads) // 10)
+        drop = set(np.argsort(self._last_used)[:count].tolist())
+        keep = np.array([i not in drop for i in range(len(self._payloads))])
+        self._vectors = self._vectors[keep]
+        self._last_used = self._last_used[keep]
+        self._payloads = [p for p, k in zip(self._payloads, keep) if k]
+        self._stats['evictions'] += count
+
+    def load(self):
+        """Load the index from path, if the file exists and matches this index's dimension"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                vectors = data['vectors']
+                last_used = data['last_used']
+                payloads = json.loads(str(data['payloads']))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable recommendation index %s: %s", self.path, e)
+            return
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim or len(payloads) != len(vectors):
+            logger.warning("Ignoring recommendation index %s built for other features", self.path)
+            return
+        with self._lock:
+            keep = slice(max(0, len(payloads) - self.max_entries), None)
+            self._vectors = vectors[keep].astype(float)
+            self._last_used = last_used[keep].astype(np.int64)
+            self._payloads = payloads[keep]
+            self._clock = int(self._last_used.max()) if len(self._last_used) else 0
+
+    def save(self):
+        """Write the index to path atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            vectors = self._vectors.copy()
+            last_used = self._last_used.copy()
+            payloads = json.dumps(self._payloads)
+            self._unsaved = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp.npz"
+        try:
+            np.savez_compressed(tmp_path, vectors=vectors, last_used=last_used, payloads=np.array(payloads))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save recommendation index %s: %s", self.path, e)
+
+    def clear(self):
+        with self._lock:
+            self._vectors = np.empty((0, self.dim))
+            self._payloads = []
+            self._last_used = np.empty(0, dtype=np.int64)
+            self._distances.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def stats(self):
+        """Return hit rate, size and the distribution of recent nearest-neighbour distances"""
+        with self._lock:
+            stats = dict(self._stats)
+            distances = np.array(self._distances)
+            stats['entries'] = len(self._payloads)
+        stats['threshold'] = self.threshold
+        stats['hit_rate'] = stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0
+        if distances.size:
+            p10, p50, p90 = np.percentile(distances, [10, 50, 90])
+            stats['distance_percentiles'] = {'p10': float(p10), 'p50': float(p50), 'p90': float(p90)}
+            # Share of recent lookups within 1x, 2x and 4x the threshold
+            stats['within_threshold'] = {
+                f"{k}x": float((distances < k * self.threshold).mean()) for k in (1, 2, 4)
+            }
+        else:
+            stats['distance_percentiles'] = None
+            stats['within_threshold'] = None
+        return stats
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_recommendation_index():
+    """Return the recommendation index shared by every session in this server process"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = RecommendationIndex.from_env()
+                atexit.register(_index.save)
+    return _index
+
+
+def reset_recommendation_index():
+    """Save and drop the shared index so the next get_recommendation_index() re-reads its configuration"""
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.save()
+        _index = None
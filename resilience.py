@@ -0,0 +1,369 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from rate_limiter import retry_after_seconds
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around the chat completion provider.
+
+    After failure_threshold consecutive failures the breaker opens and every
+    call fails fast for recovery_timeout seconds. A single probe call is then
+    let through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.short_circuited = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may be made now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.short_circuited += 1
+                    raise CircuitOpenError("OpenAI circuit breaker is open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.short_circuited += 1
+                    raise CircuitOpenError("OpenAI circuit breaker is half-open and probing")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Release a half-open probe whose outcome says nothing about provider health"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'short_circuited': self.short_circuited,
+                'retry_in': retry_in
+            }
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable provider errors"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Backoff before retry number attempt (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def is_retryable(error):
+        """Timeouts, connection errors and 5xx responses may succeed on another attempt"""
+        # Imported here so importing this module does not load the OpenAI SDK
+        from openai import APIConnectionError, APITimeoutError, InternalServerError
+        return isinstance(error, (APITimeoutError, APIConnectionError, InternalServerError))
+
+    @staticmethod
+    def is_rate_limited(error):
+        from openai import RateLimitError
+        return isinstance(error, RateLimitError)
+
+    @staticmethod
+    def is_timeout(error):
+        from openai import APITimeoutError
+        return isinstance(error, APITimeoutError)
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class ResilientCaller:
+    """Run chat completion attempts with latency budgets, retries, a breaker and optional hedging.
+
+    send(timeout) performs one attempt. Each attempt is admitted by the
+    shared request scheduler, gets at most attempt_timeout seconds, and the
+    whole call (queueing, retries and backoff) must finish within
+    latency_budget seconds. With hedging enabled, a second identical request
+    is fired when the first has not returned within the observed p95 latency,
+    and whichever finishes first wins.
+    """
+
+    def __init__(self, breaker=None, retry_policy=None, attempt_timeout=20.0, latency_budget=45.0,
+                 hedge_requests=False, hedge_quantile=0.95, hedge_min_samples=20):
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.latency = LatencyTracker()
+        self.attempt_timeout = attempt_timeout
+        self.latency_budget = latency_budget
+        self.hedge_requests = hedge_requests
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fintwin-hedge') if hedge_requests else None
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'hedges_fired': 0,
+            'hedges_won': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a caller configured from FINTWIN_LLM_* / FINTWIN_BREAKER_* environment variables"""
+        return cls(
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('FINTWIN_BREAKER_FAILURES', 5)),
+                recovery_timeout=float(os.getenv('FINTWIN_BREAKER_RECOVERY', 30))
+            ),
+            retry_policy=RetryPolicy(
+                max_attempts=int(os.getenv('FINTWIN_LLM_MAX_ATTEMPTS', 3)),
+                base_delay=float(os.getenv('FINTWIN_LLM_BACKOFF_BASE', 0.5)),
+                max_delay=float(os.getenv('FINTWIN_LLM_BACKOFF_MAX', 8))
+            ),
+            attempt_timeout=float(os.getenv('FINTWIN_LLM_TIMEOUT', 20)),
+            latency_budget=float(os.getenv('FINTWIN_LLM_BUDGET', 45)),
+            hedge_requests=os.getenv('FINTWIN_HEDGE_REQUESTS', '0').lower() in ('1', 'true', 'yes')
+        )
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None until enough latency samples exist"""
+        if not self.hedge_requests or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_quantile)
+
+    def call(self, send, scheduler, estimated_tokens, priority, hedge=True, timeout=None):
+        """Perform send through the scheduler with retries; raise the last error on failure"""
+        self._count('calls')
+        attempt_timeout = timeout or self.attempt_timeout
+        deadline = time.monotonic() + self.latency_budget
+        failures = 0
+        rate_limited = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                scheduler.acquire(estimated_tokens, priority, timeout=self._remaining(deadline, scheduler.queue_timeout))
+            except Exception:
+                self.breaker.release()
+                raise
+            attempt_budget = self._remaining(deadline, attempt_timeout)
+            started = time.monotonic()
+            try:
+                hedge_after = self.hedge_delay() if hedge else None
+                if hedge_after is not None and hedge_after < attempt_budget:
+                    response = self._hedged(send, attempt_budget, hedge_after, scheduler, estimated_tokens, priority)
+                else:
+                    response = send(attempt_budget)
+            except Exception as e:
+                if self.retry_policy.is_rate_limited(e):
+                    self.breaker.release()
+                    scheduler.report_rate_limited(retry_after_seconds(e))
+                    rate_limited += 1
+                    if rate_limited > scheduler.max_rate_limit_retries:
+                        raise
+                    continue
+                if not self.retry_policy.is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if self.retry_policy.is_timeout(e):
+                    self._count('timeouts')
+                failures += 1
+                delay = self.retry_policy.delay(failures)
+                if failures >= self.retry_policy.max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                self._count('retries')
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.latency.record(time.monotonic() - started)
+            return response
+
+    async def call_async(self, send, scheduler, estimated_tokens, priority, hedge=True, timeout=None):
+        """Async counterpart of call(); send(timeout) must return an awaitable"""
+        self._count('calls')
+        loop = asyncio.get_running_loop()
+        attempt_timeout = timeout or self.attempt_timeout
+        deadline = time.monotonic() + self.latency_budget
+        failures = 0
+        rate_limited = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                await loop.run_in_executor(
+                    None, scheduler.acquire, estimated_tokens, priority,
+                    self._remaining(deadline, scheduler.queue_timeout)
+                )
+            except Exception:
+                self.breaker.release()
+                raise
+            attempt_budget = self._remaining(deadline, attempt_timeout)
+            started = time.monotonic()
+            try:
+                hedge_after = self.hedge_delay() if hedge else None
+                if hedge_after is not None and hedge_after < attempt_budget:
+                    response = await self._hedged_async(send, attempt_budget, hedge_after, scheduler, estimated_tokens, priority)
+                else:
+                    response = await send(attempt_budget)
+            except Exception as e:
+                if self.retry_policy.is_rate_limited(e):
+                    self.breaker.release()
+                    scheduler.report_rate_limited(retry_after_seconds(e))
+                    rate_limited += 1
+                    if rate_limited > scheduler.max_rate_limit_retries:
+                        raise
+                    continue
+                if not self.retry_policy.is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if self.retry_policy.is_timeout(e):
+                    self._count('timeouts')
+                failures += 1
+                delay = self.retry_policy.delay(failures)
+                if failures >= self.retry_policy.max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                self._count('retries')
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.latency.record(time.monotonic() - started)
+            return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['p50_latency'] = self.latency.percentile(0.5)
+        stats['p95_latency'] = self.latency.percentile(0.95)
+        stats['hedge_after'] = self.hedge_delay()
+        stats['breaker'] = self.breaker.stats()
+        return stats
+
+    def _hedged(self, send, timeout, hedge_after, scheduler, estimated_tokens, priority):
+        primary = self._executor.submit(send, timeout)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done or not scheduler.try_acquire(estimated_tokens):
+            return primary.result()
+
+        self._count('hedges_fired')
+        hedge = self._executor.submit(send, max(0.1, timeout - hedge_after))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedges_won')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _hedged_async(self, send, timeout, hedge_after, scheduler, estimated_tokens, priority):
+        primary = asyncio.ensure_future(send(timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done or not scheduler.try_acquire(estimated_tokens):
+            return await primary
+
+        self._count('hedges_fired')
+        hedge = asyncio.ensure_future(send(max(0.1, timeout - hedge_after)))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self._count('hedges_won')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _remaining(self, deadline, cap):
+        return max(0.1, min(cap, deadline - time.monotonic()))
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+_caller = None
+_caller_lock = threading.Lock()
+
+
+def get_resilient_caller():
+    """Return the caller (and breaker) shared by every session in this server process"""
+    global _caller
+    if _caller is None:
+        with _caller_lock:
+            if _caller is None:
+                _caller = ResilientCaller.from_env()
+    return _caller
+
+
+def reset_resilient_caller():
+    """Drop the shared caller so the next get_resilient_caller() re-reads its configuration"""
+    global _caller
+    with _caller_lock:
+        _caller = None
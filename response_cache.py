@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _canonical_default(value):
+    # Objects that fingerprint their own contents (an ExpenseStore) are hashed by it, not serialized
+    fingerprint = getattr(value, 'fingerprint', None)
+    return {'fingerprint': fingerprint()} if callable(fingerprint) else str(value)
+
+
+def canonical_hash(value):
+    """Return a SHA-256 hex digest of value serialized as canonical JSON"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=_canonical_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (in-memory LRU + disk) cache for LLM responses.
+
+    Entries are keyed by a canonical hash of the request, so identical
+    analyses issued on different reruns or sessions are served locally.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=24 * 3600, disk_dir=None, max_disk_bytes=50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk_index = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'expired': 0,
+            'evictions': 0
+        }
+        if self.disk_dir:
+            self._load_disk_index()
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from FINTWIN_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv('FINTWIN_CACHE_MAX_ENTRIES', 256)),
+            ttl_seconds=float(os.getenv('FINTWIN_CACHE_TTL', 24 * 3600)),
+            disk_dir=os.getenv('FINTWIN_CACHE_DIR', '.fintwin_cache') or None,
+            max_disk_bytes=int(float(os.getenv('FINTWIN_CACHE_MAX_DISK_MB', 50)) * 1024 * 1024)
+        )
+
+    @staticmethod
+    def make_key(model, prompt_version, params, payload, exclude=('timestamp',)):
+        """Hash the request into a stable key, ignoring volatile payload fields"""
+        if isinstance(payload, dict):
+            payload = {k: v for k, v in payload.items() if k not in exclude}
+        return canonical_hash({
+            'model': model,
+            'prompt_version': prompt_version,
+            'params': params,
+            'payload': payload
+        })
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if self._is_fresh(created_at):
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    return value
+                self._stats['expired'] += 1
+                del self._memory[key]
+
+            if self.disk_dir and key in self._disk_index:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    created_at, value = entry
+                    self._remember(key, created_at, value)
+                    self._stats['hits'] += 1
+                    self._stats['disk_hits'] += 1
+                    return value
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        """Store value under key in both tiers"""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, value)
+            if self.disk_dir:
+                self._write_disk(key, created_at, value)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._remove_disk(key)
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = len(self._disk_index)
+            stats['disk_bytes'] = self._disk_bytes
+            return stats
+
+    def _is_fresh(self, created_at):
+        return self.ttl_seconds is None or time.time() - created_at < self.ttl_seconds
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _load_disk_index(self):
+        """Index existing disk entries, oldest first, so eviction order survives restarts"""
+        if not os.path.isdir(self.disk_dir):
+            return
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._remove_disk(key)
+            return None
+        if not self._is_fresh(entry.get('created_at', 0)):
+            self._stats['expired'] += 1
+            self._remove_disk(key)
+            return None
+        self._disk_index.move_to_end(key)
+        return entry['created_at'], entry['value']
+
+    def _write_disk(self, key, created_at, value):
+        path = self._disk_path(key)
+        try:
+            data = json.dumps({'created_at': created_at, 'value': value}, default=str).encode('utf-8')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing response cache entry: {e}")
+            return
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(data)
+        self._disk_bytes += len(data)
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_index) > 1:
+            oldest = next(iter(self._disk_index))
+            self._remove_disk(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove_disk(self, key):
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
@@ -0,0 +1,119 @@
+import numpy as np
+
+from health_scoring import household_inputs, score_inputs
+from expense_store import as_expense_store
+
+# Parameter grid (percent) evaluated by default
+DEFAULT_PERCENTAGES = tuple(range(0, 101, 5))
+
+# Savings rate marked as the goal on every surface (matches the savings recommendation threshold)
+DEFAULT_SAVINGS_RATE_GOAL = 0.2
+
+ALL_EXPENSES = 'All expenses'
+
+
+def expense_matrix(monthly_expenses):
+    """Months x categories array of expenses (months in calendar order), with the sorted category names"""
+    store = as_expense_store(monthly_expenses)
+    order = sorted(range(len(store.categories)), key=store.categories.__getitem__)
+    return store.values[:, order], [store.categories[j] for j in order]
+
+
+def _first_reaching(values, grid, threshold):
+    """Grid value of the first column at or above threshold in each row, or None"""
+    reached = values >= threshold
+    first = reached.argmax(axis=1)
+    return [float(grid[i]) if reached[r, i] else None for r, i in enumerate(first)]
+
+
+def _surface(scenario, parameter, rows, grid, inputs, base, goal):
+    """Score an (rows x grid) stack of health inputs against base (the unmodified inputs) and mark break-even and goal points"""
+    shape = (len(rows), len(grid))
+    scored = score_inputs(inputs.reshape(-1, inputs.shape[-1]))
+    income = inputs[..., 0]
+    avg_expense = inputs[..., 3]
+    monthly_net = income - avg_expense
+    savings_rate = scored['features'][:, 0].reshape(shape)
+    monthly_change = monthly_net - (base[0] - base[3])
+
+    return {
+        'scenario': scenario,
+        'parameter': parameter,
+        'rows': list(rows),
+        'values': [float(v) for v in grid],
+        'metrics': {
+            'monthly_net': np.round(monthly_net, 2).tolist(),
+            'monthly_change': np.round(monthly_change, 2).tolist(),
+            'annual_impact': np.round(12 * monthly_change, 2).tolist(),
+            'savings_rate': np.round(savings_rate, 4).tolist(),
+            'health_score': scored['health_score'].reshape(shape).tolist(),
+            'risk_level': scored['risk_level'].reshape(shape).tolist()
+        },
+        # Smallest parameter value at which monthly cash flow is no longer negative
+        'break_even': dict(zip(rows, _first_reaching(monthly_net, grid, 0.0))),
+        'goal': {
+            'metric': 'savings_rate',
+            'target': goal,
+            'points': dict(zip(rows, _first_reaching(savings_rate, grid, goal)))
+        }
+    }
+
+
+def sweep_expense_reduction(financial_data, percentages=None, categories=None, goal=DEFAULT_SAVINGS_RATE_GOAL):
+    """Evaluate cutting each expense category (and all of them) by every percentage in one pass"""
+    grid = np.asarray(percentages if percentages is not None else DEFAULT_PERCENTAGES, dtype=float)
+    base = household_inputs(financial_data)
+    expenses, all_categories = expense_matrix(financial_data.get('monthly_expenses') or {})
+    rows = [c for c in (categories or all_categories) if c in all_categories] + [ALL_EXPENSES]
+
+    # Which categories each row reduces: one-hot per category, every category for the last row
+    mask = np.array([[row in (c, ALL_EXPENSES) for c in all_categories] for row in rows], dtype=float)
+    kept = 1 - (grid[None, :, None] / 100) * mask[:, None, :]             # rows x grid x categories
+    month_totals = np.einsum('mc,rgc->rgm', expenses, kept)                 # rows x grid x months
+    category_totals = expenses.sum(axis=0)[None, None, :] * kept
+    spend = category_totals.sum(axis=-1, keepdims=True)
+    concentration = np.where(
+        spend[..., 0] > 0,
+        np.square(category_totals / np.where(spend > 0, spend, 1)).sum(axis=-1),
+        1.0
+    )
+
+    inputs = np.broadcast_to(base, (len(rows), len(grid), base.size)).copy()
+    if expenses.size:
+        inputs[..., 3] = month_totals.mean(axis=-1)
+        inputs[..., 4] = month_totals.std(axis=-1)
+        inputs[..., 5] = concentration
+    return _surface('expense_reduction', 'reduction_percentage', rows, grid, inputs, base, goal)
+
+
+def sweep_income_increase(financial_data, percentages=None, goal=DEFAULT_SAVINGS_RATE_GOAL):
+    """Evaluate raising income by every percentage in one pass"""
+    grid = np.asarray(percentages if percentages is not None else DEFAULT_PERCENTAGES, dtype=float)
+    base = household_inputs(financial_data)
+    inputs = np.broadcast_to(base, (1, len(grid), base.size)).copy()
+    inputs[..., 0] = base[0] * (1 + grid / 100)
+    return _surface('income_increase', 'increase_percentage', ['Income'], grid, inputs, base, goal)
+
+
+SWEEPS = {
+    'expense_reduction': sweep_expense_reduction,
+    'income_increase': sweep_income_increase
+}
+
+
+def sweep(financial_data, scenario_type, **options):
+    """Response surface of scenario_type over its parameter grid"""
+    if scenario_type not in SWEEPS:
+        raise ValueError(f"No parameter sweep for scenario '{scenario_type}'")
+    return SWEEPS[scenario_type](financial_data or {}, **options)
+
+
+def point_parameters(surface, row, value):
+    """simulate_scenario parameters for one point, with its locally computed metrics attached"""
+    r = surface['rows'].index(row)
+    i = surface['values'].index(float(value))
+    parameters = {surface['parameter']: value}
+    if surface['scenario'] == 'expense_reduction':
+        parameters['expense_type'] = row
+    parameters['projected'] = {name: values[r][i] for name, values in surface['metrics'].items()}
+    return parameters
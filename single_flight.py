@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight call: the leader's outcome and how many callers are waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    with the same key while it is in flight block until it finishes and get
+    the same result, or the same exception. Nothing is remembered once the
+    call completes, so results are only shared between overlapping callers;
+    the response cache covers everything after that.
+
+    Thread and asyncio callers share the same in-flight table, so a page load
+    and an advisory pass requesting the same analysis make a single API call.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'led': 0, 'coalesced': 0, 'failed': 0, 'max_waiters': 0}
+
+    def begin(self, key):
+        """Register a caller for key; returns (call, is_leader).
+
+        The leader must report the outcome with finish(); other callers get
+        it from call.wait().
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                self._stats['max_waiters'] = max(self._stats['max_waiters'], call.waiters)
+                return call, False
+            call = self._calls[key] = _Call()
+            self._stats['led'] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's outcome to its waiters and retire the key"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            if error is not None:
+                self._stats['failed'] += 1
+        if error is not None and not isinstance(error, Exception):
+            # Cancellation and interpreter exits belong to the leader only
+            error = RuntimeError(f"In-flight call was abandoned ({type(error).__name__})")
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def do(self, key, fn):
+        """Return fn(), running it at most once among concurrent callers with the same key"""
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait()
+        try:
+            result = fn()
+        except BaseException as error:
+            self.finish(key, call, error=error)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    async def do_async(self, key, coroutine_fn):
+        """Async counterpart of do(): awaits coroutine_fn() or the in-flight call for key"""
+        call, leader = self.begin(key)
+        if not leader:
+            return await asyncio.to_thread(call.wait)
+        try:
+            result = await coroutine_fn()
+        except BaseException as error:
+            self.finish(key, call, error=error)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def stats(self):
+        """Return in-flight, leader and coalesced call counts"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+            stats['waiting'] = sum(call.waiters for call in self._calls.values())
+        stats['coalesced_rate'] = stats['coalesced'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Return the in-flight call table shared by every session in this server process"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
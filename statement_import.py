@@ -0,0 +1,450 @@
+import csv
+import io
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from expense_store import month_key
+
+# Header names (lower-cased) recognised in bank CSV exports, most specific first
+DATE_COLUMNS = ('transaction date', 'posted date', 'posting date', 'booking date', 'date', 'value date')
+AMOUNT_COLUMNS = ('amount', 'transaction amount', 'amount (usd)')
+DEBIT_COLUMNS = ('debit', 'debit amount', 'withdrawal', 'withdrawals', 'money out')
+CREDIT_COLUMNS = ('credit', 'credit amount', 'deposit', 'deposits', 'money in')
+DESCRIPTION_COLUMNS = ('description', 'payee', 'merchant', 'name', 'details', 'narrative', 'memo')
+CATEGORY_COLUMNS = ('category',)
+FITID_COLUMNS = ('fitid', 'transaction id', 'reference')
+KNOWN_COLUMNS = frozenset(
+    DATE_COLUMNS + AMOUNT_COLUMNS + DEBIT_COLUMNS + CREDIT_COLUMNS + DESCRIPTION_COLUMNS + CATEGORY_COLUMNS
+    + FITID_COLUMNS
+)
+
+# Category of spending that no category column or categorizer assigned
+UNCATEGORIZED = 'Other'
+
+# OFX is read in blocks of this many characters
+OFX_BLOCK_CHARS = 1 << 20
+
+# Codes of the OFX tags read from each <STMTTRN> aggregate
+_OFX_TAGS = {'STMTTRN': 0, '/STMTTRN': 1, 'DTPOSTED': 2, 'TRNAMT': 3, 'NAME': 4, 'MEMO': 5, 'FITID': 6}
+_AMOUNT_NOISE = re.compile(r'[^\d.\-]')
+
+# Multiplier mixing the occurrence number of identical transactions into their hash
+_OCCURRENCE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass
+class ImportResult:
+    """Outcome of one statement import"""
+    format: str
+    rows: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    imported: int = 0
+    expenses: float = 0.0
+    income: float = 0.0
+    months: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'format': self.format,
+            'rows': self.rows,
+            'invalid': self.invalid,
+            'duplicates': self.duplicates,
+            'imported': self.imported,
+            'expenses': round(self.expenses, 2),
+            'income': round(self.income, 2),
+            'months': self.months,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second)
+        }
+
+
+class TransactionHashes:
+    """Sorted set of the 64-bit hashes of every imported transaction (8 bytes each).
+
+    An upload stages the hashes of its new transactions and commits them
+    once it finishes, so transactions are only checked against earlier
+    uploads. Staged hashes are appended to one doubling buffer that is
+    sorted in place on commit, so an upload of N transactions needs about
+    8N bytes on top of the existing set rather than several copies.
+    """
+
+    def __init__(self, hashes=None):
+        self._hashes = np.unique(np.asarray(hashes if hashes is not None else [], dtype=np.uint64))
+        self._staged = np.empty(0, dtype=np.uint64)
+        self._staged_count = 0
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def contains(self, keys):
+        if not len(self._hashes):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self._hashes, keys), len(self._hashes) - 1)
+        return self._hashes[positions] == keys
+
+    def stage(self, keys):
+        """Queue keys for the next commit(); contains() does not see them until then"""
+        end = self._staged_count + len(keys)
+        if end > len(self._staged):
+            grown = np.empty(max(end, 2 * len(self._staged)), dtype=np.uint64)
+            grown[:self._staged_count] = self._staged[:self._staged_count]
+            self._staged = grown
+        self._staged[self._staged_count:end] = keys
+        self._staged_count = end
+
+    def commit(self):
+        """Merge the staged keys into the set"""
+        merged, count = self._staged, self._staged_count
+        self._staged, self._staged_count = np.empty(0, dtype=np.uint64), 0
+        if len(self._hashes):
+            merged = np.concatenate((self._hashes, merged[:count]))
+            self._hashes = merged[:0]
+        else:
+            # The buffer is only referenced here, so it can be shrunk in place
+            merged.resize(count, refcheck=False)
+        merged.sort()
+        distinct = np.empty(len(merged), dtype=bool)
+        distinct[:1] = True
+        np.not_equal(merged[1:], merged[:-1], out=distinct[1:])
+        self._hashes = merged if distinct.all() else merged[distinct]
+
+    def discard(self):
+        """Drop the staged keys, as after an upload that failed"""
+        self._staged, self._staged_count = np.empty(0, dtype=np.uint64), 0
+
+    def add(self, keys):
+        self.stage(np.asarray(keys, dtype=np.uint64))
+        self.commit()
+
+
+class StatementImporter:
+    """Streaming importer of bank CSV and OFX statements into an ExpenseStore.
+
+    Statements are read chunk_rows transactions at a time, so memory is
+    bounded by the chunk size whatever the file size (plus 8 bytes per
+    imported transaction for de-duplication). Each chunk's dates and amounts
+    are normalized with vectorized pandas/NumPy operations, transactions
+    already imported by an earlier upload are dropped by hash, and outflows
+    are summed per (month, category). The sums and hashes are applied to the
+    store and the de-duplication set only once the whole statement has been
+    read, so a statement that fails to parse leaves both unchanged. Inflows
+    are reported as income but not stored.
+    """
+
+    def __init__(self, chunk_rows=100_000, dayfirst=False):
+        self.chunk_rows = chunk_rows
+        self.dayfirst = dayfirst
+
+    @classmethod
+    def from_env(cls):
+        """Build an importer configured from FINTWIN_IMPORT_* environment variables"""
+        return cls(
+            chunk_rows=int(os.getenv('FINTWIN_IMPORT_CHUNK_ROWS', 100_000)),
+            dayfirst=os.getenv('FINTWIN_IMPORT_DAYFIRST', 'false').lower() in ('1', 'true', 'yes')
+        )
+
+    def import_statement(self, source, store, seen=None, fmt=None, categorize=None):
+        """Import a CSV or OFX statement into store and return an ImportResult.
+
+        source is a path, bytes or a file-like object (such as a Streamlit
+        upload). fmt is 'csv' or 'ofx', detected from the name or content if
+        omitted. seen is the TransactionHashes of earlier uploads, updated
+        in place. categorize maps a Series of descriptions to category
+        names; without it a category column is used when present.
+        """
+        started = time.perf_counter()
+        fmt = fmt or detect_format(source)
+        if fmt not in ('csv', 'ofx'):
+            raise ValueError(f"Unsupported statement format '{fmt}'")
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        result = ImportResult(format=fmt)
+        chunks = csv_chunks(source, self.chunk_rows) if fmt == 'csv' else ofx_chunks(source, self.chunk_rows)
+        carry = (np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64))
+        # Spending per (month, category) is applied to store, and the hashes to seen,
+        # only once the whole statement has been read, so a failed upload changes nothing
+        cells = {}
+        try:
+            for raw in chunks:
+                result.rows += len(raw)
+                transactions = normalize_transactions(raw, self.dayfirst)
+                result.invalid += len(raw) - len(transactions)
+                if not len(transactions):
+                    continue
+
+                keys, carry = transaction_keys(transactions, carry)
+                if seen is not None:
+                    fresh = ~seen.contains(keys)
+                    result.duplicates += int((~fresh).sum())
+                    transactions = transactions[fresh]
+                    seen.stage(keys[fresh])
+                if not len(transactions):
+                    continue
+
+                result.imported += len(transactions)
+                amounts = transactions['amount'].to_numpy()
+                result.income += float(amounts[amounts > 0].sum())
+                spending = transactions[amounts < 0]
+                if len(spending):
+                    categories = self._categories(spending, categorize)
+                    result.expenses += aggregate_spending(cells, spending['month'].to_numpy(), categories,
+                                                          -spending['amount'].to_numpy())
+        except Exception:
+            if seen is not None:
+                seen.discard()
+            raise
+
+        for (month, category), amount in cells.items():
+            store.add(month, category, amount)
+        if seen is not None:
+            seen.commit()
+        months = {month for month, _ in cells}
+        result.months = [key for _, key in sorted((ordinal, month_key(ordinal)) for ordinal in months)]
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    def _categories(spending, categorize):
+        if categorize is not None:
+            return categorize(spending['description'])
+        if 'category' in spending:
+            return spending['category'].where(spending['category'].str.len() > 0, UNCATEGORIZED)
+        return None
+
+
+def detect_format(source):
+    """'ofx' or 'csv' from the source's file name, or else from its first bytes"""
+    name = source if isinstance(source, str) else getattr(source, 'name', '') or ''
+    extension = os.path.splitext(name)[1].lower()
+    if extension in ('.ofx', '.qfx'):
+        return 'ofx'
+    if extension in ('.csv', '.txt'):
+        return 'csv'
+    if isinstance(source, (bytes, bytearray)):
+        head = bytes(source[:1024])
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            head = f.read(1024)
+    else:
+        position = source.tell()
+        head = source.read(1024)
+        source.seek(position)
+    if isinstance(head, str):
+        head = head.encode('utf-8', 'replace')
+    return 'ofx' if b'OFXHEADER' in head.upper() or b'<OFX>' in head.upper() else 'csv'
+
+
+def _find_column(columns, aliases):
+    by_name = {c.strip().lower(): c for c in columns}
+    return next((by_name[alias] for alias in aliases if alias in by_name), None)
+
+
+def csv_chunks(source, chunk_rows):
+    """Yield raw transaction frames (date, amount, description[, category, fitid]) from a CSV statement"""
+    import pandas as pd
+    reader = pd.read_csv(
+        source, chunksize=chunk_rows, usecols=lambda c: c.strip().lower() in KNOWN_COLUMNS,
+        skipinitialspace=True, keep_default_na=False, na_values=[''], low_memory=True
+    )
+    mapping = None
+    for chunk in reader:
+        if mapping is None:
+            mapping = _csv_mapping(chunk.columns)
+        frame = pd.DataFrame({'date': chunk[mapping['date']]})
+        if mapping['amount'] is not None:
+            frame['amount'] = parse_amounts(chunk[mapping['amount']])
+        else:
+            debit = parse_amounts(chunk[mapping['debit']]) if mapping['debit'] else 0.0
+            credit = parse_amounts(chunk[mapping['credit']]) if mapping['credit'] else 0.0
+            frame['amount'] = np.nan_to_num(credit) - np.abs(np.nan_to_num(debit))
+        frame['description'] = chunk[mapping['description']].fillna('').astype(str) if mapping['description'] else ''
+        if mapping['category']:
+            frame['category'] = chunk[mapping['category']].fillna('').astype(str).str.strip()
+        frame['fitid'] = chunk[mapping['fitid']].fillna('').astype(str) if mapping['fitid'] else ''
+        yield frame
+
+
+def _csv_mapping(columns):
+    mapping = {
+        'date': _find_column(columns, DATE_COLUMNS),
+        'amount': _find_column(columns, AMOUNT_COLUMNS),
+        'debit': _find_column(columns, DEBIT_COLUMNS),
+        'credit': _find_column(columns, CREDIT_COLUMNS),
+        'description': _find_column(columns, DESCRIPTION_COLUMNS),
+        'category': _find_column(columns, CATEGORY_COLUMNS),
+        'fitid': _find_column(columns, FITID_COLUMNS)
+    }
+    if mapping['date'] is None or (mapping['amount'] is None and not (mapping['debit'] or mapping['credit'])):
+        raise ValueError("The statement needs a date column and an amount (or debit/credit) column")
+    return mapping
+
+
+def ofx_chunks(source, chunk_rows):
+    """Yield raw transaction frames (date, amount, description, fitid) from an OFX/QFX statement"""
+    import pandas as pd
+    stream = _text_stream(source)
+    pending, pending_rows = [], 0
+    buffer = ''
+    while True:
+        block = stream.read(OFX_BLOCK_CHARS)
+        buffer += block
+        # Parse up to the last complete transaction and keep the rest for the next block
+        end = buffer.upper().rfind('</STMTTRN>') + len('</STMTTRN>') if block else len(buffer)
+        if end >= len('</STMTTRN>'):
+            frame = _ofx_frame(pd, buffer[:end])
+            buffer = buffer[end:]
+            if len(frame):
+                pending.append(frame)
+                pending_rows += len(frame)
+        else:
+            # No transaction ends in this block; keep only a possibly unfinished one (or a split tag)
+            start = buffer.upper().rfind('<STMTTRN>')
+            buffer = buffer[start:] if start >= 0 else buffer[-16:]
+        while pending_rows >= chunk_rows or (not block and pending_rows):
+            chunk = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            rest = chunk.iloc[chunk_rows:].reset_index(drop=True)
+            pending, pending_rows = ([rest], len(rest)) if len(rest) else ([], 0)
+            yield chunk.iloc[:chunk_rows]
+        if not block:
+            break
+
+
+def _ofx_frame(pd, text):
+    """Transactions of the complete <STMTTRN> aggregates in text.
+
+    OFX is tokenized by pandas' C CSV parser: every '<' starts a line and
+    '>' separates a tag from its value (SGML escapes both inside values).
+    Each field is then scattered into its transaction with NumPy.
+    """
+    try:
+        tokens = pd.read_csv(
+            io.StringIO(text.replace('<', '\n')), sep='>', header=None, names=['tag', 'value'], dtype=str,
+            quoting=csv.QUOTE_NONE, keep_default_na=False, skipinitialspace=True, on_bad_lines='skip', engine='c'
+        )
+    except pd.errors.EmptyDataError:
+        tokens = pd.DataFrame({'tag': [], 'value': []}, dtype=object)
+    codes, names = pd.factorize(tokens['tag'].to_numpy())
+    kinds = np.array([_OFX_TAGS.get(name.strip().upper(), -1) for name in names] + [-1], dtype=np.int8)[codes]
+    values = tokens['value'].to_numpy()
+    opened, closed = kinds == _OFX_TAGS['STMTTRN'], kinds == _OFX_TAGS['/STMTTRN']
+    transaction = np.cumsum(opened) - 1
+    inside = np.cumsum(opened) - np.cumsum(closed) > 0
+    count = int(opened.sum())
+    columns = {}
+    for tag in ('DTPOSTED', 'TRNAMT', 'NAME', 'MEMO', 'FITID'):
+        column = np.full(count, '', dtype=object)
+        present = inside & (kinds == _OFX_TAGS[tag])
+        column[transaction[present]] = values[present]
+        columns[tag] = column
+    description = pd.Series(columns['NAME'], dtype=object).str.rstrip()
+    unnamed = (description == '').to_numpy()
+    description[unnamed] = pd.Series(columns['MEMO'][unnamed], dtype=object).str.rstrip().to_numpy()
+    return pd.DataFrame({
+        'date': columns['DTPOSTED'].astype('U8'),
+        'amount': parse_amounts(pd.Series(columns['TRNAMT'], dtype=object)),
+        'description': description,
+        'fitid': columns['FITID']
+    })
+
+
+def _text_stream(source):
+    if isinstance(source, str):
+        return open(source, encoding='utf-8', errors='replace')
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding='utf-8', errors='replace')
+
+
+def parse_amounts(values):
+    """Float amounts from a column of numbers or strings like '$1,234.50', '(12.00)' or '-5'"""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    amounts = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    # Only strings that are not plain numbers go through the slower clean-up
+    messy = np.isnan(amounts) & values.notna().to_numpy()
+    if messy.any():
+        text = values[messy].astype(str).str.strip()
+        negative = (text.str.startswith('(') & text.str.endswith(')')).to_numpy()
+        cleaned = pd.to_numeric(text.str.replace(_AMOUNT_NOISE, '', regex=True), errors='coerce').to_numpy(dtype=float)
+        amounts[messy] = np.where(negative, -np.abs(cleaned), cleaned)
+    return amounts
+
+
+def parse_dates(values, dayfirst=False):
+    """datetime64[D] dates (NaT if unparseable), parsing each distinct string once"""
+    import pandas as pd
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce', dayfirst=dayfirst, format='mixed')
+    days = parsed.to_numpy(dtype='datetime64[D]')
+    return days.take(codes) if len(days) else np.full(len(values), np.datetime64('NaT'), dtype='datetime64[D]')
+
+
+def normalize_transactions(raw, dayfirst=False):
+    """Vectorized clean-up of a raw chunk: day, month ordinal and signed amount; drops unusable rows"""
+    days = parse_dates(raw['date'], dayfirst)
+    amounts = raw['amount'].to_numpy(dtype=float)
+    valid = ~np.isnat(days) & np.isfinite(amounts)
+    transactions = raw.loc[valid, [c for c in raw.columns if c not in ('date', 'amount')]]
+    transactions['day'] = days[valid]
+    # Months since January 1970 (pandas monthly period ordinals, as used by ExpenseStore)
+    transactions['month'] = days[valid].astype('datetime64[M]').astype(np.int64)
+    transactions['amount'] = np.round(amounts[valid], 2)
+    return transactions
+
+
+def transaction_keys(transactions, carry):
+    """64-bit key of each transaction, distinct for repeats of an identical transaction.
+
+    The base hash covers the day, amount in cents, description and bank
+    transaction id. The n-th identical transaction of a statement is mixed
+    with n, so a statement with two identical purchases keeps both while a
+    re-upload maps onto the same keys. carry holds the base hashes and
+    counts of the previous chunk, so repeats split across a chunk boundary
+    of a date-ordered statement keep counting.
+    """
+    import pandas as pd
+    base = pd.util.hash_pandas_object(pd.DataFrame({
+        'day': transactions['day'].to_numpy().astype(np.int64),
+        'cents': np.rint(transactions['amount'].to_numpy() * 100).astype(np.int64),
+        'description': transactions['description'].to_numpy(),
+        'fitid': transactions['fitid'].to_numpy()
+    }), index=False).to_numpy()
+    uniques, inverse, counts = np.unique(base, return_inverse=True, return_counts=True)
+    carried_bases, carried_counts = carry
+    prior = np.zeros(len(uniques), dtype=np.int64)
+    if len(carried_bases):
+        positions = np.minimum(np.searchsorted(carried_bases, uniques), len(carried_bases) - 1)
+        found = carried_bases[positions] == uniques
+        prior[found] = carried_counts[positions[found]]
+    occurrence = prior[inverse] + pd.Series(inverse).groupby(inverse).cumcount().to_numpy()
+    keys = base ^ (occurrence.astype(np.uint64) * _OCCURRENCE_MIX)
+    return keys, (uniques, prior + counts)
+
+
+def aggregate_spending(cells, months, categories, amounts):
+    """Add amounts into cells, a {(month ordinal, category): amount} dict; returns the total added"""
+    if categories is None:
+        category_codes, names = np.zeros(len(amounts), dtype=np.int64), np.array([UNCATEGORIZED], dtype=object)
+    else:
+        import pandas as pd
+        category_codes, names = pd.factorize(np.asarray(categories, dtype=object))
+    codes, cell_index = np.unique(months * len(names) + category_codes, return_inverse=True)
+    sums = np.bincount(cell_index, weights=amounts, minlength=len(codes))
+    for code, amount in zip(codes.tolist(), sums.tolist()):
+        month, category = divmod(code, len(names))
+        cell = (month, names[category])
+        cells[cell] = cells.get(cell, 0.0) + amount
+    return float(sums.sum())
+
@@ -0,0 +1,139 @@
+import json
+
+
+class PartialJSONParser:
+    """Incrementally parse a streamed JSON object one chunk at a time.
+
+    Top-level fields become available as soon as their value is complete;
+    string values are additionally exposed while they are still streaming,
+    so long text such as an analysis can be rendered token by token. Any
+    preamble before the first '{' (e.g. a ```json fence) is skipped, and
+    text holds just the object itself for parsing once it is done.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.fields = {}
+        self.partial = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = 'key'
+        self._mode = None
+        self._key = None
+        self._start = None
+        self._object_start = None
+
+    def feed(self, chunk):
+        """Consume the next chunk and return a snapshot of the fields seen so far"""
+        if chunk and not self.done:
+            self.buffer += chunk
+            self._scan()
+        return self.snapshot()
+
+    @property
+    def text(self):
+        """The object's JSON text from its opening '{', without any preamble or trailing text"""
+        if self._object_start is None:
+            return ''
+        return self.buffer[self._object_start:self._pos if self.done else len(self.buffer)]
+
+    def snapshot(self):
+        """Return completed fields merged over in-progress string values"""
+        return {**self.partial, **self.fields}
+
+    def _scan(self):
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._object_start = i
+                    self._expect = 'key'
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._mode == 'key':
+                        self._key = self._decode(buffer[self._start:i + 1])
+                        self._mode = None
+                        self._expect = 'colon'
+                    elif self._depth == 1 and self._mode == 'string':
+                        self._complete(buffer[self._start:i + 1])
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == 'key':
+                    self._mode = 'key'
+                    self._start = i
+                elif self._depth == 1 and self._expect == 'value':
+                    self._mode = 'string'
+                    self._start = i
+            elif ch in '{[':
+                if self._depth == 1 and self._expect == 'value':
+                    self._mode = 'nested'
+                    self._start = i
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 1 and self._mode == 'scalar':
+                    self._complete(buffer[self._start:i])
+                self._depth -= 1
+                if self._depth == 1 and self._mode == 'nested':
+                    self._complete(buffer[self._start:i + 1])
+                elif self._depth == 0:
+                    self.done = True
+                    self._pos = i + 1
+                    return
+            elif self._depth == 1:
+                if ch == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                elif ch == ',':
+                    if self._mode == 'scalar':
+                        self._complete(buffer[self._start:i])
+                    self._expect = 'key'
+                elif not ch.isspace() and self._expect == 'value' and self._mode is None:
+                    self._mode = 'scalar'
+                    self._start = i
+
+        self._pos = len(buffer)
+        if self._in_string and self._depth == 1 and self._mode == 'string':
+            self.partial[self._key] = self._decode_partial(buffer[self._start + 1:])
+
+    def _complete(self, raw):
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except ValueError:
+            self.fields[self._key] = raw.strip()
+        self.partial.pop(self._key, None)
+        self._mode = None
+        self._expect = 'comma'
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw.strip('"')
+
+    @staticmethod
+    def _decode_partial(raw):
+        """Decode an unterminated JSON string, dropping a dangling escape sequence"""
+        cut = raw.rfind('\\')
+        if cut != -1:
+            run = len(raw[:cut + 1]) - len(raw[:cut + 1].rstrip('\\'))
+            escape = raw[cut + 1:]
+            if run % 2 == 1 and (not escape or (escape[0] == 'u' and len(escape) < 5)):
+                raw = raw[:cut]
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw